@@ -2,8 +2,17 @@
 #define DLISIO_PYTHON_IO_HPP
 
 #include <array>
+#include <atomic>
+#include <chrono>
+#include <cstdio>
+#include <cstring>
+#include <functional>
+#include <list>
+#include <memory>
+#include <mutex>
 #include <string>
 #include <tuple>
+#include <utility>
 #include <vector>
 #include <map>
 
@@ -31,6 +40,85 @@ struct DLISIO_API io_error : public std::runtime_error {
     explicit io_error( int no ) : runtime_error( std::strerror( no ) ) {}
 };
 
+/*
+ * Thrown when a progress callback asks for an operation to be cancelled
+ */
+struct DLISIO_API cancelled : public std::runtime_error {
+    using std::runtime_error::runtime_error;
+};
+
+/* Progress - reporting and cancellation of long-running operations
+ *
+ * Long-running loops, like indexing a file and reading frame data, report the
+ * work done so far through a progress. The callback is called with the work
+ * done and the total, or -1 if the total is not known, and returns false to
+ * cancel the operation. Cancelling throws dl::cancelled from the loop, which
+ * unwinds the operation and releases what it allocated.
+ *
+ * The callback is rate-limited to be called at most once every interval, and
+ * a default-constructed progress does nothing, at the cost of a single check.
+ */
+class DLISIO_API progress {
+public:
+    using callback = std::function< bool (std::int64_t, std::int64_t) >;
+
+    progress() = default;
+    progress( callback fn,
+              std::int64_t total,
+              std::chrono::milliseconds interval
+                  = std::chrono::milliseconds( 100 ) ) noexcept (false);
+
+    explicit operator bool () const noexcept (true);
+    /* if interval has passed since the last call to the callback */
+    bool due() const noexcept (true);
+    std::chrono::milliseconds interval() const noexcept (true);
+
+    /* call the callback if it's due */
+    void update( std::int64_t done ) noexcept (false);
+    /* call the callback, regardless of when it was last called */
+    void report( std::int64_t done ) noexcept (false);
+
+private:
+    callback fn;
+    std::int64_t total = -1;
+    std::chrono::milliseconds every{ 0 };
+    std::chrono::steady_clock::time_point last;
+};
+
+/* Counters - instrumentation of the core
+ *
+ * Process-wide counters of the work done by the core, for finding out where
+ * the time of a slow load goes. Counting is off by default, and then costs a
+ * single relaxed load of a flag at every counting site. The counters are
+ * never reset, so the work done by a region of code is the difference
+ * between the counters after and before it.
+ */
+namespace counters {
+
+enum counter {
+    reads,             /* reads from a handle */
+    bytes_read,        /* bytes read from a handle */
+    seeks,             /* seeks in a stream */
+    segments_scanned,  /* logical record segment headers read when indexing */
+    records_scanned,   /* logical records found when indexing */
+    records_extracted, /* logical records (or their heads) extracted */
+    segments_stitched, /* segments joined with their predecessor by extract */
+    rows_decoded,      /* frames decoded by read_fdata */
+    ncounters,
+};
+
+DLISIO_API extern std::atomic< bool > enabled;
+DLISIO_API extern std::array< std::atomic< std::int64_t >, ncounters > values;
+
+inline void add( counter c, std::int64_t n = 1 ) noexcept (true) {
+    if (enabled.load( std::memory_order_relaxed ))
+        values[c].fetch_add( n, std::memory_order_relaxed );
+}
+
+DLISIO_API const char* name( counter c ) noexcept (true);
+
+}
+
 /* Stream - wrapper for lfp_protocol
  *
  * The main purpose of stream is to handle lfp return codes in a manner that
@@ -48,6 +136,8 @@ public:
     std::int64_t tell() const noexcept(true);
     std::int64_t absolute_tell() const noexcept(false);
 
+    void readahead( std::size_t blocksize ) noexcept (false);
+
     std::int64_t read( char* dst, int n ) noexcept (false);
 
 private:
@@ -55,13 +145,251 @@ private:
 };
 
 
+class handle_pool;
+
+/* Handle - random access to the bytes of a file
+ *
+ * All reads are positioned (pread-style), so a handle carries no position
+ * and any number of lfp protocol stacks can read from it concurrently, each
+ * keeping its own position. The logical files of a physical file all read
+ * through the same handle, so loading a file only ever holds one handle, no
+ * matter how many logical files it contains.
+ *
+ * Implementations provide readat, which must read n bytes, and only return
+ * fewer at end-of-file.
+ */
+class DLISIO_API handle {
+public:
+    handle() = default;
+    virtual ~handle() = default;
+
+    handle( const handle& ) = delete;
+    handle& operator = ( const handle& ) = delete;
+
+    std::int64_t pread( char* dst, std::int64_t n, std::int64_t offset )
+        noexcept (false);
+
+    /* number of reads from the handle, and the total number of bytes read */
+    std::int64_t reads() const noexcept (true);
+    std::int64_t bytes_read() const noexcept (true);
+
+protected:
+    virtual std::int64_t readat( char* dst, std::int64_t n, std::int64_t offset )
+        noexcept (false) = 0;
+
+private:
+    std::atomic< std::int64_t > nreads{ 0 };
+    std::atomic< std::int64_t > nbytes{ 0 };
+};
+
+/* File handle - a single open file
+ *
+ * If the handle belongs to a handle_pool, the descriptor may be closed by the
+ * pool at any time the handle is not being read, and is transparently
+ * re-opened by the next read.
+ */
+class DLISIO_API file_handle : public handle {
+public:
+    explicit file_handle( const std::string& path,
+                          std::shared_ptr< handle_pool > pool = nullptr )
+        noexcept (false);
+    ~file_handle() noexcept (true) override;
+
+    const std::string& path() const noexcept (true);
+    bool isopen() const noexcept (true);
+
+protected:
+    std::int64_t readat( char* dst, std::int64_t n, std::int64_t offset )
+        noexcept (false) override;
+
+private:
+    friend class handle_pool;
+
+    void open() noexcept (false);
+    void close() noexcept (true);
+
+    std::string filepath;
+    std::FILE* fp = nullptr;
+    std::shared_ptr< handle_pool > pool;
+    mutable std::mutex mtx;
+};
+
+/* Memory handle - a file that is already in memory
+ *
+ * The memory is not copied, and must outlive the handle. The owner is kept
+ * alive, and released together with the handle, which is the mechanism for
+ * tying the lifetime of e.g. a python buffer to the handle.
+ */
+class DLISIO_API memory_handle : public handle {
+public:
+    memory_handle( const char* data,
+                   std::int64_t size,
+                   std::shared_ptr< const void > owner = nullptr )
+        noexcept (false);
+
+    std::int64_t size() const noexcept (true);
+
+protected:
+    std::int64_t readat( char* dst, std::int64_t n, std::int64_t offset )
+        noexcept (false) override;
+
+private:
+    const char* data;
+    std::int64_t len;
+    std::shared_ptr< const void > owner;
+};
+
+/* Cached handle - a block cache in front of another handle
+ *
+ * For handles where every read is expensive, regardless of its size, such
+ * as python file-like objects or network storage. The file is read and cached
+ * in blocks of blocksize bytes, and the least recently used block is evicted
+ * when there are more than capacity blocks in the cache. Consecutive blocks
+ * that are not in the cache are read from the source in a single read.
+ */
+class DLISIO_API cached_handle : public handle {
+public:
+    cached_handle( std::shared_ptr< handle > source,
+                   std::size_t blocksize,
+                   std::size_t capacity )
+        noexcept (false);
+
+    const std::shared_ptr< handle >& source() const noexcept (true);
+
+protected:
+    std::int64_t readat( char* dst, std::int64_t n, std::int64_t offset )
+        noexcept (false) override;
+
+private:
+    using block = std::pair< std::int64_t, std::vector< char > >;
+
+    const std::vector< char >* lookup( std::int64_t ) noexcept (false);
+    void fetch( std::int64_t first, std::int64_t last ) noexcept (false);
+
+    std::shared_ptr< handle > src;
+    std::size_t blocksize;
+    std::size_t capacity;
+
+    /* cached blocks, most recently used first */
+    std::list< block > blocks;
+    std::map< std::int64_t, std::list< block >::iterator > index;
+    std::mutex mtx;
+};
+
+/* Gzip handle - random access into gzip-compressed files
+ *
+ * Random access into a deflate stream is made possible with an index of
+ * checkpoints, in the fashion of zlib's examples/zran.c. A checkpoint is
+ * recorded every spacing bytes of uncompressed data, and holds the state
+ * needed to restart decompression from that point. Reading from an offset
+ * then only decompresses from the closest preceding checkpoint, and
+ * sequential reads continue decompression where the previous read stopped.
+ *
+ * Building the index requires decompressing the whole file once. The index
+ * can be serialized, stored alongside the compressed file, and given to the
+ * constructor later, to skip that pass.
+ *
+ * Concatenated gzip members are supported.
+ */
+class DLISIO_API gzip_handle : public handle {
+public:
+    explicit gzip_handle( std::shared_ptr< handle > source,
+                          std::int64_t spacing = 1 << 20 )
+        noexcept (false);
+    gzip_handle( std::shared_ptr< handle > source, const std::string& index )
+        noexcept (false);
+    ~gzip_handle() noexcept (true) override;
+
+    /* size of the uncompressed data */
+    std::int64_t size() const noexcept (true);
+    std::size_t checkpoints() const noexcept (true);
+    const std::shared_ptr< handle >& source() const noexcept (true);
+
+    /* the checkpoint index, serialized */
+    std::string index() const noexcept (false);
+
+protected:
+    std::int64_t readat( char* dst, std::int64_t n, std::int64_t offset )
+        noexcept (false) override;
+
+private:
+    struct checkpoint {
+        /* offset in the uncompressed and compressed data */
+        std::int64_t out;
+        std::int64_t in;
+        /*
+         * Number of bits of the byte before in that belong to the next
+         * deflate block, or -1 if the checkpoint is the start of a gzip
+         * member (which needs no window).
+         */
+        int bits;
+        std::vector< unsigned char > window;
+    };
+    struct inflater;
+
+    void build( std::int64_t spacing ) noexcept (false);
+    void restart( const checkpoint& ) noexcept (false);
+    std::int64_t inflate( char* dst, std::int64_t n ) noexcept (false);
+
+    std::shared_ptr< handle > src;
+    std::vector< checkpoint > points;
+    std::int64_t len = 0;
+
+    /* the most recently used decompression stream, for sequential reads */
+    std::unique_ptr< inflater > live;
+    std::mutex mtx;
+};
+
+/*
+ * If the handle is gzip-compressed, a handle to the decompressed data, and
+ * otherwise the handle itself.
+ */
+std::shared_ptr< handle > decompressed( std::shared_ptr< handle > )
+    noexcept (false);
+
+/* Handle pool - bound the number of open descriptors
+ *
+ * The pool keeps at most maxopen of its file handles open at the same time,
+ * closing the least recently used one when another needs to be opened. The
+ * same pool can be shared between any number of loaded files.
+ *
+ * The bound is soft: a handle that is being read from at the same time in
+ * another thread is never closed, so the pool may briefly go above maxopen.
+ */
+class DLISIO_API handle_pool {
+public:
+    explicit handle_pool( std::size_t maxopen ) noexcept (false);
+
+    std::size_t maxopen() const noexcept (true);
+    std::size_t size() const noexcept (true);
+
+private:
+    friend class file_handle;
+
+    void touch( file_handle* ) noexcept (false);
+    void remove( file_handle* ) noexcept (true);
+
+    std::size_t limit;
+    /* open handles, most recently used first */
+    std::list< file_handle* > lru;
+    mutable std::mutex mtx;
+};
+
 struct stream_offsets {
     std::vector< long long > explicits;
     std::vector< long long > implicits;
+    /* where the next scan resumes, and if the logical file has ended */
+    long long tell = 0;
+    bool complete = false;
 };
 
 stream open(const std::string&, std::int64_t) noexcept (false);
+stream open(const std::shared_ptr< handle >&, std::int64_t)
+    noexcept (false);
 stream open_rp66(const stream&) noexcept (false);
+stream open_rp66_indexed(const stream&, std::int64_t) noexcept (false);
+std::int64_t extend_rp66_indexed(stream&) noexcept (false);
+stream clone(const stream&) noexcept (false);
 stream open_tapeimage(const stream&) noexcept (false);
 
 long long findsul(stream&) noexcept (false);
@@ -71,10 +399,13 @@ bool hastapemark(stream&) noexcept (false);
 dl::record extract(stream&, long long) noexcept (false);
 dl::record& extract(stream&, long long, long long, dl::record&) noexcept (false);
 
-stream_offsets findoffsets(dl::stream&) noexcept (false);
+stream_offsets findoffsets(dl::stream&, progress = progress())
+    noexcept (false);
+stream_offsets findappended(dl::stream&, long long) noexcept (false);
 
 std::map< dl::ident, std::vector< long long > >
-findfdata(dl::stream&, const std::vector< long long >&) noexcept (false);
+findfdata(dl::stream&, const std::vector< long long >&, progress = progress())
+noexcept (false);
 
 }
 
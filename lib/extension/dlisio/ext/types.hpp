@@ -4,6 +4,7 @@
 #include <complex>
 #include <cstdint>
 #include <exception>
+#include <map>
 #include <tuple>
 #include <type_traits>
 #include <utility>
@@ -544,6 +545,16 @@ public:
     object_vector get(const std::string& type,
                       const dl::matcher& matcher) noexcept (false);
 
+    /*
+     * Count objects without copying them out of the pool. Objects are counted
+     * by their fingerprint, i.e. objects with the same type, name, origin and
+     * copynumber that appear in multiple sets are only counted once.
+     */
+    std::size_t count(const std::string& type,
+                      const dl::matcher& matcher) noexcept (false);
+
+    std::map< dl::ident, std::size_t > counts() noexcept (false);
+
 private:
     std::vector< dl::object_set > eflrs;
 };
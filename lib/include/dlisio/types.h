@@ -49,6 +49,49 @@ DLISIO_API const char* dlis_uvari(const char*, int32_t* out);
 DLISIO_API const char* dlis_ident(const char*, int32_t* len, char* out);
 DLISIO_API const char* dlis_ascii(const char*, int32_t* len, char* out);
 
+/*
+ * Array versions of the fixed-size parsing functions, which parse n
+ * consecutive values of the same type. They give the same result as calling
+ * the single-value function n times, but are written so that compilers can
+ * vectorize them.
+ *
+ * Values with more than one component, i.e. complex and validated floats,
+ * are written one component after the other, so csingl writes the 2n floats
+ * R0 I0 R1 I1 ...
+ */
+DLISIO_API const char* dlis_sshort_array(const char*, int n, int8_t*);
+DLISIO_API const char* dlis_snorm_array( const char*, int n, int16_t*);
+DLISIO_API const char* dlis_slong_array( const char*, int n, int32_t*);
+
+DLISIO_API const char* dlis_ushort_array(const char*, int n, uint8_t*);
+DLISIO_API const char* dlis_unorm_array( const char*, int n, uint16_t*);
+DLISIO_API const char* dlis_ulong_array( const char*, int n, uint32_t*);
+
+DLISIO_API const char* dlis_fshort_array(const char*, int n, float*);
+DLISIO_API const char* dlis_fsingl_array(const char*, int n, float*);
+DLISIO_API const char* dlis_fdoubl_array(const char*, int n, double*);
+
+DLISIO_API const char* dlis_isingl_array(const char*, int n, float*);
+DLISIO_API const char* dlis_vsingl_array(const char*, int n, float*);
+
+DLISIO_API const char* dlis_fsing1_array(const char*, int n, float*);
+DLISIO_API const char* dlis_fsing2_array(const char*, int n, float*);
+DLISIO_API const char* dlis_csingl_array(const char*, int n, float*);
+
+DLISIO_API const char* dlis_fdoub1_array(const char*, int n, double*);
+DLISIO_API const char* dlis_fdoub2_array(const char*, int n, double*);
+DLISIO_API const char* dlis_cdoubl_array(const char*, int n, double*);
+
+DLISIO_API const char* dlis_status_array(const char*, int n, uint8_t*);
+
+/*
+ * Parse n values of the representation code reprc, e.g. DLIS_FSINGL, with
+ * the matching array function. Returns NULL if reprc is not one of the
+ * fixed-size types above.
+ */
+DLISIO_API
+const char* dlis_decode_array(int reprc, const char*, int n, void* dst);
+
 #define DLIS_TZ_LST 0 // local standard
 #define DLIS_TZ_DST 1 // local daylight savings
 #define DLIS_TZ_GMT 2 // greenwich mean time
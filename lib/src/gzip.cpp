@@ -0,0 +1,464 @@
+#include <algorithm>
+#include <ciso646>
+#include <climits>
+#include <cstdint>
+#include <memory>
+#include <mutex>
+#include <string>
+#include <vector>
+
+#include <fmt/core.h>
+
+#ifdef DLISIO_HAVE_ZLIB
+    #include <zlib.h>
+#endif
+
+#include <dlisio/ext/io.hpp>
+#include <dlisio/ext/types.hpp>
+
+namespace dl {
+
+namespace {
+
+constexpr char GZIP_MAGIC[] = { '\x1f', '\x8b' };
+
+}
+
+std::shared_ptr< handle > decompressed( std::shared_ptr< handle > fh )
+noexcept (false) {
+    /*
+     * The gzip handle only makes sequential reads cheap, while dlisio makes
+     * many small, scattered reads. The block cache keeps recently
+     * decompressed data around.
+     */
+    constexpr std::size_t blocksize = 1 << 16;
+    constexpr std::size_t capacity  = 64;
+
+    if (std::dynamic_pointer_cast< gzip_handle >( fh ))
+        return std::make_shared< cached_handle >( fh, blocksize, capacity );
+
+    char magic[ sizeof(GZIP_MAGIC) ];
+    const auto nread = fh->pread(magic, sizeof(magic), 0);
+    if (nread < std::int64_t(sizeof(magic))) return fh;
+    if (not std::equal(magic, magic + sizeof(magic), GZIP_MAGIC)) return fh;
+
+    auto gz = std::make_shared< gzip_handle >( std::move( fh ) );
+    return std::make_shared< cached_handle >( gz, blocksize, capacity );
+}
+
+#ifdef DLISIO_HAVE_ZLIB
+
+namespace {
+
+constexpr int WINDOW_SIZE = 32768;
+constexpr int CHUNK_SIZE  = 1 << 16;
+
+/* windowBits for inflateInit2 - raw deflate and gzip-wrapped, respectively */
+constexpr int RAW_DEFLATE = -15;
+constexpr int GZIP_STREAM = 15 + 16;
+
+constexpr char INDEX_MAGIC[] = "DLISGZI1";
+
+void put64( std::string& xs, std::int64_t x ) noexcept (false) {
+    for (int i = 0; i < 8; ++i)
+        xs.push_back( char((std::uint64_t(x) >> (8 * i)) & 0xFF) );
+}
+
+std::int64_t get64( const std::string& xs, std::size_t& pos )
+noexcept (false) {
+    if (xs.size() < pos + 8)
+        throw std::invalid_argument("gzip index: unexpected end of index");
+
+    std::uint64_t x = 0;
+    for (int i = 0; i < 8; ++i)
+        x |= std::uint64_t(std::uint8_t(xs[pos + i])) << (8 * i);
+    pos += 8;
+    return std::int64_t(x);
+}
+
+}
+
+struct gzip_handle::inflater {
+    inflater() noexcept (true) : input( CHUNK_SIZE ) {
+        this->strm.zalloc = Z_NULL;
+        this->strm.zfree  = Z_NULL;
+        this->strm.opaque = Z_NULL;
+        this->strm.avail_in  = 0;
+        this->strm.next_in   = Z_NULL;
+        this->strm.avail_out = 0;
+        this->strm.next_out  = Z_NULL;
+    }
+
+    ~inflater() noexcept (true) {
+        if (this->initialized) inflateEnd(&this->strm);
+    }
+
+    void init( int windowbits ) noexcept (false) {
+        const auto err = inflateInit2(&this->strm, windowbits);
+        if (err != Z_OK) {
+            const auto msg = "gzip: unable to initialize inflate: {}";
+            throw io_error(fmt::format(msg, zError(err)));
+        }
+        this->initialized = true;
+    }
+
+    /* Refill the input buffer from the source, returns false at end-of-file */
+    bool fill( handle& source ) noexcept (false) {
+        const auto nread = source.pread(
+            reinterpret_cast< char* >( this->input.data() ),
+            this->input.size(),
+            this->inpos
+        );
+        this->inpos += nread;
+        this->strm.next_in  = this->input.data();
+        this->strm.avail_in = unsigned(nread);
+        return nread > 0;
+    }
+
+    z_stream strm;
+    bool initialized = false;
+    std::vector< unsigned char > input;
+    /* next offset to read from the compressed source */
+    std::int64_t inpos = 0;
+    /* offset of the next byte of uncompressed output */
+    std::int64_t out = 0;
+};
+
+gzip_handle::gzip_handle( std::shared_ptr< handle > source,
+                          std::int64_t spacing )
+noexcept (false)
+    : src( std::move( source ) )
+{
+    if (not this->src)
+        throw std::invalid_argument("gzip_handle: expected source handle");
+
+    if (spacing <= 0) {
+        const auto msg = "gzip_handle: expected spacing (which is {}) > 0";
+        throw std::invalid_argument(fmt::format(msg, spacing));
+    }
+
+    this->build(spacing);
+}
+
+gzip_handle::gzip_handle( std::shared_ptr< handle > source,
+                          const std::string& index )
+noexcept (false)
+    : src( std::move( source ) )
+{
+    if (not this->src)
+        throw std::invalid_argument("gzip_handle: expected source handle");
+
+    const auto magiclen = sizeof(INDEX_MAGIC) - 1;
+    if (index.compare(0, magiclen, INDEX_MAGIC) != 0)
+        throw std::invalid_argument("gzip index: not a dlisio gzip index");
+
+    std::size_t pos = magiclen;
+    this->len = get64(index, pos);
+    const auto count = get64(index, pos);
+    if (count < 1 or this->len < 0)
+        throw std::invalid_argument("gzip index: corrupted header");
+
+    for (std::int64_t i = 0; i < count; ++i) {
+        checkpoint point;
+        point.out  = get64(index, pos);
+        point.in   = get64(index, pos);
+        point.bits = int(get64(index, pos));
+        const auto winsize = get64(index, pos);
+
+        if (point.bits < -1 or point.bits > 7 or winsize < 0
+            or std::size_t(winsize) > index.size() - pos)
+            throw std::invalid_argument("gzip index: corrupted checkpoint");
+
+        point.window.assign(index.begin() + pos,
+                            index.begin() + pos + winsize);
+        pos += winsize;
+
+        if (not this->points.empty() and point.out < this->points.back().out)
+            throw std::invalid_argument("gzip index: checkpoints not sorted");
+
+        this->points.push_back(std::move(point));
+    }
+}
+
+gzip_handle::~gzip_handle() noexcept (true) = default;
+
+std::int64_t gzip_handle::size() const noexcept (true) {
+    return this->len;
+}
+
+std::size_t gzip_handle::checkpoints() const noexcept (true) {
+    return this->points.size();
+}
+
+const std::shared_ptr< handle >& gzip_handle::source() const
+noexcept (true) {
+    return this->src;
+}
+
+std::string gzip_handle::index() const noexcept (false) {
+    std::string xs(INDEX_MAGIC);
+    put64(xs, this->len);
+    put64(xs, this->points.size());
+
+    for (const auto& point : this->points) {
+        put64(xs, point.out);
+        put64(xs, point.in);
+        put64(xs, point.bits);
+        put64(xs, point.window.size());
+        xs.append(point.window.begin(), point.window.end());
+    }
+    return xs;
+}
+
+/*
+ * Decompress the whole file once, and record a checkpoint at the first deflate
+ * block boundary after every spacing bytes of output, and at the start of
+ * every gzip member.
+ */
+void gzip_handle::build( std::int64_t spacing ) noexcept (false) {
+    inflater z;
+    z.init(GZIP_STREAM);
+    auto& strm = z.strm;
+
+    /* the last WINDOW_SIZE bytes of output, as a circular buffer */
+    std::vector< unsigned char > window( WINDOW_SIZE );
+    std::int64_t totin = 0;
+    std::int64_t totout = 0;
+    std::int64_t last = 0;
+
+    this->points.push_back({ 0, 0, -1, {} });
+
+    while (true) {
+        if (strm.avail_in == 0 and not z.fill(*this->src)) {
+            /* truncated - keep what could be decompressed */
+            break;
+        }
+
+        int err;
+        do {
+            if (strm.avail_out == 0) {
+                strm.avail_out = WINDOW_SIZE;
+                strm.next_out = window.data();
+            }
+
+            totin  += strm.avail_in;
+            totout += strm.avail_out;
+            err = ::inflate(&strm, Z_BLOCK);
+            totin  -= strm.avail_in;
+            totout -= strm.avail_out;
+
+            if (err == Z_NEED_DICT) err = Z_DATA_ERROR;
+            if (err == Z_MEM_ERROR or err == Z_DATA_ERROR) {
+                const auto msg = "gzip: {} at compressed offset {}";
+                const auto* what = strm.msg ? strm.msg : zError(err);
+                throw io_error(fmt::format(msg, what, totin));
+            }
+
+            if (err == Z_STREAM_END) break;
+
+            /*
+             * At the end of a deflate block that is not the last block of the
+             * member, which is where decompression can be restarted
+             */
+            const auto atblock = strm.data_type & 128;
+            const auto lastblock = strm.data_type & 64;
+            if (atblock and not lastblock and totout - last > spacing) {
+                checkpoint point;
+                point.out = totout;
+                point.in = totin;
+                point.bits = strm.data_type & 7;
+                point.window.resize(WINDOW_SIZE);
+
+                const auto left = strm.avail_out;
+                auto* dst = point.window.data();
+                std::copy(window.end() - left, window.end(), dst);
+                std::copy(window.begin(), window.end() - left, dst + left);
+
+                this->points.push_back(std::move(point));
+                last = totout;
+            }
+        } while (strm.avail_in != 0);
+
+        if (err != Z_STREAM_END) continue;
+
+        /*
+         * End of a gzip member. Either the file ends, or another member
+         * follows. Anything else, such as zero-padding, is ignored.
+         */
+        char magic[ sizeof(GZIP_MAGIC) ];
+        const auto nread = this->src->pread(magic, sizeof(magic), totin);
+        if (nread < std::int64_t(sizeof(magic))) break;
+        if (not std::equal(magic, magic + sizeof(magic), GZIP_MAGIC)) break;
+
+        inflateReset(&strm);
+        this->points.push_back({ totout, totin, -1, {} });
+        last = totout;
+    }
+
+    this->len = totout;
+}
+
+void gzip_handle::restart( const checkpoint& point ) noexcept (false) {
+    std::unique_ptr< inflater > z( new inflater() );
+    z->out = point.out;
+
+    if (point.bits < 0) {
+        z->init(GZIP_STREAM);
+        z->inpos = point.in;
+    } else {
+        z->init(RAW_DEFLATE);
+        z->inpos = point.in - (point.bits ? 1 : 0);
+
+        if (point.bits) {
+            char ch;
+            if (this->src->pread(&ch, 1, z->inpos) != 1)
+                throw io_error("gzip: unexpected end of compressed file");
+            z->inpos += 1;
+
+            const int bits = std::uint8_t(ch) >> (8 - point.bits);
+            inflatePrime(&z->strm, point.bits, bits);
+        }
+
+        inflateSetDictionary(&z->strm,
+                             point.window.data(),
+                             unsigned(point.window.size()));
+    }
+
+    this->live = std::move(z);
+}
+
+/*
+ * Decompress up to n bytes from the live stream, continuing into the next
+ * gzip member when a member ends
+ */
+std::int64_t gzip_handle::inflate( char* dst, std::int64_t n )
+noexcept (false) {
+    std::int64_t produced = 0;
+    while (produced < n) {
+        auto& z = *this->live;
+        if (z.strm.avail_in == 0 and not z.fill(*this->src)) break;
+
+        const auto want = std::min< std::int64_t >(n - produced, UINT_MAX);
+        z.strm.next_out = reinterpret_cast< unsigned char* >( dst + produced );
+        z.strm.avail_out = unsigned(want);
+
+        auto err = ::inflate(&z.strm, Z_NO_FLUSH);
+        const auto got = want - z.strm.avail_out;
+        produced += got;
+        z.out += got;
+
+        if (err == Z_NEED_DICT) err = Z_DATA_ERROR;
+        if (err == Z_MEM_ERROR or err == Z_DATA_ERROR) {
+            const auto msg = "gzip: {} at uncompressed offset {}";
+            const auto* what = z.strm.msg ? z.strm.msg : zError(err);
+            throw io_error(fmt::format(msg, what, z.out));
+        }
+
+        if (err != Z_STREAM_END) continue;
+
+        /*
+         * Every member starts with a checkpoint. The next member starts
+         * after the compressed data consumed so far, which also rules out
+         * the member that just ended, should it be empty.
+         */
+        const auto out = z.out;
+        const auto consumed = z.inpos - z.strm.avail_in;
+        const auto next = std::find_if(
+            this->points.begin(),
+            this->points.end(),
+            [=]( const checkpoint& p ) {
+                return p.bits < 0 and p.out == out and p.in >= consumed;
+            }
+        );
+        if (next == this->points.end()) break;
+        this->restart(*next);
+    }
+
+    return produced;
+}
+
+std::int64_t gzip_handle::readat( char* dst,
+                                  std::int64_t n,
+                                  std::int64_t offset )
+noexcept (false) {
+    std::lock_guard< std::mutex > guard(this->mtx);
+
+    if (offset >= this->len) return 0;
+    n = std::min(n, this->len - offset);
+
+    /* the last checkpoint at or before offset */
+    const auto itr = std::upper_bound(
+        this->points.begin(),
+        this->points.end(),
+        offset,
+        []( std::int64_t x, const checkpoint& p ) { return x < p.out; }
+    );
+    const auto& point = *(itr - 1);
+
+    /*
+     * Continue the live stream if that's at least as close as the nearest
+     * checkpoint
+     */
+    const bool reuse = this->live
+                   and this->live->out <= offset
+                   and this->live->out >= point.out;
+    if (not reuse) this->restart(point);
+
+    std::vector< char > discard;
+    while (this->live->out < offset) {
+        const auto skip = std::min< std::int64_t >(offset - this->live->out,
+                                                   CHUNK_SIZE);
+        discard.resize(skip);
+        if (this->inflate(discard.data(), skip) < skip) return 0;
+    }
+
+    return this->inflate(dst, n);
+}
+
+#else // DLISIO_HAVE_ZLIB
+
+struct gzip_handle::inflater {};
+
+namespace {
+
+[[noreturn]] void no_zlib() noexcept (false) {
+    throw dl::not_implemented(
+        "gzip: dlisio is built without zlib, "
+        "compressed files are not supported"
+    );
+}
+
+}
+
+gzip_handle::gzip_handle( std::shared_ptr< handle >, std::int64_t )
+noexcept (false) {
+    no_zlib();
+}
+
+gzip_handle::gzip_handle( std::shared_ptr< handle >, const std::string& )
+noexcept (false) {
+    no_zlib();
+}
+
+gzip_handle::~gzip_handle() noexcept (true) = default;
+
+std::int64_t gzip_handle::size() const noexcept (true) {
+    return this->len;
+}
+
+std::size_t gzip_handle::checkpoints() const noexcept (true) {
+    return this->points.size();
+}
+
+std::string gzip_handle::index() const noexcept (false) {
+    no_zlib();
+}
+
+std::int64_t gzip_handle::readat( char*, std::int64_t, std::int64_t )
+noexcept (false) {
+    no_zlib();
+}
+
+#endif // DLISIO_HAVE_ZLIB
+
+}
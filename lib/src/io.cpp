@@ -1,6 +1,11 @@
 #include <algorithm>
 #include <cerrno>
 #include <ciso646>
+#include <cstdio>
+#include <limits>
+#include <memory>
+#include <mutex>
+#include <stdexcept>
 #include <string>
 #include <system_error>
 #include <vector>
@@ -9,6 +14,7 @@
 #include <fmt/core.h>
 #include <fmt/format.h>
 #include <lfp/lfp.h>
+#include <lfp/protocol.hpp>
 #include <lfp/rp66.h>
 #include <lfp/tapeimage.h>
 
@@ -17,25 +23,808 @@
 
 #include <dlisio/ext/io.hpp>
 
+#ifndef _WIN32
+    #include <unistd.h>
+#endif
+
 namespace dl {
 
-stream open(const std::string& path, std::int64_t offset) noexcept (false) {
-    auto* file = std::fopen(path.c_str(), "rb");
+namespace counters {
+
+std::atomic< bool > enabled{ false };
+std::array< std::atomic< std::int64_t >, ncounters > values;
+
+const char* name( counter c ) noexcept (true) {
+    switch (c) {
+        case reads:             return "reads";
+        case bytes_read:        return "bytes_read";
+        case seeks:             return "seeks";
+        case segments_scanned:  return "segments_scanned";
+        case records_scanned:   return "records_scanned";
+        case records_extracted: return "records_extracted";
+        case segments_stitched: return "segments_stitched";
+        case rows_decoded:      return "rows_decoded";
+        default:                return "unknown";
+    }
+}
+
+}
+
+progress::progress( callback fn,
+                    std::int64_t total,
+                    std::chrono::milliseconds interval ) noexcept (false)
+    : fn( std::move( fn ) )
+    , total( total )
+    , every( interval )
+    , last( std::chrono::steady_clock::now() )
+{}
+
+progress::operator bool () const noexcept (true) {
+    return bool(this->fn);
+}
+
+bool progress::due() const noexcept (true) {
+    if (not this->fn) return false;
+    return std::chrono::steady_clock::now() - this->last >= this->every;
+}
+
+std::chrono::milliseconds progress::interval() const noexcept (true) {
+    return this->every;
+}
+
+void progress::update( std::int64_t done ) noexcept (false) {
+    if (this->due()) this->report( done );
+}
+
+void progress::report( std::int64_t done ) noexcept (false) {
+    if (not this->fn) return;
+    this->last = std::chrono::steady_clock::now();
+    if (not this->fn( done, this->total ))
+        throw cancelled( "operation cancelled by progress callback" );
+}
+
+namespace {
+
+/*
+ * Read n bytes from offset, without relying on (or, on posix, moving) the
+ * file position. Returns less than n bytes only at end-of-file.
+ */
+std::int64_t positioned_read( std::FILE* fp,
+                              char* dst,
+                              std::int64_t n,
+                              std::int64_t offset )
+noexcept (false) {
+#ifndef _WIN32
+    const auto fd = fileno(fp);
+    std::int64_t nread = 0;
+    while (nread < n) {
+        const auto x = ::pread(fd, dst + nread, n - nread, offset + nread);
+        if (x == 0) break;
+        if (x < 0) {
+            if (errno == EINTR) continue;
+            throw io_error(errno);
+        }
+        nread += x;
+    }
+    return nread;
+#else
+    if (_fseeki64(fp, offset, SEEK_SET) != 0)
+        throw io_error(errno);
+
+    const auto nread = std::fread(dst, 1, n, fp);
+    if (std::ferror(fp))
+        throw io_error(errno);
+    return nread;
+#endif
+}
+
+/*
+ * Leaf protocol on top of a shared handle
+ *
+ * This is the dlisio equivalent of lfp's cfile, except that the position is
+ * a property of the protocol, not of the underlying file. Many protocol
+ * stacks can then read from the same descriptor without interfering with
+ * each other.
+ */
+class shared_leaf : public lfp_protocol {
+public:
+    shared_leaf( std::shared_ptr< dl::handle > fh, std::int64_t offset )
+        noexcept (true)
+        : handle( std::move( fh ) ), pos( offset )
+    {}
+
+    void close() noexcept (false) override;
+    lfp_status readinto( void* dst, std::int64_t len, std::int64_t* nread )
+        noexcept (false) override;
+    int eof() const noexcept (true) override;
+
+    void seek( std::int64_t ) noexcept (false) override;
+    std::int64_t tell() const noexcept (false) override;
+
+    lfp_protocol* peel() noexcept (false) override;
+    lfp_protocol* peek() const noexcept (false) override;
+
+    void readahead( std::size_t blocksize ) noexcept (false);
+    shared_leaf* clone() const noexcept (false);
+
+private:
+    std::int64_t pread( char* dst, std::int64_t n ) noexcept (false);
+
+    std::shared_ptr< dl::handle > handle;
+    std::int64_t pos;
+    bool at_eof = false;
+
+    /*
+     * Read-ahead buffer, with the file contents [bufpos, bufpos + buf.size()).
+     * Read-ahead is disabled when blocksize is 0.
+     */
+    std::size_t blocksize = 0;
+    std::vector< char > buf;
+    std::int64_t bufpos = 0;
+};
+
+void shared_leaf::close() noexcept (false) {
+    this->handle.reset();
+}
+
+shared_leaf* shared_leaf::clone() const noexcept (false) {
+    if (not this->handle)
+        throw lfp::io_error("shared_leaf: file is closed");
+    return new shared_leaf(this->handle, this->pos);
+}
+
+lfp_status shared_leaf::readinto( void* dst,
+                                  std::int64_t len,
+                                  std::int64_t* bytes_read )
+noexcept (false) {
+    if (not this->handle)
+        throw lfp::io_error("shared_leaf: file is closed");
+
+    auto* out = static_cast< char* >( dst );
+    std::int64_t nread = 0;
+    while (nread < len) {
+        const auto bufend = this->bufpos + std::int64_t(this->buf.size());
+        if (this->bufpos <= this->pos and this->pos < bufend) {
+            const auto n = std::min(len - nread, bufend - this->pos);
+            std::copy_n(this->buf.begin() + (this->pos - this->bufpos),
+                        n,
+                        out + nread);
+            this->pos += n;
+            nread += n;
+            continue;
+        }
+
+        /*
+         * Reads that are at least as large as a block gain nothing from
+         * going through the buffer
+         */
+        const auto left = len - nread;
+        if (left >= std::int64_t(this->blocksize)) {
+            const auto n = this->pread(out + nread, left);
+            this->pos += n;
+            nread += n;
+            break;
+        }
+
+        this->buf.resize(this->blocksize);
+        this->bufpos = this->pos;
+        const auto n = this->pread(this->buf.data(), this->blocksize);
+        this->buf.resize(n);
+        if (n == 0) break;
+    }
+
+    if (bytes_read) *bytes_read = nread;
+
+    if (nread == len) return LFP_OK;
+
+    this->at_eof = true;
+    return LFP_EOF;
+}
+
+std::int64_t shared_leaf::pread( char* dst, std::int64_t n ) noexcept (false) {
+    try {
+        return this->handle->pread( dst, n, this->pos );
+    } catch (const io_error& e) {
+        throw lfp::io_error(e.what());
+    }
+}
+
+/*
+ * Serve small reads from a block of blocksize bytes read ahead of the
+ * current position. Setting blocksize to 0 disables read-ahead and releases
+ * the buffer.
+ *
+ * This only pays off for scans that make many small, mostly sequential reads,
+ * so it's meant to be turned on only while scanning. Bytes in the buffer are
+ * not re-read, so they do not see any later changes to the file.
+ */
+void shared_leaf::readahead( std::size_t n ) noexcept (false) {
+    this->blocksize = n;
+    this->buf.clear();
+    if (n == 0) this->buf.shrink_to_fit();
+    else        this->buf.reserve(n);
+}
+
+int shared_leaf::eof() const noexcept (true) {
+    return this->at_eof;
+}
+
+void shared_leaf::seek( std::int64_t n ) noexcept (false) {
+    if (n < 0) {
+        const auto msg = "seek: expected offset (which is {}) >= 0";
+        throw lfp::invalid_args(fmt::format(msg, n));
+    }
+    this->pos = n;
+    this->at_eof = false;
+}
+
+std::int64_t shared_leaf::tell() const noexcept (false) {
+    return this->pos;
+}
+
+lfp_protocol* shared_leaf::peel() noexcept (false) {
+    throw lfp::leaf_protocol("peel: not supported for leaf protocol");
+}
+
+lfp_protocol* shared_leaf::peek() const noexcept (false) {
+    throw lfp::leaf_protocol("peek: not supported for leaf protocol");
+}
+
+/*
+ * Visible record envelope, with random access through an index
+ *
+ * The visible record envelope interleaves a 4-byte header with the logical
+ * record data every few kilobytes. lfp's rp66 protocol discovers the headers
+ * as it reads, which means seeks into new territory have to walk the visible
+ * record headers.
+ *
+ * This protocol instead builds a complete, sorted table of the logical and
+ * physical offsets of every visible record up front, in a single pass over
+ * the headers only. Any seek is then a binary search plus a single seek on
+ * the underlying protocol, regardless of where in the file it lands. It is
+ * meant for random access to logical files that have already been indexed
+ * (and verified) by findoffsets through lfp's rp66.
+ */
+class rp66_indexed : public lfp_protocol {
+public:
+    rp66_indexed( lfp_protocol* inner, std::int64_t size ) noexcept (false);
+
+    void close() noexcept (false) override;
+    lfp_status readinto( void* dst, std::int64_t len, std::int64_t* nread )
+        noexcept (false) override;
+    int eof() const noexcept (true) override;
+
+    void seek( std::int64_t ) noexcept (false) override;
+    std::int64_t tell() const noexcept (false) override;
+
+    lfp_protocol* peel() noexcept (false) override;
+    lfp_protocol* peek() const noexcept (false) override;
+
+    std::int64_t extend() noexcept (false);
+    rp66_indexed* clone( lfp_protocol* inner ) const noexcept (false);
+
+private:
+    rp66_indexed( lfp_protocol* inner, const rp66_indexed& other )
+        noexcept (false);
+
+    void index( std::int64_t phys,
+                std::int64_t lgcl,
+                std::int64_t size,
+                bool whole ) noexcept (false);
+
+    lfp_protocol* inner;
+
+    /*
+     * logical[i] and physical[i] are the offsets of the first byte of the
+     * body of visible record i. A sentinel is appended, so that the logical
+     * size of the envelope is logical.back().
+     */
+    std::vector< std::int64_t > logical;
+    std::vector< std::int64_t > physical;
+
+    std::int64_t pos = 0;
+    /* the inner position, to skip seeks when reading sequentially */
+    std::int64_t inner_pos = -1;
+    bool at_eof = false;
+};
+
+rp66_indexed::rp66_indexed( lfp_protocol* f, std::int64_t size )
+noexcept (false)
+    : inner( f )
+{
+    std::int64_t phys;
+    const auto err = lfp_tell(this->inner, &phys);
+    if (err != LFP_OK)
+        throw std::runtime_error(lfp_errormsg(this->inner));
+
+    this->index( phys, 0, size, false );
+}
+
+rp66_indexed::rp66_indexed( lfp_protocol* f, const rp66_indexed& other )
+noexcept (false)
+    : inner( f ), logical( other.logical ), physical( other.physical )
+{}
+
+/*
+ * A new protocol with the same index, reading from inner
+ */
+rp66_indexed* rp66_indexed::clone( lfp_protocol* f ) const noexcept (false) {
+    return new rp66_indexed(f, *this);
+}
+
+/*
+ * Index the visible records from the physical offset phys, which maps to the
+ * logical offset lgcl, until at least size bytes of logical data is covered,
+ * or end-of-file. If whole is set, a visible record is only indexed if all of
+ * it is in the file, otherwise it is enough that the header is.
+ */
+void rp66_indexed::index( std::int64_t phys,
+                          std::int64_t lgcl,
+                          std::int64_t size,
+                          bool whole )
+noexcept (false) {
+    while (lgcl < size) {
+        char buffer[ DLIS_VRL_SIZE ];
+        std::int64_t nread;
+        auto err = lfp_seek(this->inner, phys);
+        if (err == LFP_OK)
+            err = lfp_readinto(this->inner, buffer, DLIS_VRL_SIZE, &nread);
+
+        if (err != LFP_OK and err != LFP_EOF)
+            throw std::runtime_error(lfp_errormsg(this->inner));
+        if (nread < DLIS_VRL_SIZE) break;
+
+        int len, version;
+        dlis_vrl(buffer, &len, &version);
+        if (version != 1) {
+            const auto msg = "rp66: Incorrect format version in visible "
+                             "record at (physical) offset {}";
+            throw std::runtime_error(fmt::format(msg, phys));
+        }
+        if (len < DLIS_VRL_SIZE) {
+            const auto msg = "rp66: visible record at (physical) offset {} "
+                             "too short, length (which is {}) < {}";
+            throw std::runtime_error(
+                fmt::format(msg, phys, len, DLIS_VRL_SIZE)
+            );
+        }
+
+        if (whole) {
+            /* a visible record that is still being written ends the index */
+            char last;
+            err = lfp_seek(this->inner, phys + len - 1);
+            if (err == LFP_OK)
+                err = lfp_readinto(this->inner, &last, 1, &nread);
+
+            if (err != LFP_OK and err != LFP_EOF)
+                throw std::runtime_error(lfp_errormsg(this->inner));
+            if (nread < 1) break;
+        }
+
+        this->logical.push_back(lgcl);
+        this->physical.push_back(phys + DLIS_VRL_SIZE);
+        lgcl += len - DLIS_VRL_SIZE;
+        phys += len;
+    }
+
+    this->logical.push_back(lgcl);
+    this->physical.push_back(phys);
+}
+
+/*
+ * Index the visible records appended to the file since it was last indexed,
+ * and return the number of new bytes of logical data. Only complete visible
+ * records are indexed, so that a record that is still being written is
+ * picked up by a later call.
+ */
+std::int64_t rp66_indexed::extend() noexcept (false) {
+    const auto phys = this->physical.back();
+    const auto lgcl = this->logical.back();
+
+    this->logical.pop_back();
+    this->physical.pop_back();
+    const auto n = this->logical.size();
+
+    /* the inner protocol is moved around for the headers */
+    this->inner_pos = -1;
+
+    try {
+        const auto max = std::numeric_limits< std::int64_t >::max();
+        this->index( phys, lgcl, max, true );
+    } catch (...) {
+        this->logical.resize(n);
+        this->physical.resize(n);
+        this->logical.push_back(lgcl);
+        this->physical.push_back(phys);
+        throw;
+    }
+
+    return this->logical.back() - lgcl;
+}
+
+void rp66_indexed::close() noexcept (false) {
+    if (not this->inner) return;
+
+    const auto err = lfp_close(this->inner);
+    this->inner = nullptr;
+    if (err != LFP_OK)
+        throw lfp::io_error("rp66_indexed: unable to close inner protocol");
+}
+
+lfp_status rp66_indexed::readinto( void* dst,
+                                   std::int64_t len,
+                                   std::int64_t* bytes_read )
+noexcept (false) {
+    auto* out = static_cast< char* >( dst );
+    const auto end = this->logical.back();
+
+    std::int64_t total = 0;
+    while (total < len and this->pos < end) {
+        /* the last visible record that starts at or before pos */
+        const auto itr = std::upper_bound(this->logical.begin(),
+                                          this->logical.end(),
+                                          this->pos);
+        const auto i = std::distance(this->logical.begin(), itr) - 1;
+
+        const auto avail = this->logical[i + 1] - this->pos;
+        const auto n = std::min(avail, len - total);
+        const auto target = this->physical[i] + (this->pos - this->logical[i]);
+
+        if (target != this->inner_pos) {
+            this->inner_pos = -1;
+            if (lfp_seek(this->inner, target) != LFP_OK)
+                throw lfp::io_error(lfp_errormsg(this->inner));
+        }
+
+        std::int64_t nread = 0;
+        const auto err = lfp_readinto(this->inner, out + total, n, &nread);
+        this->inner_pos = target + nread;
+        this->pos += nread;
+        total += nread;
+
+        switch (err) {
+            case LFP_OK:
+                break;
+
+            case LFP_EOF: {
+                if (nread == n) break;
+                /*
+                 * The visible record claims more bytes than there are left in
+                 * the file
+                 */
+                if (bytes_read) *bytes_read = total;
+                const auto msg = "rp66: unexpected EOF when reading record "
+                                 "- got {} bytes, expected there to be {} more";
+                throw lfp::unexpected_eof(fmt::format(msg, nread, n - nread));
+            }
+
+            default:
+                throw lfp::io_error(lfp_errormsg(this->inner));
+        }
+    }
+
+    if (bytes_read) *bytes_read = total;
+    if (total == len) return LFP_OK;
+
+    this->at_eof = true;
+    return LFP_EOF;
+}
+
+int rp66_indexed::eof() const noexcept (true) {
+    return this->at_eof;
+}
+
+void rp66_indexed::seek( std::int64_t n ) noexcept (false) {
+    if (n < 0) {
+        const auto msg = "seek: expected offset (which is {}) >= 0";
+        throw lfp::invalid_args(fmt::format(msg, n));
+    }
+    this->pos = n;
+    this->at_eof = false;
+}
+
+std::int64_t rp66_indexed::tell() const noexcept (false) {
+    return this->pos;
+}
+
+lfp_protocol* rp66_indexed::peel() noexcept (false) {
+    auto* f = this->inner;
+    this->inner = nullptr;
+    return f;
+}
+
+lfp_protocol* rp66_indexed::peek() const noexcept (false) {
+    return this->inner;
+}
+
+}
+
+file_handle::file_handle( const std::string& path,
+                          std::shared_ptr< handle_pool > p )
+noexcept (false)
+    : filepath( path ), pool( std::move( p ) )
+{
+    if (this->pool) {
+        std::lock_guard< std::mutex > guard(this->mtx);
+        this->pool->touch(this);
+    } else {
+        this->open();
+    }
+}
+
+file_handle::~file_handle() noexcept (true) {
+    if (this->pool) this->pool->remove(this);
+    this->close();
+}
+
+void file_handle::open() noexcept (false) {
+    auto* file = std::fopen(this->filepath.c_str(), "rb");
     if (!file) {
         auto msg = "unable to open file for path {} : {}";
-        throw dl::io_error(fmt::format(msg, path, strerror(errno)));
+        throw dl::io_error(fmt::format(msg, this->filepath, strerror(errno)));
     }
-    auto* protocol = lfp_cfile(file);
-    if ( protocol == nullptr  )
-        throw io_error("lfp: unable to open lfp protocol cfile");
+    this->fp = file;
+}
 
-    auto err = lfp_seek(protocol, offset);
-    switch (err) {
-            case LFP_OK: break;
-            default:
-                throw io_error(lfp_errormsg(protocol));
+void file_handle::close() noexcept (true) {
+    if (this->fp) std::fclose(this->fp);
+    this->fp = nullptr;
+}
+
+std::int64_t handle::pread( char* dst, std::int64_t n, std::int64_t offset )
+noexcept (false) {
+    if (n < 0 or offset < 0) {
+        const auto msg = "pread: expected n (which is {}) >= 0 "
+                         "and offset (which is {}) >= 0";
+        throw std::invalid_argument(fmt::format(msg, n, offset));
+    }
+
+    const auto nread = this->readat(dst, n, offset);
+    this->nreads += 1;
+    this->nbytes += nread;
+    counters::add(counters::reads);
+    counters::add(counters::bytes_read, nread);
+    return nread;
+}
+
+std::int64_t handle::reads() const noexcept (true) {
+    return this->nreads;
+}
+
+std::int64_t handle::bytes_read() const noexcept (true) {
+    return this->nbytes;
+}
+
+std::int64_t file_handle::readat( char* dst,
+                                  std::int64_t n,
+                                  std::int64_t offset )
+noexcept (false) {
+    /*
+     * Without a pool the descriptor never changes, and pread does not touch
+     * the file position, so reads need no synchronisation. Pooled handles
+     * must be kept from being closed mid-read, and windows has no pread and
+     * falls back to seek + read.
+     */
+#ifndef _WIN32
+    const bool synchronise = bool(this->pool);
+#else
+    const bool synchronise = true;
+#endif
+    std::unique_lock< std::mutex > lock(this->mtx, std::defer_lock);
+    if (synchronise) lock.lock();
+
+    if (this->pool) this->pool->touch(this);
+    return positioned_read(this->fp, dst, n, offset);
+}
+
+const std::string& file_handle::path() const noexcept (true) {
+    return this->filepath;
+}
+
+bool file_handle::isopen() const noexcept (true) {
+    std::lock_guard< std::mutex > guard(this->mtx);
+    return this->fp != nullptr;
+}
+
+handle_pool::handle_pool( std::size_t maxopen ) noexcept (false)
+    : limit( maxopen )
+{
+    if (maxopen == 0)
+        throw std::invalid_argument("handle_pool: expected maxopen > 0");
+}
+
+std::size_t handle_pool::maxopen() const noexcept (true) {
+    return this->limit;
+}
+
+std::size_t handle_pool::size() const noexcept (true) {
+    std::lock_guard< std::mutex > guard(this->mtx);
+    return this->lru.size();
+}
+
+/*
+ * Mark fh as the most recently used handle, opening it if it has been closed.
+ * The caller must hold fh's lock.
+ */
+void handle_pool::touch( file_handle* fh ) noexcept (false) {
+    std::lock_guard< std::mutex > guard(this->mtx);
+
+    if (fh->fp) {
+        auto itr = std::find(this->lru.begin(), this->lru.end(), fh);
+        this->lru.splice(this->lru.begin(), this->lru, itr);
+        return;
+    }
+
+    /*
+     * Make room by closing the least recently used handles. Handles that are
+     * locked are being read from right now, and are skipped. Since this
+     * thread only ever tries to lock other handles, this cannot deadlock.
+     */
+    auto itr = this->lru.end();
+    while (this->lru.size() >= this->limit and itr != this->lru.begin()) {
+        --itr;
+        auto* victim = *itr;
+        std::unique_lock< std::mutex > lock(victim->mtx, std::try_to_lock);
+        if (not lock.owns_lock()) continue;
+
+        victim->close();
+        itr = this->lru.erase(itr);
+    }
+
+    fh->open();
+    this->lru.push_front(fh);
+}
+
+void handle_pool::remove( file_handle* fh ) noexcept (true) {
+    std::lock_guard< std::mutex > guard(this->mtx);
+    this->lru.remove(fh);
+}
+
+memory_handle::memory_handle( const char* xs,
+                              std::int64_t size,
+                              std::shared_ptr< const void > o )
+noexcept (false)
+    : data( xs ), len( size ), owner( std::move( o ) )
+{
+    if (size < 0) {
+        const auto msg = "memory_handle: expected size (which is {}) >= 0";
+        throw std::invalid_argument(fmt::format(msg, size));
+    }
+}
+
+std::int64_t memory_handle::size() const noexcept (true) {
+    return this->len;
+}
+
+std::int64_t memory_handle::readat( char* dst,
+                                    std::int64_t n,
+                                    std::int64_t offset )
+noexcept (false) {
+    if (offset >= this->len) return 0;
+
+    const auto nread = std::min(n, this->len - offset);
+    std::copy_n(this->data + offset, nread, dst);
+    return nread;
+}
+
+cached_handle::cached_handle( std::shared_ptr< handle > source,
+                              std::size_t bsize,
+                              std::size_t cap )
+noexcept (false)
+    : src( std::move( source ) ), blocksize( bsize ), capacity( cap )
+{
+    if (not this->src)
+        throw std::invalid_argument("cached_handle: expected source handle");
+
+    if (bsize == 0 or cap == 0) {
+        const auto msg = "cached_handle: expected blocksize (which is {}) > 0 "
+                         "and capacity (which is {}) > 0";
+        throw std::invalid_argument(fmt::format(msg, bsize, cap));
+    }
+}
+
+const std::shared_ptr< handle >& cached_handle::source() const
+noexcept (true) {
+    return this->src;
+}
+
+/*
+ * The cached block number i, or nullptr if it is not in the cache. Looking up
+ * a block marks it as the most recently used.
+ */
+const std::vector< char >* cached_handle::lookup( std::int64_t i )
+noexcept (false) {
+    const auto itr = this->index.find(i);
+    if (itr == this->index.end()) return nullptr;
+
+    this->blocks.splice(this->blocks.begin(), this->blocks, itr->second);
+    return &itr->second->second;
+}
+
+/*
+ * Read the blocks [first, last) from the source, in a single read
+ */
+void cached_handle::fetch( std::int64_t first, std::int64_t last )
+noexcept (false) {
+    const auto bsize = std::int64_t(this->blocksize);
+    std::vector< char > buffer((last - first) * bsize);
+    const auto nread = this->src->pread(buffer.data(),
+                                        buffer.size(),
+                                        first * bsize);
+
+    for (auto i = first; i < last; ++i) {
+        const auto begin = (i - first) * bsize;
+        if (begin >= nread) break;
+        const auto end = std::min(begin + bsize, nread);
+
+        this->blocks.emplace_front(
+            i,
+            std::vector< char >(buffer.begin() + begin, buffer.begin() + end)
+        );
+        this->index[i] = this->blocks.begin();
+
+        if (this->blocks.size() > this->capacity) {
+            this->index.erase(this->blocks.back().first);
+            this->blocks.pop_back();
         }
-    return stream(protocol);
+    }
+}
+
+std::int64_t cached_handle::readat( char* dst,
+                                    std::int64_t n,
+                                    std::int64_t offset )
+noexcept (false) {
+    std::lock_guard< std::mutex > guard(this->mtx);
+
+    const auto bsize = std::int64_t(this->blocksize);
+    const auto first = offset / bsize;
+    const auto last  = (offset + n + bsize - 1) / bsize;
+
+    /*
+     * Coalesce the reads of consecutive missing blocks. No more blocks than
+     * fit in the cache are fetched at a time, so that the fetched blocks are
+     * not evicted before they're copied out.
+     */
+    std::int64_t nread = 0;
+    for (auto i = first; i < last; ++i) {
+        auto* blk = this->lookup(i);
+        if (not blk) {
+            auto end = i + 1;
+            const auto maxend = i + std::int64_t(this->capacity);
+            while (end < last and end < maxend and not this->index.count(end))
+                ++end;
+
+            this->fetch(i, end);
+            blk = this->lookup(i);
+            if (not blk) break;
+        }
+
+        const auto begin = offset + nread - i * bsize;
+        const auto avail = std::int64_t(blk->size()) - begin;
+        if (avail <= 0) break;
+
+        const auto m = std::min(avail, n - nread);
+        std::copy_n(blk->begin() + begin, m, dst + nread);
+        nread += m;
+
+        /* a partial block means end-of-file */
+        if (std::int64_t(blk->size()) < bsize) break;
+    }
+
+    return nread;
+}
+
+stream open(const std::string& path, std::int64_t offset) noexcept (false) {
+    return open(std::make_shared< file_handle >(path), offset);
+}
+
+stream open(const std::shared_ptr< handle >& fh, std::int64_t offset)
+noexcept (false) {
+    if (offset < 0) {
+        const auto msg = "open: expected offset (which is {}) >= 0";
+        throw io_error(fmt::format(msg, offset));
+    }
+    return stream(new shared_leaf(fh, offset));
 }
 
 stream open_rp66(const stream& f) noexcept (false) {
@@ -50,6 +839,52 @@ stream open_rp66(const stream& f) noexcept (false) {
     return stream(protocol);
 }
 
+stream open_rp66_indexed(const stream& f, std::int64_t size)
+noexcept (false) {
+    auto* protocol = new rp66_indexed(f.protocol(), size);
+    return stream(protocol);
+}
+
+std::int64_t extend_rp66_indexed(stream& f) noexcept (false) {
+    auto* protocol = dynamic_cast< rp66_indexed* >( f.protocol() );
+    if (not protocol)
+        throw std::invalid_argument("extend: stream is not an indexed rp66");
+
+    /*
+     * Records appended to the file are only visible through the leaf, as the
+     * other protocols, like lfp's tapeimage, index the file as they go and
+     * have no notion of it growing
+     */
+    if (not dynamic_cast< shared_leaf* >( protocol->peek() ))
+        throw not_implemented("extend: only supported directly on files");
+
+    return protocol->extend();
+}
+
+namespace {
+
+lfp_protocol* clone_protocol( const lfp_protocol* p ) noexcept (false) {
+    if (auto* leaf = dynamic_cast< const shared_leaf* >( p ))
+        return leaf->clone();
+
+    if (auto* indexed = dynamic_cast< const rp66_indexed* >( p )) {
+        std::unique_ptr< lfp_protocol > inner(
+            clone_protocol( indexed->peek() )
+        );
+        auto* protocol = indexed->clone( inner.get() );
+        inner.release();
+        return protocol;
+    }
+
+    throw not_implemented("clone: protocol does not support cloning");
+}
+
+}
+
+stream clone(const stream& f) noexcept (false) {
+    return stream(clone_protocol(f.protocol()));
+}
+
 stream open_tapeimage(const stream& f) noexcept (false) {
     auto* protocol = lfp_tapeimage_open(f.protocol());
     if ( protocol == nullptr ) {
@@ -212,6 +1047,63 @@ noexcept (false) {
 
 }
 
+namespace {
+
+/*
+ * The inner-most (leaf) protocol of a protocol stack
+ */
+lfp_protocol* innermost( lfp_protocol* outer ) noexcept (false) {
+    lfp_protocol* inner;
+
+    while (true) {
+        auto err = lfp_peek(outer, &inner);
+        switch (err) {
+            case LFP_OK:
+                break;
+            case LFP_LEAF_PROTOCOL:
+                /*
+                 * lfp_peek is not implemented for LEAF protocols
+                 *
+                 * We use this fact as an implicit check that we have reached the
+                 * inner-most protocol.
+                 */
+                return outer;
+            case LFP_IOERROR:
+            default:
+                throw std::runtime_error(lfp_errormsg(outer));
+        }
+        outer = inner;
+    }
+}
+
+/*
+ * Turn on read-ahead for the lifetime of the guard, if the stream supports
+ * it
+ */
+struct readahead_guard {
+    readahead_guard( stream& f, std::size_t blocksize ) noexcept (false)
+        : file( f )
+    {
+        this->file.readahead( blocksize );
+    }
+
+    ~readahead_guard() noexcept (true) {
+        try {
+            this->file.readahead( 0 );
+        } catch (...) {}
+    }
+
+    stream& file;
+};
+
+/*
+ * Block size for read-ahead when scanning. Large enough that the headers of
+ * thousands of small records are served from a single read.
+ */
+constexpr std::size_t SCAN_READAHEAD = 1 << 20;
+
+}
+
 stream::stream( lfp_protocol* f ) noexcept (false){
     this->f = f;
 }
@@ -229,6 +1121,7 @@ int stream::eof() const noexcept (true) {
 }
 
 void stream::seek( std::int64_t offset ) noexcept (false) {
+    counters::add(counters::seeks);
     const auto err = lfp_seek(this->f, offset);
     switch (err) {
         case LFP_OK:
@@ -247,30 +1140,14 @@ std::int64_t stream::tell() const noexcept (true) {
 }
 
 std::int64_t stream::absolute_tell() const noexcept (false) {
-    auto* outer = this->f;
-    lfp_protocol* inner;
+    std::int64_t tell;
+    lfp_tell(innermost(this->f), &tell);
+    return tell;
+}
 
-    while (true) {
-        auto err = lfp_peek(outer, &inner);
-        switch (err) {
-            case LFP_OK:
-                break;
-            case LFP_LEAF_PROTOCOL:
-                /*
-                 * lfp_peek is not implemented for LEAF protocols
-                 *
-                 * We use this fact as an implicit check that we have reached the
-                 * inner-most protocol.
-                 */
-                std::int64_t tell;
-                lfp_tell(outer, &tell);
-                return tell;
-            case LFP_IOERROR:
-            default:
-                throw std::runtime_error(lfp_errormsg(outer));
-        }
-        outer = inner;
-    }
+void stream::readahead( std::size_t blocksize ) noexcept (false) {
+    auto* leaf = dynamic_cast< shared_leaf* >( innermost(this->f) );
+    if (leaf) leaf->readahead(blocksize);
 }
 
 std::int64_t stream::read( char* dst, int n )
@@ -371,6 +1248,9 @@ record& extract(stream& file, long long tell, long long bytes, record& rec) noex
         const long long bytes_left = bytes - rec.data.size();
         if (has_successor and bytes_left > 0) continue;
 
+        counters::add(counters::records_extracted);
+        counters::add(counters::segments_stitched, attributes.size() - 1);
+
         /*
          * The record type only cares about encryption and formatting, so only
          * extract those for checking consistency. Nothing else is interesting
@@ -388,9 +1268,16 @@ record& extract(stream& file, long long tell, long long bytes, record& rec) noex
     }
 }
 
-stream_offsets findoffsets( dl::stream& file) noexcept (false) {
+stream_offsets findoffsets( dl::stream& file, progress report )
+noexcept (false) {
     stream_offsets ofs;
 
+    /*
+     * Only the 4-byte header of every logical record segment is read, which
+     * without read-ahead means one read from the file for every segment
+     */
+    readahead_guard guard(file, SCAN_READAHEAD);
+
     std::int64_t offset = 0;
     char buffer[ DLIS_LRSH_SIZE ];
 
@@ -401,6 +1288,9 @@ stream_offsets findoffsets( dl::stream& file) noexcept (false) {
         if (file.eof())
             break;
 
+        /* the progress is measured in bytes of the underlying file */
+        if (report.due()) report.report( file.absolute_tell() );
+
         int type;
         std::uint8_t attrs;
         dlis_lrsh( buffer, &len, &attrs, &type );
@@ -409,6 +1299,7 @@ stream_offsets findoffsets( dl::stream& file) noexcept (false) {
                        "but was {}";
             throw std::runtime_error(fmt::format(msg, len));
         }
+        counters::add(counters::segments_scanned);
 
         int isexplicit = attrs & DLIS_SEGATTR_EXFMTLR;
         if (not (attrs & DLIS_SEGATTR_PREDSEG)) {
@@ -423,6 +1314,7 @@ stream_offsets findoffsets( dl::stream& file) noexcept (false) {
                 file.seek( offset );
                 break;
             }
+            counters::add(counters::records_scanned);
             if (isexplicit) ofs.explicits.push_back( offset );
             /*
              * Consider doing fdata-indexing on the fly as we are now at the
@@ -434,11 +1326,73 @@ stream_offsets findoffsets( dl::stream& file) noexcept (false) {
         }
         offset += len;
     }
+
+    if (report) report.report( file.absolute_tell() );
+    return ofs;
+}
+
+stream_offsets findappended( dl::stream& file, long long tell )
+noexcept (false) {
+    stream_offsets ofs;
+    ofs.tell = tell;
+
+    readahead_guard guard(file, SCAN_READAHEAD);
+
+    /*
+     * Unlike findoffsets, the file can end in the middle of a logical record
+     * when it is still being written. Offsets are only recorded when the last
+     * segment of the record is found, and the next scan resumes at the first
+     * incomplete record.
+     */
+    std::int64_t offset = tell;
+    std::int64_t start = -1;
+    int isexplicit = 0;
+    char buffer[ DLIS_LRSH_SIZE ];
+
+    while (true) {
+        file.seek(offset);
+        const auto nread = file.read(buffer, DLIS_LRSH_SIZE);
+        if (nread < DLIS_LRSH_SIZE)
+            break;
+
+        int len, type;
+        std::uint8_t attrs;
+        dlis_lrsh( buffer, &len, &attrs, &type );
+        if (len < 4) {
+            auto msg = "Too short logical record. Length can't be less than 4, "
+                       "but was {}";
+            throw std::runtime_error(fmt::format(msg, len));
+        }
+        counters::add(counters::segments_scanned);
+
+        if (not (attrs & DLIS_SEGATTR_PREDSEG)) {
+            isexplicit = attrs & DLIS_SEGATTR_EXFMTLR;
+            /* a new FILE-HEADER means the next logical file has started */
+            if (isexplicit and type == 0) {
+                ofs.complete = true;
+                break;
+            }
+            start = offset;
+        }
+
+        offset += len;
+        if (attrs & DLIS_SEGATTR_SUCCSEG) continue;
+
+        if (start >= 0) {
+            counters::add(counters::records_scanned);
+            if (isexplicit) ofs.explicits.push_back( start );
+            else            ofs.implicits.push_back( start );
+        }
+        start = -1;
+        ofs.tell = offset;
+    }
     return ofs;
 }
 
 std::map< dl::ident, std::vector< long long > >
-findfdata(dl::stream& file, const std::vector< long long >& tells)
+findfdata(dl::stream& file,
+          const std::vector< long long >& tells,
+          progress report)
 noexcept (false) {
     std::map< dl::ident, std::vector< long long > > xs;
 
@@ -447,7 +1401,11 @@ noexcept (false) {
     record rec;
     rec.data.reserve( OBNAME_SIZE_MAX );
 
-    for (auto tell : tells) {
+    readahead_guard guard(file, SCAN_READAHEAD);
+    for (std::size_t i = 0; i < tells.size(); ++i) {
+        const auto tell = tells[i];
+        report.update(i);
+
         extract(file, tell, OBNAME_SIZE_MAX, rec);
         if (rec.isencrypted()) continue;
         if (rec.type != 0) continue;
@@ -470,6 +1428,8 @@ noexcept (false) {
 
         xs[tmp.fingerprint("FRAME")].push_back( tell );
     }
+
+    report.report(tells.size());
     return xs;
 }
 
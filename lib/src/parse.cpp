@@ -2,7 +2,9 @@
 #include <bitset>
 #include <cstdlib>
 #include <cstring>
+#include <set>
 #include <string>
+#include <tuple>
 #include <ciso646>
 
 #include <fmt/core.h>
@@ -1073,4 +1075,50 @@ noexcept (false) {
     return objs;
 }
 
+namespace {
+
+using object_key = std::tuple< dl::ident, dl::ident, std::int32_t, int >;
+
+object_key fingerprint_key(const dl::ident& type, const dl::obname& name)
+noexcept (false) {
+    return object_key( type,
+                       name.id,
+                       dl::decay(name.origin),
+                       dl::decay(name.copy) );
+}
+
+}
+
+std::size_t pool::count(const std::string& type,
+                        const dl::matcher& m)
+noexcept (false) {
+    std::set< object_key > seen;
+
+    for (auto& eflr : this->eflrs) {
+        if (not m.match(dl::ident{type}, eflr.type)) continue;
+
+        for (const auto& obj : eflr.objects())
+            seen.insert( fingerprint_key(obj.type, obj.object_name) );
+    }
+    return seen.size();
+}
+
+std::map< dl::ident, std::size_t > pool::counts() noexcept (false) {
+    std::set< object_key > seen;
+
+    for (auto& eflr : this->eflrs) {
+        for (const auto& obj : eflr.objects())
+            seen.insert( fingerprint_key(obj.type, obj.object_name) );
+    }
+
+    std::map< dl::ident, std::size_t > counts;
+    for (const auto& eflr : this->eflrs)
+        counts[eflr.type] = 0;
+
+    for (const auto& key : seen)
+        ++counts[std::get< 0 >(key)];
+
+    return counts;
+}
+
 }
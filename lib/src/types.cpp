@@ -424,6 +424,260 @@ const char* dlis_units( const char* xs, std::int32_t* len, char* out ) {
     return xs + ln;
 }
 
+/*
+ * array functions
+ *
+ * These produce exactly the same values as the single-value functions, but
+ * the loop bodies are kept free of branches, table lookups and calls into
+ * libm, so that compilers are able to vectorize them. Floats are built
+ * directly from their bit patterns where the single-value functions use
+ * std::pow.
+ */
+
+namespace {
+
+template< std::size_t N > struct uint_of {};
+template<> struct uint_of< 2 > { using type = std::uint16_t; };
+template<> struct uint_of< 4 > { using type = std::uint32_t; };
+template<> struct uint_of< 8 > { using type = std::uint64_t; };
+
+/*
+ * Byte swap through the unsigned integer of the same size, which is what
+ * the compilers vectorize, also for floats
+ */
+template< typename T >
+const char* swapped_array( const char* xs, int n, T* out ) noexcept {
+    using U = typename uint_of< sizeof( T ) >::type;
+
+    for( int i = 0; i < n; ++i ) {
+        U u;
+        std::memcpy( &u, xs + i * sizeof( U ), sizeof( U ) );
+        u = ntoh( u );
+        std::memcpy( out + i, &u, sizeof( U ) );
+    }
+
+    return xs + n * sizeof( T );
+}
+
+template< typename T >
+const char* copied_array( const char* xs, int n, T* out ) noexcept {
+    static_assert( sizeof( T ) == 1, "copied_array is for single bytes" );
+    std::memcpy( out, xs, n );
+    return xs + n;
+}
+
+}
+
+const char* dlis_sshort_array( const char* xs, int n, std::int8_t* out ) {
+    return copied_array( xs, n, out );
+}
+
+const char* dlis_snorm_array( const char* xs, int n, std::int16_t* out ) {
+    return swapped_array( xs, n, out );
+}
+
+const char* dlis_slong_array( const char* xs, int n, std::int32_t* out ) {
+    return swapped_array( xs, n, out );
+}
+
+const char* dlis_ushort_array( const char* xs, int n, std::uint8_t* out ) {
+    return copied_array( xs, n, out );
+}
+
+const char* dlis_unorm_array( const char* xs, int n, std::uint16_t* out ) {
+    return swapped_array( xs, n, out );
+}
+
+const char* dlis_ulong_array( const char* xs, int n, std::uint32_t* out ) {
+    return swapped_array( xs, n, out );
+}
+
+const char* dlis_fshort_array( const char* xs, int n, float* out ) {
+    for( int i = 0; i < n; ++i ) {
+        std::uint16_t v;
+        std::memcpy( &v, xs + i * sizeof( v ), sizeof( v ) );
+        v = ntoh( v );
+
+        /*
+         * The upper 12 bits are the fraction in two's complement, and the
+         * value is fraction / 2^11 * 2^exp. 2^(exp - 11) is always a normal
+         * float, so it is made directly from its bits.
+         */
+        const std::int32_t frac = std::int16_t( v & 0xFFF0 ) >> 4;
+        const std::uint32_t scalebits = ((v & 0x000F) + 127 - 11) << 23;
+
+        float scale;
+        std::memcpy( &scale, &scalebits, sizeof( scale ) );
+        out[ i ] = float( frac ) * scale;
+    }
+
+    return xs + n * DLIS_SIZEOF_FSHORT;
+}
+
+const char* dlis_fsingl_array( const char* xs, int n, float* out ) {
+    return swapped_array( xs, n, out );
+}
+
+const char* dlis_fdoubl_array( const char* xs, int n, double* out ) {
+    return swapped_array( xs, n, out );
+}
+
+const char* dlis_isingl_array( const char* xs, int n, float* out ) {
+    static const std::uint32_t ieeemax = 0x7FFFFFFF;
+    static const std::uint32_t iemaxib = 0x611FFFFF;
+    static const std::uint32_t ieminib = 0x21200000;
+
+    for( int i = 0; i < n; ++i ) {
+        std::uint32_t u;
+        std::memcpy( &u, xs + i * sizeof( u ), sizeof( u ) );
+        u = ntoh( u );
+
+        /*
+         * Same as dlis_isingl, but the lookup tables are computed. k is the
+         * number of leading zero bits (at most 3) in the first hex digit of
+         * the mantissa, i.e. the shift that normalises it, and
+         *
+         *  it[ix] = 0x20c00000 + k * 0x00400000
+         *  mt[ix] = 2^k
+         *
+         * The multiplication by mt[ix] is done as one conditional doubling
+         * for each of the terms of k, as not all vector instruction sets can
+         * shift or multiply by a per-element amount.
+         */
+        std::uint32_t manthi = u & 0x00FFFFFF;
+        const std::uint32_t ix = manthi >> 21;
+        const std::uint32_t k = (ix < 1) + (ix < 2) + (ix < 4);
+        const std::uint32_t iexp =
+            ( ( u & 0x7f000000 ) - ( 0x20c00000 + ( k << 22 ) ) ) << 1;
+
+        manthi = ( ix < 4 ) ? manthi << 1 : manthi;
+        manthi = ( ix < 2 ) ? manthi << 1 : manthi;
+        manthi = ( ix < 1 ) ? manthi << 1 : manthi;
+        manthi = manthi + iexp;
+        const std::uint32_t inabs = u & 0x7FFFFFFF;
+        manthi = ( inabs > iemaxib ) ? ieeemax : manthi;
+        manthi = manthi | ( u & 0x80000000 );
+        u = ( inabs < ieminib ) ? 0 : manthi;
+
+        std::memcpy( out + i, &u, sizeof( u ) );
+    }
+
+    return xs + n * DLIS_SIZEOF_ISINGL;
+}
+
+const char* dlis_vsingl_array( const char* xs, int n, float* out ) {
+    for( int i = 0; i < n; ++i ) {
+        /*
+         * Two little-endian halves, the most significant first, which is the
+         * little-endian word with its halves swapped
+         */
+        std::uint32_t x;
+        std::memcpy( &x, xs + i * sizeof( x ), sizeof( x ) );
+        x = le32toh( x );
+
+        const std::uint32_t v = ( x << 16 ) | ( x >> 16 );
+
+        const std::uint32_t sign_bit = v & 0x80000000;
+        const std::uint32_t frac_bits = v & 0x007FFFFF;
+        const std::uint32_t exp_bits = (v & 0x7F800000) >> 23;
+
+        /*
+         * The value is 0.1m * 2^(e - 128), computed like dlis_vsingl does,
+         * but with both factors made from their bits. 0.1m is the IEEE float
+         * 1.m * 2^-1, and 2^(e - 128) is a normal float for e >= 2, and the
+         * denormal 2^-127 for e = 1.
+         *
+         * e = 0 is zero when positive, undefined when negative, which is
+         * what the multiplication gives when the scale is 0 or NaN.
+         */
+        const std::uint32_t significandbits = sign_bit | 0x3F000000 | frac_bits;
+        const std::uint32_t zerobits = sign_bit ? 0x7FC00000 : 0;
+        const std::uint32_t tinybits = exp_bits ? 0x00400000 : zerobits;
+        const std::uint32_t scalebits = ( exp_bits >= 2 )
+                                      ? ( exp_bits - 1 ) << 23
+                                      : tinybits;
+
+        float significand;
+        float scale;
+        std::memcpy( &significand, &significandbits, sizeof( significand ) );
+        std::memcpy( &scale, &scalebits, sizeof( scale ) );
+        out[ i ] = significand * scale;
+    }
+
+    return xs + n * DLIS_SIZEOF_VSINGL;
+}
+
+const char* dlis_fsing1_array( const char* xs, int n, float* out ) {
+    return swapped_array( xs, 2 * n, out );
+}
+
+const char* dlis_fsing2_array( const char* xs, int n, float* out ) {
+    return swapped_array( xs, 3 * n, out );
+}
+
+const char* dlis_csingl_array( const char* xs, int n, float* out ) {
+    return swapped_array( xs, 2 * n, out );
+}
+
+const char* dlis_fdoub1_array( const char* xs, int n, double* out ) {
+    return swapped_array( xs, 2 * n, out );
+}
+
+const char* dlis_fdoub2_array( const char* xs, int n, double* out ) {
+    return swapped_array( xs, 3 * n, out );
+}
+
+const char* dlis_cdoubl_array( const char* xs, int n, double* out ) {
+    return swapped_array( xs, 2 * n, out );
+}
+
+const char* dlis_status_array( const char* xs, int n, std::uint8_t* out ) {
+    return copied_array( xs, n, out );
+}
+
+const char* dlis_decode_array( int reprc, const char* xs, int n, void* dst ) {
+    switch( reprc ) {
+        case DLIS_FSHORT:
+            return dlis_fshort_array( xs, n, static_cast< float* >( dst ) );
+        case DLIS_FSINGL:
+            return dlis_fsingl_array( xs, n, static_cast< float* >( dst ) );
+        case DLIS_FSING1:
+            return dlis_fsing1_array( xs, n, static_cast< float* >( dst ) );
+        case DLIS_FSING2:
+            return dlis_fsing2_array( xs, n, static_cast< float* >( dst ) );
+        case DLIS_ISINGL:
+            return dlis_isingl_array( xs, n, static_cast< float* >( dst ) );
+        case DLIS_VSINGL:
+            return dlis_vsingl_array( xs, n, static_cast< float* >( dst ) );
+        case DLIS_FDOUBL:
+            return dlis_fdoubl_array( xs, n, static_cast< double* >( dst ) );
+        case DLIS_FDOUB1:
+            return dlis_fdoub1_array( xs, n, static_cast< double* >( dst ) );
+        case DLIS_FDOUB2:
+            return dlis_fdoub2_array( xs, n, static_cast< double* >( dst ) );
+        case DLIS_CSINGL:
+            return dlis_csingl_array( xs, n, static_cast< float* >( dst ) );
+        case DLIS_CDOUBL:
+            return dlis_cdoubl_array( xs, n, static_cast< double* >( dst ) );
+        case DLIS_SSHORT:
+            return dlis_sshort_array( xs, n, static_cast< std::int8_t* >( dst ) );
+        case DLIS_SNORM:
+            return dlis_snorm_array( xs, n, static_cast< std::int16_t* >( dst ) );
+        case DLIS_SLONG:
+            return dlis_slong_array( xs, n, static_cast< std::int32_t* >( dst ) );
+        case DLIS_USHORT:
+            return dlis_ushort_array( xs, n, static_cast< std::uint8_t* >( dst ) );
+        case DLIS_UNORM:
+            return dlis_unorm_array( xs, n, static_cast< std::uint16_t* >( dst ) );
+        case DLIS_ULONG:
+            return dlis_ulong_array( xs, n, static_cast< std::uint32_t* >( dst ) );
+        case DLIS_STATUS:
+            return dlis_status_array( xs, n, static_cast< std::uint8_t* >( dst ) );
+        default:
+            return nullptr;
+    }
+}
+
 /*
  * output functions
  */
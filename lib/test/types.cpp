@@ -1,12 +1,15 @@
 #include <algorithm>
 #include <array>
+#include <cmath>
 #include <cstdint>
 #include <cstring>
 #include <initializer_list>
 #include <iomanip>
 #include <limits>
+#include <random>
 #include <sstream>
 #include <string>
+#include <vector>
 
 #include <catch2/catch.hpp>
 
@@ -1550,3 +1553,171 @@ TEST_CASE( "size-of", "[type]" ) {
     CHECK( dlis_sizeof_type( DLIS_STATUS ) == 1 );
     CHECK( dlis_sizeof_type( DLIS_UNITS  ) == 0 );
 }
+
+namespace {
+
+template< typename T >
+bool same_value( T lhs, T rhs ) {
+    if( std::isnan( double( lhs ) ) ) return std::isnan( double( rhs ) );
+    return std::memcmp( &lhs, &rhs, sizeof( T ) ) == 0;
+}
+
+/*
+ * Parse the same bytes with the array function and, one by one, with the
+ * single-value function, and check that they agree
+ */
+template< typename T, typename Single, typename Array >
+void check_array( const std::vector< char >& src,
+                  int components,
+                  Single single,
+                  Array array ) {
+    const int size = components * sizeof( T );
+    const int n = src.size() / size;
+    std::vector< T > expected( n * components );
+    std::vector< T > result( n * components );
+
+    const char* xs = src.data();
+    for( int i = 0; i < n * components; ++i )
+        xs = single( xs, &expected[ i ] );
+
+    const char* end = array( src.data(), n, result.data() );
+    CHECK( end == xs );
+
+    for( int i = 0; i < n * components; ++i ) {
+        INFO( "value " << i );
+        CHECK( same_value( expected[ i ], result[ i ] ) );
+    }
+}
+
+}
+
+TEST_CASE( "array functions give same values as single", "[type]" ) {
+    /*
+     * Random bytes, followed by hand-picked values that hit the edge cases,
+     * such as the smallest exponents and zero/undefined of vax floats, and
+     * every normalisation shift in ibm floats
+     */
+    std::vector< char > src( 4080 );
+    std::mt19937 rng( 1234 );
+    for( auto& x : src ) x = char( rng() );
+
+    const std::array< bytes< 4 >, 12 > special = {{
+        { 0x00, 0x00, 0x00, 0x00 },
+        { 0x00, 0x80, 0x00, 0x00 },
+        { 0x00, 0x80, 0x01, 0x00 },
+        { 0x00, 0x00, 0xF3, 0xFF },
+        { 0x80, 0x00, 0x00, 0x00 },
+        { 0x80, 0x80, 0xFF, 0xFF },
+        { 0x00, 0x01, 0x00, 0x00 },
+        { 0x7F, 0x01, 0xFF, 0xFF },
+        { 0x42, 0x19, 0x00, 0x00 },
+        { 0x42, 0x39, 0x00, 0x00 },
+        { 0x42, 0x79, 0x00, 0x00 },
+        { 0xC2, 0xF9, 0x00, 0x00 },
+    }};
+
+    for( const auto& x : special )
+        src.insert( src.end(), x.data, x.data + sizeof( x.data ) );
+
+    /* every value size divides the total */
+    REQUIRE( src.size() % 24 == 0 );
+
+    SECTION( "sshort" ) {
+        check_array< std::int8_t >( src, 1, dlis_sshort, dlis_sshort_array );
+    }
+
+    SECTION( "snorm" ) {
+        check_array< std::int16_t >( src, 1, dlis_snorm, dlis_snorm_array );
+    }
+
+    SECTION( "slong" ) {
+        check_array< std::int32_t >( src, 1, dlis_slong, dlis_slong_array );
+    }
+
+    SECTION( "ushort" ) {
+        check_array< std::uint8_t >( src, 1, dlis_ushort, dlis_ushort_array );
+    }
+
+    SECTION( "unorm" ) {
+        check_array< std::uint16_t >( src, 1, dlis_unorm, dlis_unorm_array );
+    }
+
+    SECTION( "ulong" ) {
+        check_array< std::uint32_t >( src, 1, dlis_ulong, dlis_ulong_array );
+    }
+
+    SECTION( "fshort" ) {
+        check_array< float >( src, 1, dlis_fshort, dlis_fshort_array );
+    }
+
+    SECTION( "fsingl" ) {
+        check_array< float >( src, 1, dlis_fsingl, dlis_fsingl_array );
+    }
+
+    SECTION( "fdoubl" ) {
+        check_array< double >( src, 1, dlis_fdoubl, dlis_fdoubl_array );
+    }
+
+    SECTION( "isingl" ) {
+        check_array< float >( src, 1, dlis_isingl, dlis_isingl_array );
+    }
+
+    SECTION( "vsingl" ) {
+        check_array< float >( src, 1, dlis_vsingl, dlis_vsingl_array );
+    }
+
+    SECTION( "fsing1" ) {
+        check_array< float >( src, 2, dlis_fsingl, dlis_fsing1_array );
+    }
+
+    SECTION( "fsing2" ) {
+        check_array< float >( src, 3, dlis_fsingl, dlis_fsing2_array );
+    }
+
+    SECTION( "csingl" ) {
+        check_array< float >( src, 2, dlis_fsingl, dlis_csingl_array );
+    }
+
+    SECTION( "fdoub1" ) {
+        check_array< double >( src, 2, dlis_fdoubl, dlis_fdoub1_array );
+    }
+
+    SECTION( "fdoub2" ) {
+        check_array< double >( src, 3, dlis_fdoubl, dlis_fdoub2_array );
+    }
+
+    SECTION( "cdoubl" ) {
+        check_array< double >( src, 2, dlis_fdoubl, dlis_cdoubl_array );
+    }
+
+    SECTION( "status" ) {
+        check_array< std::uint8_t >( src, 1, dlis_status, dlis_status_array );
+    }
+}
+
+TEST_CASE( "decode-array dispatches on representation code", "[type]" ) {
+    const bytes< 8 > in = { 0x40, 0x49, 0x0F, 0xDB, 0xC2, 0x99, 0x00, 0x00 };
+
+    SECTION( "fixed-size types" ) {
+        float v[ 2 ];
+        const char* end = dlis_decode_array( DLIS_FSINGL, in, 2, v );
+        CHECK( v[ 0 ] == Approx( 3.1415927 ) );
+        CHECK( v[ 1 ] == -76.5 );
+        CHECK( end == in + 8 );
+
+        std::int32_t w[ 2 ];
+        end = dlis_decode_array( DLIS_SLONG, in, 2, w );
+        CHECK( w[ 0 ] == 0x40490FDB );
+        CHECK( end == in + 8 );
+    }
+
+    SECTION( "variable-size types are not supported" ) {
+        char dst[ 8 ];
+        CHECK( dlis_decode_array( DLIS_UVARI,  in, 1, dst ) == nullptr );
+        CHECK( dlis_decode_array( DLIS_IDENT,  in, 1, dst ) == nullptr );
+        CHECK( dlis_decode_array( DLIS_ASCII,  in, 1, dst ) == nullptr );
+        CHECK( dlis_decode_array( DLIS_DTIME,  in, 1, dst ) == nullptr );
+        CHECK( dlis_decode_array( DLIS_OBNAME, in, 1, dst ) == nullptr );
+        CHECK( dlis_decode_array( DLIS_UNITS,  in, 1, dst ) == nullptr );
+    }
+}
@@ -0,0 +1,65 @@
+#!/usr/bin/env python3
+"""
+Memory and construction time of the plumbing objects
+
+Constructs a large number of objects the same way dlis.promote does, and
+reports the time and the memory it takes. Files with 50k+ objects, such as
+per-depth PARAMETERs and huge MESSAGE logs, are not uncommon.
+
+Usage:
+
+    python benchmarks/objects.py [count]
+"""
+import sys
+import timeit
+import tracemalloc
+
+from dlisio import core
+from dlisio.plumbing import Channel, Parameter, Message
+
+def construct(cls, names):
+    # Share the attic between objects, like the core.basic_object that
+    # dlis.promote passes, so that only the python object itself is measured
+    attic = {}
+    return [cls(attic, name = name) for name in names]
+
+def measure(cls, count):
+    names = [core.obname(10, 0, 'OBJ{}'.format(i)) for i in range(count)]
+
+    repeat = 10
+    seconds = min(timeit.repeat(
+        lambda: construct(cls, names),
+        number = 1,
+        repeat = repeat,
+    ))
+
+    tracemalloc.start()
+    before, _ = tracemalloc.get_traced_memory()
+    objs = construct(cls, names)
+    after, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    # Resolve the lazily computed names too, which is what e.g. describe()
+    # and object lookup by name do
+    resolve = min(timeit.repeat(
+        lambda: [obj.name for obj in construct(cls, names)],
+        number = 1,
+        repeat = repeat,
+    ))
+
+    return seconds, resolve, (after - before) / len(objs)
+
+def main(count):
+    header = '{:<10} {:>10} {:>14} {:>14} {:>12}'
+    row    = '{:<10} {:>10} {:>14.2f} {:>14.2f} {:>12.1f}'
+    print(header.format('type', 'count', 'construct ms', 'with name ms',
+                        'bytes/obj'))
+
+    for cls in (Channel, Parameter, Message):
+        seconds, resolve, size = measure(cls, count)
+        print(row.format(cls.__name__, count, seconds * 1000, resolve * 1000,
+                         size))
+
+if __name__ == '__main__':
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 50000
+    main(count)
@@ -0,0 +1,75 @@
+#!/usr/bin/env python3
+"""
+Random access into the logical records of a file
+
+Extracts the logical records of the first logical file in random order, with
+the records grouped by their position in the file, through both lfp's rp66
+protocol and dlisio's indexed visible records. With the index, the cost of
+a seek should not depend on where in the file it lands.
+
+Usage:
+
+    python benchmarks/seek.py path [buckets]
+"""
+import random
+import sys
+import timeit
+
+from dlisio import core
+
+def openlf(path):
+    stream = core.open(path)
+    try:
+        offset = core.findvrl(stream, 0)
+    except RuntimeError:
+        stream.close()
+        raise
+
+    stream.seek(offset)
+    return offset, core.open_rp66(stream)
+
+def measure(stream, tells):
+    repeat = 5
+    seconds = min(timeit.repeat(
+        lambda: core.extract(stream, tells),
+        number = 1,
+        repeat = repeat,
+    ))
+    return seconds / len(tells)
+
+def main(path, buckets):
+    offset, stream = openlf(path)
+    try:
+        explicits, implicits = core.findoffsets(stream)
+        size = stream.tell
+    finally:
+        stream.close()
+
+    tells = sorted(explicits + implicits)
+    chunk = max(1, len(tells) // buckets)
+    groups = [tells[i:i + chunk] for i in range(0, len(tells), chunk)]
+    for group in groups:
+        random.shuffle(group)
+
+    _, rp66 = openlf(path)
+    indexed = core.open_rp66_indexed(core.open(path, offset), size)
+
+    header = '{:>8} {:>14} {:>10} {:>14} {:>14}'
+    row    = '{:>8} {:>14} {:>10} {:>14.2f} {:>14.2f}'
+    print(header.format('bucket', 'first tell', 'records', 'rp66 us/rec',
+                        'indexed us/rec'))
+    try:
+        for i, group in enumerate(groups):
+            lfp = measure(rp66, group)
+            idx = measure(indexed, group)
+            print(row.format(i, min(group), len(group), lfp * 1e6, idx * 1e6))
+    finally:
+        rp66.close()
+        indexed.close()
+
+if __name__ == '__main__':
+    if len(sys.argv) < 2:
+        sys.exit('usage: {} path [buckets]'.format(sys.argv[0]))
+
+    buckets = int(sys.argv[2]) if len(sys.argv) > 2 else 10
+    main(sys.argv[1], buckets)
@@ -0,0 +1,127 @@
+#!/usr/bin/env python3
+"""
+Throughput and memory of each stage of reading a file
+
+Runs the stages of reading a file one by one, and reports the time, the
+throughput and the peak memory of each. The stages are:
+
+    load          dlisio.load, i.e. indexing and parsing the metadata
+    parse_objects core.parse_objects of the explicit (metadata) records
+    pool.get      lookup of objects by name, like dlis.object does
+    promote       making plumbing objects, like dlis[type] does
+    read_fdata    Frame.curves for every frame
+
+Without a path, a synthetic file is generated (see synthetic.py) and removed
+afterwards. Peak memory is what tracemalloc sees, which is the python objects
+and numpy arrays, but not the allocations made by the C++ core.
+
+Usage:
+
+    python benchmarks/stages.py [path]
+"""
+import os
+import sys
+import tempfile
+import timeit
+import tracemalloc
+
+import dlisio
+from dlisio import core
+from dlisio.plumbing import exact_matcher
+
+import synthetic
+
+def measure(fn, repeat):
+    seconds = min(timeit.repeat(fn, number = 1, repeat = repeat))
+
+    tracemalloc.start()
+    fn()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    return seconds, peak
+
+def load(path):
+    with dlisio.load(path):
+        pass
+
+def extract(f):
+    return core.extract(f.file, f.explicits)
+
+def lookup(f, names):
+    matcher = exact_matcher()
+    for objtype, name in names:
+        f.object_pool.get(objtype, name, matcher)
+
+def promote(f):
+    return [f[objtype] for objtype in f.object_pool.types]
+
+def curves(f):
+    return [frame.curves() for frame in f.frames]
+
+def main(path, repeat = 3):
+    mb = 1024 * 1024
+    header = '{:<14} {:>12} {:>10} {:>10} {:>14} {:>10}'
+    print(header.format('stage', 'count', 'seconds', 'MB/s', 'per second',
+                        'peak MB'))
+
+    def report(stage, count, size, seconds, peak):
+        throughput = '-'
+        if size is not None:
+            throughput = '{:.1f}'.format(size / mb / seconds)
+        print(header.format(stage, count, '{:.3f}'.format(seconds), throughput,
+                            '{:.0f}'.format(count / seconds),
+                            '{:.1f}'.format(peak / mb)))
+
+    size = os.path.getsize(path)
+    seconds, peak = measure(lambda: load(path), repeat)
+    report('load', 1, size, seconds, peak)
+
+    with dlisio.load(path) as files:
+        for f in files:
+            recs = extract(f)
+            recsize = sum(memoryview(rec).nbytes for rec in recs)
+            seconds, peak = measure(lambda: core.parse_objects(recs), repeat)
+            report('parse_objects', len(recs), recsize, seconds, peak)
+
+            # Looking up every object is quadratic in the worst case, so look
+            # up a spread of at most 100 of them
+            names = [
+                (objtype, obj.name.id)
+                for objtype in f.object_pool.types
+                for obj in f.object_pool.get(objtype, exact_matcher())
+            ]
+            names = names[::max(1, len(names) // 100)]
+            seconds, peak = measure(lambda: lookup(f, names), repeat)
+            report('pool.get', len(names), None, seconds, peak)
+
+            count = sum(f.object_pool.counts.values())
+            seconds, peak = measure(lambda: promote(f), repeat)
+            report('promote', count, None, seconds, peak)
+
+            arrays = curves(f)
+            rows = sum(len(a) for a in arrays)
+            nbytes = sum(a.nbytes for a in arrays)
+            del arrays
+            seconds, peak = measure(lambda: curves(f), repeat)
+            report('read_fdata', rows, nbytes, seconds, peak)
+
+if __name__ == '__main__':
+    if len(sys.argv) > 1:
+        main(sys.argv[1])
+        sys.exit()
+
+    fd, path = tempfile.mkstemp(suffix = '.dlis')
+    os.close(fd)
+    try:
+        synthetic.generate(path,
+            logical_files = 2,
+            rows = 100000,
+            channels = 50,
+            parameters = 10000,
+            reprcodes = ('fsingl', 'fdoubl', 'isingl', 'slong', 'unorm'),
+            dimension = 1,
+        )
+        main(path)
+    finally:
+        os.remove(path)
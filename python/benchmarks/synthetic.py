@@ -0,0 +1,385 @@
+#!/usr/bin/env python3
+"""
+Deterministic generator of large, synthetic DLIS files
+
+Writes files with a known shape for the benchmarks, and for reproducing
+performance problems without having to share real (and often confidential)
+files. The same parameters always give the same file, byte for byte.
+
+Every logical file has a FILE-HEADER, an ORIGIN, a number of PARAMETERs, the
+CHANNELs and a single FRAME, followed by the frame data. The first channel is
+the index of the frame, the rest cycle through the given representation
+codes. The values are smooth curves, so they look like something, but they
+carry no meaning.
+
+Usage:
+
+    python benchmarks/synthetic.py path [rows] [channels]
+
+or, from other scripts
+
+    import synthetic
+    synthetic.generate('big.dlis', rows = 10**6, channels = 100,
+                       reprcodes = ('fsingl', 'isingl'), tapeimage = True)
+"""
+import struct
+import sys
+
+import numpy as np
+
+def uvari(n):
+    if n < 0x80:       return struct.pack('>B', n)
+    if n < 0x4000:     return struct.pack('>H', n | 0x8000)
+    if n < 0x40000000: return struct.pack('>L', n | 0xC0000000)
+    raise ValueError('uvari out of range: {}'.format(n))
+
+def ident(s):
+    s = s.encode('ascii')
+    return struct.pack('>B', len(s)) + s
+
+def ascii(s):
+    s = s.encode('ascii')
+    return uvari(len(s)) + s
+
+def obname(origin, copynr, name):
+    return uvari(origin) + struct.pack('>B', copynr) + ident(name)
+
+def fshort(x):
+    """Encode as low precision float, a 12-bit fraction and 4-bit exponent"""
+    _, e = np.frexp(x)
+    exp = np.clip(e, 0, 15)
+    frac = np.clip(np.rint(np.ldexp(x, 11 - exp)), -2048, 2047)
+    bits = (frac.astype(np.int64) & 0xFFF) << 4 | exp
+    return bits.astype('>u2')
+
+def isingl(x):
+    """Encode as IBM float, a base-16 exponent and 24-bit fraction"""
+    m, e = np.frexp(np.abs(x))
+    e16 = -((-e) // 4)
+    frac = np.floor(np.ldexp(m, e - 4 * e16 + 24)).astype(np.int64)
+    bits = (e16 + 64) << 24 | frac
+    bits = np.where(x == 0, 0, bits | (np.signbit(x).astype(np.int64) << 31))
+    return bits.astype('>u4')
+
+def vsingl(x):
+    """Encode as VAX float, which is stored as two little-endian halves"""
+    m, e = np.frexp(np.abs(x))
+    frac = np.floor(np.ldexp(m, 24)).astype(np.int64) & 0x7FFFFF
+    bits = (e + 128) << 23 | frac
+    bits = np.where(x == 0, 0, bits | (np.signbit(x).astype(np.int64) << 31))
+    halves = np.stack([bits >> 16, bits & 0xFFFF], axis = -1)
+    return halves.astype('<u2')
+
+"""
+representation code -> (code, encoder)
+
+The encoder turns an array of float64 samples, most of them in [-1000, 1000],
+into the big-endian on-disk values
+"""
+encoders = {
+    'fshort' : (1,  fshort),
+    'fsingl' : (2,  lambda x: x.astype('>f4')),
+    'isingl' : (5,  isingl),
+    'vsingl' : (6,  vsingl),
+    'fdoubl' : (7,  lambda x: x.astype('>f8')),
+    'csingl' : (10, lambda x: (x + 1j * x[::-1]).astype('>c8')),
+    'cdoubl' : (11, lambda x: (x + 1j * x[::-1]).astype('>c16')),
+    'sshort' : (12, lambda x: np.rint(x / 10).astype('>i1')),
+    'snorm'  : (13, lambda x: np.rint(x * 10).astype('>i2')),
+    'slong'  : (14, lambda x: np.rint(x * 1000).astype('>i4')),
+    'ushort' : (15, lambda x: np.rint(np.abs(x) / 10).astype('>u1')),
+    'unorm'  : (16, lambda x: np.rint(np.abs(x) * 10).astype('>u2')),
+    'ulong'  : (17, lambda x: np.rint(np.abs(x) * 1000).astype('>u4')),
+    'status' : (26, lambda x: (x > 0).astype('>u1')),
+}
+
+ASCII  = 20
+IDENT  = 19
+UVARI  = 18
+USHORT = 15
+FDOUBL = 7
+OBNAME = 23
+UNITS  = 27
+
+"""
+Component descriptors, see rp66v1 3.2.2.1. Template attributes only have a
+label, and object attributes always have count, representation code and
+value.
+"""
+SET       = 0xF8
+TEMPLATE  = 0x30
+ATTRIBUTE = 0x2D
+OBJECT    = 0x70
+
+def eflr(settype, template, objects):
+    """Encode the body of an explicitly formatted logical record
+
+    Parameters
+    ----------
+    settype : str
+    template : list of str
+        attribute labels
+    objects : list of (bytes, list of (int, int, bytes))
+        encoded object name, and the (count, reprc, encoded values) of every
+        attribute in the template
+    """
+    body = bytearray(struct.pack('>B', SET) + ident(settype) + ident(''))
+    for label in template:
+        body += struct.pack('>B', TEMPLATE) + ident(label)
+
+    for name, attributes in objects:
+        body += struct.pack('>B', OBJECT) + name
+        for count, reprc, value in attributes:
+            body += struct.pack('>B', ATTRIBUTE) + uvari(count)
+            body += struct.pack('>B', reprc) + value
+    return bytes(body)
+
+class writer(object):
+    """Pack logical records into visible records, and those into a file
+
+    Logical records are split into segments when they do not fit in what is
+    left of the current visible record, or are longer than segment bytes.
+    With tapeimage, every visible record is wrapped in a tape image record,
+    and the file ends with two tape marks.
+    """
+    def __init__(self, f, vrlen, segment, tapeimage):
+        if vrlen > 0xFFFF or vrlen < 20:
+            raise ValueError('vrlen (which is {}) not in [20, 65535]'
+                             .format(vrlen))
+        if segment is not None and segment < 16:
+            raise ValueError('segment (which is {}) < 16'.format(segment))
+
+        self.f = f
+        self.vrlen = vrlen
+        self.segment = segment
+        self.tapeimage = tapeimage
+        self.vr = bytearray()
+        self.prev = 0
+
+    def write(self, data, tapemark = False):
+        if not self.tapeimage:
+            self.f.write(data)
+            return
+
+        tell = self.f.tell()
+        header = struct.pack('<LLL', int(tapemark), self.prev,
+                             tell + 12 + len(data))
+        self.f.write(header)
+        self.f.write(data)
+        self.prev = tell
+
+    def sul(self, name):
+        label = '{:>4}V1.00RECORD{:05d}{:<60}'.format(1, self.vrlen, name)
+        self.write(label[:80].encode('ascii'))
+
+    def flush(self):
+        """End the current visible record"""
+        if not self.vr: return
+        header = struct.pack('>HBB', len(self.vr) + 4, 0xFF, 0x01)
+        self.write(header + self.vr)
+        self.vr = bytearray()
+
+    def record(self, body, lrtype, explicit):
+        pos = 0
+        first = True
+        while True:
+            room = self.vrlen - 4 - len(self.vr) - 4
+            if self.segment is not None:
+                room = min(room, self.segment - 4)
+
+            rest = len(body) - pos
+            last = rest + rest % 2 <= room
+            if last:
+                n = rest
+            else:
+                # Keep the non-final segments even in length, so that only
+                # the final one ever needs a pad byte
+                n = room - room % 2
+                if n < 12:
+                    self.flush()
+                    continue
+
+            attrs = 0x80 if explicit else 0x00
+            if not first: attrs |= 0x40
+            if not last:  attrs |= 0x20
+            pad = b''
+            if last and n % 2:
+                attrs |= 0x01
+                pad = b'\x01'
+
+            self.vr += struct.pack('>HBB', 4 + n + len(pad), attrs, lrtype)
+            self.vr += body[pos:pos + n] + pad
+            pos += n
+            first = False
+
+            if last: return
+
+    def close(self):
+        self.flush()
+        if self.tapeimage:
+            self.write(b'', tapemark = True)
+            self.write(b'', tapemark = True)
+
+def curves(rows, first, channels):
+    """Samples for rows [first, first + rows) of every channel"""
+    depth = np.arange(first, first + rows, dtype = np.float64)
+    return [
+        1000 * np.sin(depth / (50 + 7 * i) + i) for i in range(channels)
+    ]
+
+def logical_file(w, lf, rows, channels, parameters, reprcs, dimension,
+                 frames_per_record):
+    origin = 1
+    w.flush()
+
+    w.record(eflr('FILE-HEADER', ['SEQUENCE-NUMBER', 'ID'], [
+        (obname(origin, 0, '5'), [
+            (1, ASCII, ascii(str(lf + 1))),
+            (1, ASCII, ascii('SYNTHETIC LOGICAL FILE {}'.format(lf))),
+        ]),
+    ]), 0, True)
+
+    w.record(eflr('ORIGIN',
+        ['FILE-ID', 'FILE-SET-NAME', 'FILE-SET-NUMBER', 'FILE-NUMBER'], [
+        (obname(origin, 0, 'DEFINING_ORIGIN'), [
+            (1, ASCII,  ascii('SYNTHETIC')),
+            (1, IDENT,  ident('BENCHMARK')),
+            (1, UVARI,  uvari(origin)),
+            (1, UVARI,  uvari(lf + 1)),
+        ]),
+    ]), 1, True)
+
+    if parameters > 0:
+        w.record(eflr('PARAMETER', ['LONG-NAME', 'VALUES'], [
+            (obname(origin, 0, 'PARAM{}'.format(i)), [
+                (1, ASCII,  ascii('Parameter number {}'.format(i))),
+                (1, FDOUBL, struct.pack('>d', i * 0.5)),
+            ]) for i in range(parameters)
+        ]), 5, True)
+
+    if isinstance(dimension, int): dimension = [dimension]
+    samples = int(np.prod(dimension))
+
+    # The index channel, then the curves with the representation codes in
+    # turn
+    names = ['INDEX'] + ['CH{}'.format(i) for i in range(1, channels)]
+    codes = ['fdoubl'] + [reprcs[i % len(reprcs)] for i in range(channels - 1)]
+    dims  = [[1]] + [dimension] * (channels - 1)
+
+    w.record(eflr('CHANNEL',
+        ['LONG-NAME', 'REPRESENTATION-CODE', 'UNITS', 'DIMENSION'], [
+        (obname(origin, 0, name), [
+            (1, ASCII,  ascii('Channel {}'.format(name))),
+            (1, USHORT, struct.pack('>B', encoders[code][0])),
+            (1, UNITS,  ident('m')),
+            (len(dim), UVARI, b''.join(uvari(d) for d in dim)),
+        ]) for name, code, dim in zip(names, codes, dims)
+    ]), 3, True)
+
+    frame = obname(origin, 0, 'MAIN')
+    w.record(eflr('FRAME', ['CHANNELS', 'INDEX-TYPE'], [
+        (frame, [
+            (channels, OBNAME, b''.join(obname(origin, 0, x) for x in names)),
+            (1,        IDENT,  ident('BOREHOLE-DEPTH')),
+        ]),
+    ]), 4, True)
+
+    # Frame numbers are written as 4-byte uvaris (which is legal for all
+    # values) so that every row has the same size, and rows can be made in
+    # bulk with numpy
+    fields = [('FRAMENO', '>u4')]
+    for i, code in enumerate(codes):
+        sample = encoders[code][1](np.zeros(1 if i == 0 else samples))
+        fields.append((names[i], sample.dtype, sample.shape))
+    dtype = np.dtype(fields)
+
+    # Generate the rows in blocks, to bound the memory use for large files
+    block = frames_per_record * max(1, 65536 // frames_per_record)
+    for first in range(0, rows, block):
+        count = min(block, rows - first)
+        data = np.empty(count, dtype = dtype)
+        data['FRAMENO'] = np.arange(first + 1, first + count + 1) | 0xC0000000
+
+        values = curves(count, first, channels)
+        values[0] = 0.1 * np.arange(first, first + count)
+        for i in range(channels):
+            encode = encoders[codes[i]][1]
+            x = values[i]
+            if i > 0 and samples > 1:
+                x = np.repeat(x, samples) + np.tile(np.arange(samples), count)
+            data[names[i]] = encode(x).reshape(data[names[i]].shape)
+
+        raw = data.tobytes()
+        size = dtype.itemsize * frames_per_record
+        for pos in range(0, len(raw), size):
+            w.record(frame + raw[pos:pos + size], 0, False)
+
+def generate(path,
+             logical_files = 1,
+             rows = 10000,
+             channels = 10,
+             parameters = 100,
+             reprcodes = ('fsingl',),
+             dimension = 1,
+             frames_per_record = 8,
+             vrlen = 8192,
+             segment = None,
+             tapeimage = False):
+    """Write a synthetic DLIS file
+
+    Parameters
+    ----------
+    path : str
+    logical_files : int
+        number of logical files
+    rows : int
+        number of frames (rows) in each logical file
+    channels : int
+        frame width, the number of channels in the frame, including the index
+    parameters : int
+        number of PARAMETER objects in each logical file
+    reprcodes : iterable of str
+        representation codes of the channels, used in turn. Any of fshort,
+        fsingl, isingl, vsingl, fdoubl, csingl, cdoubl, sshort, snorm, slong,
+        ushort, unorm, ulong and status
+    dimension : int or list of int
+        dimension of every channel but the index
+    frames_per_record : int
+        number of frames in each FDATA record
+    vrlen : int
+        maximum visible record length
+    segment : int, optional
+        maximum logical record segment length, which forces segmentation of
+        records that would otherwise fit in a visible record
+    tapeimage : bool
+        wrap the visible records in the tape image format
+
+    Returns
+    -------
+    size : int
+        size of the file in bytes
+    """
+    for code in reprcodes:
+        if code not in encoders:
+            raise ValueError('unknown reprcode {}'.format(code))
+
+    if channels < 1:
+        raise ValueError('channels (which is {}) < 1'.format(channels))
+
+    with open(path, 'wb') as f:
+        w = writer(f, vrlen, segment, tapeimage)
+        w.sul('SYNTHETIC BENCHMARK FILE')
+        for lf in range(logical_files):
+            logical_file(w, lf, rows, channels, parameters, list(reprcodes),
+                         dimension, frames_per_record)
+        w.close()
+        return f.tell()
+
+if __name__ == '__main__':
+    if len(sys.argv) < 2:
+        sys.exit('usage: {} path [rows] [channels]'.format(sys.argv[0]))
+
+    rows = int(sys.argv[2]) if len(sys.argv) > 2 else 10000
+    channels = int(sys.argv[3]) if len(sys.argv) > 3 else 10
+    size = generate(sys.argv[1], rows = rows, channels = channels)
+    print('wrote {} bytes to {}'.format(size, sys.argv[1]))
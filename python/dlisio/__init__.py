@@ -1,10 +1,14 @@
 from collections import defaultdict, OrderedDict
 from io import StringIO
 import logging
+import os
 import re
+import threading
 
 from . import core
 from . import plumbing
+from . import instrumentation
+from .instrumentation import stats
 
 try:
     import pkg_resources
@@ -121,6 +125,19 @@ class dlis(object):
     two objects of the same type to have the same name, as long as either their
     origin or copynumber differ. E.g. there may exist two channels with the
     same name/mnemonic.
+
+    Logical files loaded from a path, and their objects, can be pickled, e.g.
+    to be sent to a process pool. Only where the logical file is in the file
+    and the index made when it was loaded are pickled, and the logical file
+    is opened again, without indexing the file, when unpickled. The caller
+    owns the unpickled logical file, and is responsible for closing it.
+
+    >>> def read(frame):
+    ...     with frame.logicalfile:
+    ...         return frame.curves()
+    >>> with dlisio.load(path) as (f, *_):
+    ...     with concurrent.futures.ProcessPoolExecutor() as pool:
+    ...         curves = list(pool.map(read, f.frames))
     """
     types = {
         'AXIS'                   : plumbing.Axis,
@@ -160,12 +177,37 @@ class dlis(object):
     then the users responsibility of ensuring correctness for the custom class.
     """
 
-    def __init__(self, stream, object_pool, fdata_index, sul=None):
+    def __init__(self, stream, object_pool, fdata_index, sul=None,
+                 explicits=None, tell=None, offset=None, tapemarks=False,
+                 handle=None):
         self.file = stream
         self.object_pool = object_pool
         self.sul = sul
         self.fdata_index = fdata_index
 
+        # Where indexing stopped, so refresh() can pick up from there
+        self.explicits = explicits
+        self.tell = tell
+        self.complete = False
+
+        # Bumped every time refresh() rebuilds the object pool, which
+        # invalidates the linkage memoized by the objects, see
+        # BasicObject.attributecache
+        self.generation = 0
+
+        # Where the logical file starts in the file, and the handle it is read
+        # from, so that it can be opened again without indexing, see
+        # dlisio.catalog and __reduce__. The handle is shared by all the
+        # logical files of the file, and is released on close, so that it is
+        # closed with the last of them
+        self.offset = offset
+        self.tapemarks = tapemarks
+        self.handle = handle
+
+        # The stream has a position, and the core reads through it without
+        # the GIL, so threads take turns using it
+        self.lock = threading.Lock()
+
         if 'UPDATE' in self.object_pool.types:
             msg = ('{} contains UPDATE-object(s) which changes other '
                    'objects. dlisio lacks support for UPDATEs, hence the '
@@ -196,6 +238,41 @@ class dlis(object):
     def __exit__(self, type, value, traceback):
         self.close()
 
+    def __reduce__(self):
+        """Pickle the logical file as where it is, not what is in it
+
+        Only the path, where the logical file starts and the index made when
+        it was loaded are pickled. The logical file is opened again when
+        unpickled, without indexing the file, e.g. in another process.
+        """
+        handle = self.handle
+        if handle is None:
+            raise ValueError('cannot pickle closed {}'.format(self))
+
+        if isinstance(handle, core.cachedhandle):
+            handle = handle.source
+
+        index = None
+        if isinstance(handle, core.gziphandle):
+            index = handle.index
+            handle = handle.source
+
+        if not isinstance(handle, core.filehandle):
+            msg = ('only logical files loaded from a path can be pickled, '
+                   '{} was not')
+            raise TypeError(msg.format(self))
+
+        return (reopen, (
+            handle.path,
+            self.offset,
+            self.tapemarks,
+            self.tell,
+            self.sul,
+            self.explicits,
+            self.fdata_index,
+            index,
+        ))
+
     def close(self):
         """Close the file handle
 
@@ -203,7 +280,83 @@ class dlis(object):
         statement, which will close the file for you. Calling methods on a
         previously-closed file will raise `IOError`.
         """
-        self.file.close()
+        with self.lock:
+            self.file.close()
+            self.handle = None
+
+    def refresh(self):
+        """Index records appended to the file since it was loaded
+
+        Files that are still being written, e.g. during acquisition, grow as
+        the tools log. refresh() picks up where the indexing stopped when the
+        file was loaded, or at the last refresh, and only indexes the records
+        appended since. Data and objects in the new records are available
+        through this logical file afterwards, and frames already obtained see
+        the new rows too.
+
+        Records that are still being written are left for a later refresh.
+        Once another logical file has started, this one is complete and
+        refresh() does nothing.
+
+        Returns
+        -------
+        n : int
+            Number of new logical records
+
+        Raises
+        ------
+        NotImplementedError
+            If the file has tape marks
+
+        Notes
+        -----
+        Only files loaded from a path, or a core.filehandle, pick up appended
+        data. The other sources, such as file objects and gzip-compressed
+        files, are cached or fixed in size, and refresh() finds nothing new.
+
+        Examples
+        --------
+        Follow a file that is being written, and read only the new rows
+
+        >>> with dlisio.load(path) as (f, *_):
+        ...     frame = f.object('FRAME', 'MAIN')
+        ...     curves = frame.curves()
+        ...     while logging:
+        ...         time.sleep(5)
+        ...         if not f.refresh(): continue
+        ...         last = curves['FRAMENO'][-1]
+        ...         curves = frame.curves(since=last)
+        """
+        if self.complete: return 0
+
+        with self.lock:
+            with instrumentation.timed('findappended'):
+                core.extend_rp66_indexed(self.file)
+                explicits, implicits, tell, complete = core.findappended(
+                    self.file,
+                    self.tell,
+                )
+            self.tell = tell
+            self.complete = complete
+
+            if explicits:
+                # Objects can refer to objects in any other set, so the pool is
+                # rebuilt from all the sets
+                self.explicits = self.explicits + explicits
+                with instrumentation.timed('extract'):
+                    recs = core.extract(self.file, self.explicits)
+                with instrumentation.timed('parse_objects'):
+                    sets = core.parse_objects(recs)
+                with instrumentation.timed('pool'):
+                    self.object_pool = core.pool(sets)
+                self.generation += 1
+
+            with instrumentation.timed('findfdata'):
+                fdata = core.findfdata(self.file, implicits)
+            for fingerprint, tells in fdata.items():
+                self.fdata_index.setdefault(fingerprint, []).extend(tells)
+
+            return len(explicits) + len(implicits)
 
     def __repr__(self):
         try:
@@ -284,12 +437,37 @@ class dlis(object):
 
         """
         unknowns = defaultdict(dict)
-        for t in set(self.object_pool.types):
+        for t, count in self.object_pool.counts.items():
             if t in self.types: continue
-            unknowns[t] = self[t]
+            # Only promote types that actually have objects
+            unknowns[t] = self[t] if count else {}
 
         return unknowns
 
+    def count(self, type):
+        """Number of objects of a given type
+
+        Equivalent to len(self[type]), but the objects are counted without
+        creating python objects for them, which makes it cheap even for
+        logical files with a lot of objects.
+
+        Parameters
+        ----------
+        type : str
+            object type, e.g. CHANNEL
+
+        Returns
+        -------
+        count : int
+
+        Examples
+        --------
+
+        >>> f.count('CHANNEL')
+        2453
+        """
+        return self.object_pool.count(type, plumbing.exact_matcher())
+
     def match(self, pattern, type="CHANNEL"):
         """ Filter channels by mnemonics
 
@@ -459,17 +637,21 @@ class dlis(object):
         buf = StringIO()
         plumbing.describe_header(buf, 'Logical File', width, indent)
 
+        # Count the objects natively, rather than promoting every object just
+        # to count them
+        counts = self.object_pool.counts
+
         d = OrderedDict()
         d['Description']  = repr(self)
-        d['Frames']       = len(self.frames)
-        d['Channels']     = len(self.channels)
+        d['Frames']       = counts.get('FRAME', 0)
+        d['Channels']     = counts.get('CHANNEL', 0)
 
         plumbing.describe_dict(buf, d, width, indent)
 
         known, unknown = {}, {}
         for objtype in self.object_pool.types:
-            if objtype in self.types: known[objtype]   = len(self[objtype])
-            else:                     unknown[objtype] = len(self[objtype])
+            if objtype in self.types: known[objtype]   = counts[objtype]
+            else:                     unknown[objtype] = counts[objtype]
 
         if known:
             plumbing.describe_header(buf, 'Known objects', width, indent, lvl=2)
@@ -489,12 +671,15 @@ class dlis(object):
         """Enrich instances of the generic core.basicobject into type-specific
         objects like Channel, Frame, etc... """
         objs = []
-        for o in objects:
-            try:
-                obj = self.types[o.type](o, name=o.name, lf=self)
-            except KeyError:
-                obj = plumbing.Unknown(o, name=o.name, type=o.type, lf=self)
-            objs.append(obj)
+        with instrumentation.timed('promote'):
+            for o in objects:
+                try:
+                    obj = self.types[o.type](o, name=o.name, lf=self)
+                except KeyError:
+                    obj = plumbing.Unknown(o, name=o.name, type=o.type,
+                                           lf=self)
+                objs.append(obj)
+        instrumentation.count('objects_created', len(objs))
         return objs
 
     def storage_label(self):
@@ -531,7 +716,7 @@ def open(path):
     """
     return core.open(str(path))
 
-def load(path):
+def load(path, handlepool=None, progress=None):
     """ Loads a file and returns one filehandle pr logical file.
 
     The dlis standard have a concept of logical files. A logical file is a
@@ -553,10 +738,30 @@ def load(path):
 
     This means that dlisio.load() will return 1 to n logical files.
 
+    All the logical files share a single underlying file handle, which is
+    closed when the last of them is closed.
+
     Parameters
     ----------
 
-    path : str_like
+    path : str_like or bytes_like or file_like
+        Path to the file, or the file itself. The file can be an in-memory
+        bytes-like object, such as bytes, bytearray, memoryview, mmap or
+        numpy array, which is read without being copied. Anything with
+        seek() and readinto(), such as a file object or a stream from object
+        storage, is read in large, cached blocks. gzip-compressed files are
+        decompressed on the fly, see Notes.
+
+    handlepool : dlisio.core.handlepool, optional
+        Bound the number of open file handles. Loading many files with the
+        same pool keeps at most pool.maxopen files open at a time, by closing
+        the least recently used file handle and transparently re-opening it
+        when it's needed again.
+
+    progress : callable, optional
+        Called as progress(stage, done, total) while the file is indexed, see
+        Notes. The callback is called at most every 0.1 seconds, and once when
+        a stage is done. Returning False cancels the load.
 
     Examples
     --------
@@ -580,14 +785,142 @@ def load(path):
     to be stored in tail. Use len(tail) to check how many extra logical files
     there are.
 
+    Load a file that is already in memory, without writing it to disk first
+
+    >>> blob = bucket.get_object(key).read()
+    >>> with dlisio.load(blob) as files:
+    ...     pass
+
+    Keep at most 8 files open, no matter how many files are loaded
+
+    >>> pool = dlisio.core.handlepool(maxopen = 8)
+    >>> batches = [dlisio.load(path, handlepool = pool) for path in paths]
+
+    Store the index of a compressed file, and use it for later loads
+
+    >>> gz = dlisio.core.gziphandle(dlisio.core.filehandle('file.dlis.gz'))
+    >>> with open('file.dlis.gz.idx', 'wb') as f:
+    ...     f.write(gz.index)
+    >>> with open('file.dlis.gz.idx', 'rb') as f:
+    ...     index = f.read()
+    >>> src = dlisio.core.filehandle('file.dlis.gz')
+    >>> with dlisio.load(dlisio.core.gziphandle(src, index)) as files:
+    ...     pass
+
+    Report the progress of a load, and give up when the request is abandoned
+
+    >>> def progress(stage, done, total):
+    ...     if request.abandoned:
+    ...         return False
+    ...     if stage == 'findoffsets' and total is not None:
+    ...         request.report(done / total)
+    >>> try:
+    ...     files = dlisio.load(path, progress = progress)
+    ... except dlisio.core.cancelled:
+    ...     pass
+
     Returns
     -------
 
     dlis : tuple(dlisio.dlis)
+
+    Notes
+    -----
+
+    gzip-compressed files are recognized automatically, and read without being
+    decompressed to disk. Only the parts of the file that are read are
+    decompressed, which is made possible by an index of checkpoints in the
+    compressed stream. Building the index requires decompressing the whole
+    file once, which can be avoided by storing the index and passing a
+    dlisio.core.gziphandle with it instead of the path. Files can also be
+    passed as an already open dlisio.core.handle.
+
+    The progress callback is called from the loops that index the file, with
+    the name of the stage, the work done and the total:
+
+    ============ ==========================================================
+    Stage        done and total
+    ============ ==========================================================
+    findoffsets  Bytes of the file scanned, and the size of the file, or
+                 None if it's not known, like for file-like objects
+    findfdata    Frame data records indexed, and the number of them in the
+                 logical file
+    ============ ==========================================================
+
+    Both stages are run once for every logical file. Returning False from
+    the callback cancels the load, which raises dlisio.core.cancelled, and
+    exceptions raised by the callback propagate out of load. Either way, the
+    file, and any logical files already loaded, are closed.
+
+    See Also
+    --------
+
+    iterload : lazily load the logical files, one at a time
+    """
+    lfs = []
+    try:
+        for lf in iterload(path, handlepool, progress):
+            lfs.append(lf)
+    except:
+        for f in lfs:
+            f.close()
+        raise
+
+    return Batch(lfs)
+
+def iterload(path, handlepool=None, progress=None):
+    """ Lazily load the logical files of a file, one at a time
+
+    Like :func:`load`, but instead of discovering and indexing every logical
+    file in the file before returning, iterload is a generator that yields
+    each logical file as soon as it is indexed. The next logical file is not
+    looked for until it is requested, so breaking out of the loop early stops
+    the scanning of the file.
+
+    The caller owns every yielded logical file, and is responsible for closing
+    it. By closing each logical file before requesting the next one, only one
+    logical file is kept open at a time.
+
+    Parameters
+    ----------
+
+    path : str_like or bytes_like or file_like
+        See :func:`load`
+
+    handlepool : dlisio.core.handlepool, optional
+        See :func:`load`
+
+    progress : callable, optional
+        See :func:`load`
+
+    Yields
+    ------
+
+    dlis : dlisio.dlis
+
+    Notes
+    -----
+
+    Because the file is only read as the logical files are requested, errors
+    in a logical file are only raised when that logical file is requested.
+    Logical files that have already been yielded are still valid.
+
+    Examples
+    --------
+
+    Only read the first logical file, and skip the rest
+
+    >>> with next(dlisio.iterload(filename)) as f:
+    ...     header = f.fileheader
+
+    Process one logical file at a time
+
+    >>> for f in dlisio.iterload(filename):
+    ...     with f:
+    ...         header = f.fileheader
     """
     sulsize = 80
     tifsize = 12
-    lfs = []
 
     def rewind(offset, tif):
         """Rewind offset to make sure not to miss VRL when calling findvrl"""
@@ -595,18 +928,53 @@ def load(path):
         if tif: offset -= 12
         return offset
 
-    path = str(path)
-    stream = open(path)
-    try:
-        offset = core.findsul(stream)
-        sul = stream.get(bytearray(sulsize), offset, sulsize)
-        offset += sulsize
-    except:
-        offset = 0
-        sul = None
+    def openhandle(source):
+        """Open a core.handle for a path, file-like or bytes-like object"""
+        if isinstance(source, core.handle):
+            return source
+
+        # os.PathLike is not available on python 3.5
+        if isinstance(source, str) or hasattr(source, '__fspath__'):
+            return core.filehandle(str(source), handlepool)
+
+        if hasattr(source, 'readinto') and hasattr(source, 'seek'):
+            # Every read is a call into python, regardless of its size. Read
+            # large blocks, and serve the many small reads from those
+            return core.cachedhandle(core.pyfilehandle(source))
+
+        try:
+            return core.memoryhandle(source)
+        except TypeError:
+            return core.filehandle(str(source), handlepool)
+
+    def filesize(handle):
+        """Size of the file, or -1 if it is not known"""
+        if isinstance(handle, core.filehandle):
+            return os.path.getsize(handle.path)
+        if isinstance(handle, core.cachedhandle):
+            return filesize(handle.source)
+        try:
+            return len(handle)
+        except TypeError:
+            return -1
+
+    # All logical files read from the same file handle, each through its own
+    # protocol stack
+    handle = core.decompressed(openhandle(path))
+    total = filesize(handle) if progress is not None else -1
+    stream = handle.open()
     try:
-        tapemarks = core.hastapemark(stream)
-        offset = core.findvrl(stream, offset)
+        with instrumentation.timed('findvrl'):
+            try:
+                offset = core.findsul(stream)
+                sul = stream.get(bytearray(sulsize), offset, sulsize)
+                offset += sulsize
+            except:
+                offset = 0
+                sul = None
+
+            tapemarks = core.hastapemark(stream)
+            offset = core.findvrl(stream, offset)
 
         # Layered File Protocol does not currently offer support for re-opening
         # files at the current position, nor is it able to precisly report the
@@ -627,33 +995,77 @@ def load(path):
             if tapemarks: stream = core.open_tif(stream)
             stream = core.open_rp66(stream)
 
-            explicits, implicits = core.findoffsets(stream)
+            with instrumentation.timed('findoffsets'):
+                explicits, implicits = core.findoffsets(stream, progress, total)
             hint = rewind(stream.absolute_tell, tapemarks)
 
-            recs  = core.extract(stream, explicits)
-            sets  = core.parse_objects(recs)
-            pool  = core.pool(sets)
-            fdata = core.findfdata(stream, implicits)
-
-            lf = dlis(stream, pool, fdata, sul)
-            lfs.append(lf)
-
+            # findoffsets has walked, and verified, the whole logical file.
+            # Everything from here on is random access by offset, which is
+            # cheaper through a complete index of the visible records than
+            # through lfp's rp66, which has to discover them as it goes.
+            size = stream.tell
+            stream.close()
+            stream = handle.open(offset)
+            if tapemarks: stream = core.open_tif(stream)
+            stream = core.open_rp66_indexed(stream, size)
+
+            with instrumentation.timed('extract'):
+                recs = core.extract(stream, explicits)
+            with instrumentation.timed('parse_objects'):
+                sets = core.parse_objects(recs)
+            with instrumentation.timed('pool'):
+                pool = core.pool(sets)
+            with instrumentation.timed('findfdata'):
+                fdata = core.findfdata(stream, implicits, progress)
+
+            lf = dlis(stream, pool, fdata, sul, explicits, size, offset,
+                      tapemarks, handle)
+
+            # The stream is owned by the logical file from here on, and it's
+            # up to the caller to close it
+            stream = None
+            yield lf
+
+            stream = handle.open()
             try:
-                stream = core.open(path)
-                offset = core.findvrl(stream, hint)
+                with instrumentation.timed('findvrl'):
+                    offset = core.findvrl(stream, hint)
             except RuntimeError:
-                if stream.eof():
-                    stream.close()
-                    break
+                if stream.eof(): break
                 raise
+    finally:
+        if stream is not None: stream.close()
+
+def reopen(path, offset, tapemarks, size, sul, explicits, fdata_index,
+           index=None):
+    """ For internal use.
+    Open the logical file that starts at offset in the file at path again,
+    from what was found when it was first indexed, without indexing it. The
+    objects are read and parsed again. index is the checkpoint index of a
+    gzip-compressed file, which is rebuilt if it is not given.
+    """
+    handle = core.filehandle(path)
+    if index is not None:
+        handle = core.gziphandle(handle, index)
+    handle = core.decompressed(handle)
 
-        return Batch(lfs)
+    stream = handle.open(offset)
+    try:
+        if tapemarks: stream = core.open_tif(stream)
+        stream = core.open_rp66_indexed(stream, size)
+        with instrumentation.timed('extract'):
+            recs = core.extract(stream, explicits)
+        with instrumentation.timed('parse_objects'):
+            sets = core.parse_objects(recs)
+        with instrumentation.timed('pool'):
+            pool = core.pool(sets)
     except:
         stream.close()
-        for f in lfs:
-            f.close()
         raise
 
+    return dlis(stream, pool, fdata_index, sul, explicits, size, offset,
+                tapemarks, handle)
+
 
 class Batch(tuple):
     def __enter__(self):
@@ -679,8 +1091,8 @@ class Batch(tuple):
         for f in self:
             d = OrderedDict()
             d['Description'] = repr(f)
-            d['Frames']   = len(f.frames)
-            d['Channels'] = len(f.channels)
+            d['Frames']   = f.count('FRAME')
+            d['Channels'] = f.count('CHANNEL')
             plumbing.describe_dict(buf, d, width, indent)
 
         return plumbing.Summary(info=buf.getvalue())
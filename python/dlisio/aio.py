@@ -0,0 +1,241 @@
+"""
+asyncio interface to dlisio
+
+Loading files and reading curves are blocking calls, which would stall the
+event loop. The coroutines in this module run them on a thread pool shared
+by all event loops, where the native indexing and decoding run without the
+GIL, so the event loop keeps running while they do.
+
+The size of the pool limits how many loads and reads run at the same time,
+the rest wait their turn, see :func:`configure`. Cancelling a coroutine
+cancels the native work it is waiting for, which stops at its next progress
+report, at most 0.1 seconds later.
+
+Frames where a channel is decoded to python objects, like strings and
+DTIME, need the GIL to be decoded, and only let the event loop run between
+records.
+"""
+import asyncio
+import concurrent.futures
+import logging
+import threading
+
+from . import load
+from . import dlisutils
+
+_lock = threading.Lock()
+_executor = None
+
+def configure(max_workers=None, executor=None):
+    """Configure the thread pool the coroutines run on
+
+    Loads and reads that are started when all threads are busy wait for one
+    to become available, so max_workers is the number of files that are
+    loaded or read at the same time. Work already running on the previous
+    pool is not affected.
+
+    Parameters
+    ----------
+    max_workers : int, optional
+        Number of threads, defaults to the default of
+        concurrent.futures.ThreadPoolExecutor
+    executor : concurrent.futures.Executor, optional
+        Use this executor instead of making a thread pool, e.g. to share the
+        threads with other work. It must be a thread pool, as the work runs
+        on the logical files of this process.
+
+    Examples
+    --------
+    Load at most 4 files at a time
+
+    >>> dlisio.aio.configure(max_workers = 4)
+    """
+    global _executor
+    if executor is None:
+        executor = threadpool(max_workers)
+
+    with _lock:
+        previous, _executor = _executor, executor
+
+    if previous is not None:
+        previous.shutdown(wait = False)
+
+def threadpool(max_workers=None):
+    """ For internal use.
+    Make a thread pool for the coroutines to run on
+    """
+    try:
+        return concurrent.futures.ThreadPoolExecutor(
+            max_workers,
+            thread_name_prefix = 'dlisio',
+        )
+    except TypeError:
+        # thread_name_prefix was added in python 3.6
+        return concurrent.futures.ThreadPoolExecutor(max_workers)
+
+def executor():
+    """The executor the coroutines run on, see :func:`configure`"""
+    global _executor
+    with _lock:
+        if _executor is None:
+            _executor = threadpool()
+        return _executor
+
+async def run(fn, progress=None, cleanup=None):
+    """ For internal use.
+    Await fn(report) on the executor, where report is the progress callback
+    to pass on to the native code. Cancelling makes report return False,
+    which stops the native loop, and waits for it to stop. If fn completes
+    anyway, cleanup is called with its result.
+    """
+    cancelled = threading.Event()
+
+    def report(stage, done, total):
+        ret = True
+        if progress is not None:
+            ret = progress(stage, done, total)
+        if cancelled.is_set():
+            return False
+        return ret
+
+    loop = asyncio.get_event_loop()
+    future = loop.run_in_executor(executor(), fn, report)
+    try:
+        return await asyncio.shield(future)
+    except asyncio.CancelledError:
+        cancelled.set()
+        # Wait for the work to stop, so that nothing is still reading from the
+        # file when the cancellation is done
+        try:
+            result = await future
+        except Exception:
+            # Usually dlisio.core.cancelled. The coroutine was cancelled, so
+            # the cancellation is raised rather than what the work failed with
+            logging.debug('cancelled work failed', exc_info = True)
+        else:
+            if cleanup is not None: cleanup(result)
+        raise
+
+async def aload(path, handlepool=None, progress=None):
+    """Load a file without blocking the event loop
+
+    Awaitable :func:`dlisio.load`. The logical files are closed if the load
+    is cancelled.
+
+    Parameters
+    ----------
+    path : str_like or bytes_like or file_like
+        See :func:`dlisio.load`
+    handlepool : dlisio.core.handlepool, optional
+        See :func:`dlisio.load`
+    progress : callable, optional
+        See :func:`dlisio.load`. It is called from the thread the load runs
+        in, not from the event loop.
+
+    Returns
+    -------
+    dlis : tuple(dlisio.dlis)
+
+    Examples
+    --------
+    >>> async def fileheaders(path):
+    ...     with await dlisio.aio.aload(path) as files:
+    ...         return [f.fileheader for f in files]
+    """
+    return await run(
+        lambda report: load(path, handlepool, report),
+        progress,
+        cleanup = lambda files: files.close(),
+    )
+
+async def acurves(frame, strict=True, since=0, workers=1, progress=None,
+                  layout='rows', out=None):
+    """Read the curves of a frame without blocking the event loop
+
+    Awaitable :func:`dlisio.plumbing.Frame.curves`, see
+    :func:`dlisio.plumbing.Frame.acurves`.
+    """
+    return await run(
+        lambda report: frame.curves(strict = strict,
+                                    since = since,
+                                    workers = workers,
+                                    progress = report,
+                                    layout = layout,
+                                    out = out),
+        progress,
+    )
+
+def chunks(frame, chunksize=64 << 20, strict=True, workers=1, layout='rows'):
+    """Read the curves of a frame in chunks, without blocking the event loop
+
+    An async iterator over the curves of the frame, a few records at a time,
+    so that large frames can be processed, or sent on, without holding all
+    of them in memory. Every chunk is about chunksize bytes, and is read
+    when it is requested. At least one, possibly empty, chunk is yielded.
+
+    Parameters
+    ----------
+    frame : dlisio.plumbing.Frame
+    chunksize : int, optional
+        Approximate size of every chunk, in bytes
+    strict : boolean, optional
+        See :func:`dlisio.plumbing.Frame.curves`
+    workers : int, optional
+        See :func:`dlisio.plumbing.Frame.curves`
+    layout : {'rows', 'columns'}, optional
+        See :func:`dlisio.plumbing.Frame.curves`
+
+    Returns
+    -------
+    chunks : async iterator
+        Of np.ndarray or dict, like :func:`dlisio.plumbing.Frame.curves`
+
+    Examples
+    --------
+    Stream the curves of a frame
+
+    >>> async for chunk in dlisio.aio.chunks(frame, layout = 'columns'):
+    ...     await sink.write(chunk)
+    """
+    if layout not in ('rows', 'columns'):
+        msg = "layout must be 'rows' or 'columns', was {}"
+        raise ValueError(msg.format(layout))
+
+    return ChunkIterator(frame, chunksize, strict, workers, layout)
+
+class ChunkIterator(object):
+    """ For internal use.
+    The async iterator of :func:`chunks`. It is a class, rather than an async
+    generator, as those were added in python 3.6.
+
+    The chunks are read by a plain generator, which is advanced on the
+    executor. The progress callback of the current read is handed to it
+    through report.
+    """
+    def __init__(self, frame, chunksize, strict, workers, layout):
+        f = frame.logicalfile
+        dtype = frame.dtype(strict = strict)
+
+        def read(indices):
+            if layout == 'columns':
+                fmts = ['i'] + [ch.fmtstr() for ch in frame.channels]
+                return dlisutils.columns(f, frame, dtype, fmts, 0, workers,
+                                         self.report, indices)
+
+            return dlisutils.curves(f, frame, dtype, '', frame.fmtstr(), '',
+                                    0, workers, self.report, indices)
+
+        self.report = None
+        self.chunks = dlisutils.chunks(f, frame, dtype, chunksize, read)
+
+    def advance(self, progress):
+        self.report = progress
+        return next(self.chunks, None)
+
+    def __aiter__(self):
+        return self
+
+    async def __anext__(self):
+        chunk = await run(self.advance)
+        if chunk is None: raise StopAsyncIteration
+        return chunk
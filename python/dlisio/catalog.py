@@ -0,0 +1,622 @@
+"""
+Index the metadata of many files in a local SQLite database
+
+A catalog records the files, logical files, origins, frames and channels of
+a collection of files, and where the frame data of every frame is, so that
+questions like "which files have a GR channel in a frame indexed in feet?"
+are answered by a query rather than by loading every file, and matching
+frames are opened directly, without indexing the file again.
+"""
+from collections import namedtuple
+import functools
+import json
+import logging
+import os
+import re
+import sqlite3
+
+import numpy as np
+
+from . import iterload
+from . import reopen
+from . import dlisutils
+
+schema = """
+CREATE TABLE IF NOT EXISTS files (
+    id          INTEGER PRIMARY KEY,
+    path        TEXT UNIQUE NOT NULL,
+    size        INTEGER NOT NULL,
+    mtime       REAL NOT NULL,
+    error       TEXT
+);
+
+CREATE TABLE IF NOT EXISTS logicalfiles (
+    id          INTEGER PRIMARY KEY,
+    file        INTEGER NOT NULL REFERENCES files(id) ON DELETE CASCADE,
+    position    INTEGER NOT NULL,
+    offset      INTEGER NOT NULL,
+    tapemarks   INTEGER NOT NULL,
+    size        INTEGER NOT NULL,
+    sul         BLOB,
+    explicits   BLOB NOT NULL
+);
+
+CREATE TABLE IF NOT EXISTS origins (
+    id            INTEGER PRIMARY KEY,
+    logicalfile   INTEGER NOT NULL REFERENCES logicalfiles(id)
+                  ON DELETE CASCADE,
+    name          TEXT,
+    origin        INTEGER,
+    copynumber    INTEGER,
+    file_id       TEXT,
+    file_set_name TEXT,
+    well_id       TEXT,
+    well_name     TEXT,
+    field_name    TEXT,
+    company       TEXT,
+    producer_name TEXT,
+    product       TEXT
+);
+
+CREATE TABLE IF NOT EXISTS frames (
+    id          INTEGER PRIMARY KEY,
+    logicalfile INTEGER NOT NULL REFERENCES logicalfiles(id)
+                ON DELETE CASCADE,
+    fingerprint TEXT NOT NULL,
+    name        TEXT,
+    origin      INTEGER,
+    copynumber  INTEGER,
+    description TEXT,
+    index_type  TEXT,
+    index_units TEXT,
+    direction   TEXT,
+    spacing,
+    index_min,
+    index_max,
+    records     INTEGER NOT NULL,
+    fdata       BLOB NOT NULL
+);
+
+CREATE TABLE IF NOT EXISTS channels (
+    id          INTEGER PRIMARY KEY,
+    logicalfile INTEGER NOT NULL REFERENCES logicalfiles(id)
+                ON DELETE CASCADE,
+    frame       INTEGER REFERENCES frames(id) ON DELETE CASCADE,
+    name        TEXT,
+    origin      INTEGER,
+    copynumber  INTEGER,
+    long_name   TEXT,
+    units       TEXT,
+    reprc       INTEGER,
+    dimension   TEXT
+);
+
+CREATE INDEX IF NOT EXISTS logicalfiles_file ON logicalfiles(file);
+CREATE INDEX IF NOT EXISTS origins_logicalfile ON origins(logicalfile);
+CREATE INDEX IF NOT EXISTS frames_logicalfile ON frames(logicalfile);
+CREATE INDEX IF NOT EXISTS channels_logicalfile ON channels(logicalfile);
+CREATE INDEX IF NOT EXISTS channels_frame ON channels(frame);
+CREATE INDEX IF NOT EXISTS channels_name ON channels(name);
+"""
+
+# The results of queries. logicalfile is the position of the logical file in
+# the file, as in dlisio.load(path)[logicalfile]
+Origin = namedtuple('Origin', [
+    'path', 'logicalfile', 'name', 'origin', 'copynumber', 'file_id',
+    'file_set_name', 'well_id', 'well_name', 'field_name', 'company',
+    'producer_name', 'product', 'lf',
+])
+
+Frame = namedtuple('Frame', [
+    'path', 'logicalfile', 'name', 'origin', 'copynumber', 'description',
+    'index_type', 'index_units', 'direction', 'spacing', 'index_min',
+    'index_max', 'records', 'lf',
+])
+
+Channel = namedtuple('Channel', [
+    'path', 'logicalfile', 'frame', 'name', 'origin', 'copynumber',
+    'long_name', 'units', 'reprc', 'dimension', 'index_units', 'lf',
+])
+
+# The tables of every kind of result
+tables = {
+    Origin : """
+        FROM origins
+        JOIN logicalfiles ON origins.logicalfile = logicalfiles.id
+        JOIN files ON logicalfiles.file = files.id
+    """,
+    Frame : """
+        FROM frames
+        JOIN logicalfiles ON frames.logicalfile = logicalfiles.id
+        JOIN files ON logicalfiles.file = files.id
+    """,
+    Channel : """
+        FROM channels
+        JOIN logicalfiles ON channels.logicalfile = logicalfiles.id
+        JOIN files ON logicalfiles.file = files.id
+        LEFT JOIN frames ON channels.frame = frames.id
+    """,
+}
+
+# The column of every field of the results
+columns = {
+    Origin : dict(zip(Origin._fields, [
+        'files.path', 'logicalfiles.position', 'origins.name',
+        'origins.origin', 'origins.copynumber', 'origins.file_id',
+        'origins.file_set_name', 'origins.well_id', 'origins.well_name',
+        'origins.field_name', 'origins.company', 'origins.producer_name',
+        'origins.product', 'logicalfiles.id',
+    ])),
+    Frame : dict(zip(Frame._fields, [
+        'files.path', 'logicalfiles.position', 'frames.name',
+        'frames.origin', 'frames.copynumber', 'frames.description',
+        'frames.index_type', 'frames.index_units', 'frames.direction',
+        'frames.spacing', 'frames.index_min', 'frames.index_max',
+        'frames.records', 'logicalfiles.id',
+    ])),
+    Channel : dict(zip(Channel._fields, [
+        'files.path', 'logicalfiles.position', 'frames.name',
+        'channels.name', 'channels.origin', 'channels.copynumber',
+        'channels.long_name', 'channels.units', 'channels.reprc',
+        'channels.dimension', 'frames.index_units', 'logicalfiles.id',
+    ])),
+}
+
+def sqlvalue(value):
+    """Value as something sqlite can store"""
+    if value is None or isinstance(value, (int, float, str)):
+        return value
+    if isinstance(value, bytes):
+        return value.decode('latin1')
+    return str(value)
+
+def describe(path):
+    """The metadata of all logical files in the file at path
+
+    This is what is run in the worker processes, and everything is returned
+    as plain values, for sending back to the catalog.
+    """
+    try:
+        lfs = []
+        for position, f in enumerate(iterload(path)):
+            with f:
+                lfs.append(describe_lf(position, f))
+        return { 'lfs' : lfs }
+    except Exception as e:
+        return { 'error' : repr(e) }
+
+def describe_lf(position, f):
+    origins = [
+        (
+            sqlvalue(x.name),
+            x.origin,
+            x.copynumber,
+            sqlvalue(x.file_id),
+            sqlvalue(x.file_set_name),
+            sqlvalue(x.well_id),
+            sqlvalue(x.well_name),
+            sqlvalue(x.field_name),
+            sqlvalue(x.company),
+            sqlvalue(x.producer_name),
+            sqlvalue(x.product),
+        )
+        for x in f.origins
+    ]
+
+    frames = []
+    framed = {}
+    for frame in f.frames:
+        tells = f.fdata_index.get(frame.fingerprint, [])
+        channels = frame.channels
+        if None in channels:
+            msg = '{} references channels that are not in the file'
+            logging.warning(msg.format(frame))
+
+        units = None
+        if frame.index_type is not None and channels and channels[0]:
+            units = sqlvalue(channels[0].units)
+
+        frames.append((
+            frame.fingerprint,
+            sqlvalue(frame.name),
+            frame.origin,
+            frame.copynumber,
+            sqlvalue(frame.description),
+            sqlvalue(frame.index_type),
+            units,
+            sqlvalue(frame.direction),
+            sqlvalue(frame.spacing),
+            sqlvalue(frame.index_min),
+            sqlvalue(frame.index_max),
+            len(tells),
+            np.asarray(tells, dtype = np.int64).tobytes(),
+        ))
+        for channel in channels:
+            if channel is None: continue
+            framed.setdefault(channel.fingerprint, frame.fingerprint)
+
+    channels = [
+        (
+            framed.get(x.fingerprint),
+            sqlvalue(x.name),
+            x.origin,
+            x.copynumber,
+            sqlvalue(x.long_name),
+            sqlvalue(x.units),
+            x.reprc,
+            json.dumps(list(x.dimension)),
+        )
+        for x in f.channels
+    ]
+
+    return {
+        'position'  : position,
+        'offset'    : f.offset,
+        'tapemarks' : bool(f.tapemarks),
+        'size'      : f.tell,
+        'sul'       : None if f.sul is None else bytes(f.sul),
+        'explicits' : np.asarray(f.explicits, dtype = np.int64).tobytes(),
+        'origins'   : origins,
+        'frames'    : frames,
+        'channels'  : channels,
+    }
+
+@functools.lru_cache(maxsize = 128)
+def regex(pattern):
+    try:
+        return re.compile(pattern, flags = re.IGNORECASE)
+    except re.error:
+        msg = 'Invalid regex: {}'.format(pattern)
+        raise ValueError(msg)
+
+def regexp(pattern, value):
+    if value is None: return False
+    return regex(pattern).match(str(value)) is not None
+
+class Catalog(object):
+    """Index of the metadata of many files
+
+    The catalog is an SQLite database of the files, logical files, origins,
+    frames and channels of a collection of files, and of where the frame
+    data records of every frame are. It is built by crawling files and
+    directories with :py:func:`update`, which loads the files in parallel,
+    but reads no curves. Later updates only load the files that are new, or
+    that have changed size or modification time since, and drop the files
+    that are gone.
+
+    Queries take keyword arguments to filter on, by the fields of the
+    results. Strings are regular expressions, matched case-insensitively
+    from the start of the field, like :py:func:`dlisio.dlis.match`. Other
+    values must be equal.
+
+    Parameters
+    ----------
+    path : str_like
+        Path to the database, which is created if it does not exist
+
+    Examples
+    --------
+    Index an archive, using all cpus
+
+    >>> from dlisio.catalog import Catalog
+
+    >>> with Catalog('archive.db') as cat:
+    ...     cat.update(['/archive'])
+
+    Find the GR channels in frames indexed in feet
+
+    >>> with Catalog('archive.db') as cat:
+    ...     matches = cat.channels(name = 'GR$', index_units = 'ft')
+    >>> matches[0].path, matches[0].frame
+    ('/archive/well-1.dlis', '800T')
+
+    Read the curves of a match, without indexing the file again
+
+    >>> with cat.open(matches[0]) as f:
+    ...     frame = f.object('FRAME', matches[0].frame)
+    ...     curves = frame.curves()
+    """
+    def __init__(self, path):
+        self.db = sqlite3.connect(str(path))
+        self.db.create_function('REGEXP', 2, regexp)
+        self.db.execute('PRAGMA foreign_keys = ON')
+        self.db.execute('PRAGMA journal_mode = WAL')
+        self.db.executescript(schema)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, type, value, traceback):
+        self.close()
+
+    def close(self):
+        """Close the database"""
+        self.db.close()
+
+    def update(self, paths, jobs=None, progress=None):
+        """Index new and changed files
+
+        Directories are searched recursively for .dlis files. Files that are
+        already indexed are loaded again only if their size or modification
+        time has changed. Files that fail to load are recorded with the
+        error, and are not tried again until they change. Indexed files that
+        no longer exist, either in the directories or as paths, are removed.
+
+        Parameters
+        ----------
+        paths : list of str_like
+            files and directories
+        jobs : int, optional
+            Number of processes. Defaults to os.cpu_count(), and with
+            jobs = 1, files are loaded in this process.
+        progress : callable, optional
+            Called as progress(path, done, total) after every file is
+            indexed
+
+        Returns
+        -------
+        stats : dict
+            The number of files 'added', 'updated', 'removed', 'unchanged'
+            and 'failed'
+        """
+        paths = [os.path.abspath(str(x)) for x in paths]
+        found = [os.path.abspath(x) for x in dlisutils.findfiles(paths)]
+
+        known = {
+            path : (id, size, mtime)
+            for id, path, size, mtime in self.db.execute(
+                'SELECT id, path, size, mtime FROM files'
+            )
+        }
+
+        stats = dict.fromkeys(
+            ['added', 'updated', 'removed', 'unchanged', 'failed'], 0
+        )
+
+        stale = set()
+        for path in paths:
+            if os.path.isdir(path):
+                prefix = os.path.join(path, '')
+                stale.update(x for x in known if x.startswith(prefix))
+            else:
+                stale.add(path)
+        stale.intersection_update(known)
+
+        work = []
+        stat = {}
+        for path in found:
+            try:
+                st = os.stat(path)
+            except OSError:
+                continue
+
+            stale.discard(path)
+            stat[path] = (st.st_size, st.st_mtime)
+            if path in known and known[path][1:] == stat[path]:
+                stats['unchanged'] += 1
+                continue
+            work.append(path)
+
+        with self.db:
+            for path in stale:
+                self.db.execute('DELETE FROM files WHERE id = ?',
+                                (known[path][0],))
+        stats['removed'] = len(stale)
+
+        results = dlisutils.parallel(describe, work, jobs)
+        for done, (path, result) in enumerate(results, 1):
+            if isinstance(result, Exception):
+                result = { 'error' : 'process died: {}'.format(result) }
+
+            with self.db:
+                self.insert(path, stat[path], result)
+
+            if 'error' in result:      stats['failed'] += 1
+            elif path in known:        stats['updated'] += 1
+            else:                      stats['added'] += 1
+
+            if progress is not None: progress(path, done, len(work))
+
+        return stats
+
+    def insert(self, path, stat, result):
+        db = self.db
+        db.execute('DELETE FROM files WHERE path = ?', (path,))
+        cur = db.execute(
+            'INSERT INTO files (path, size, mtime, error) VALUES (?,?,?,?)',
+            (path, stat[0], stat[1], result.get('error')),
+        )
+        fileid = cur.lastrowid
+
+        for lf in result.get('lfs', []):
+            cur = db.execute("""
+                INSERT INTO logicalfiles
+                (file, position, offset, tapemarks, size, sul, explicits)
+                VALUES (?,?,?,?,?,?,?)
+                """, (fileid, lf['position'], lf['offset'], lf['tapemarks'],
+                      lf['size'], lf['sul'], lf['explicits']),
+            )
+            lfid = cur.lastrowid
+
+            db.executemany("""
+                INSERT INTO origins
+                (logicalfile, name, origin, copynumber, file_id,
+                 file_set_name, well_id, well_name, field_name, company,
+                 producer_name, product)
+                VALUES (?,?,?,?,?,?,?,?,?,?,?,?)
+                """, [(lfid,) + x for x in lf['origins']],
+            )
+
+            frameids = {}
+            for frame in lf['frames']:
+                cur = db.execute("""
+                    INSERT INTO frames
+                    (logicalfile, fingerprint, name, origin, copynumber,
+                     description, index_type, index_units, direction,
+                     spacing, index_min, index_max, records, fdata)
+                    VALUES (?,?,?,?,?,?,?,?,?,?,?,?,?,?)
+                    """, (lfid,) + frame,
+                )
+                frameids[frame[0]] = cur.lastrowid
+
+            db.executemany("""
+                INSERT INTO channels
+                (logicalfile, frame, name, origin, copynumber, long_name,
+                 units, reprc, dimension)
+                VALUES (?,?,?,?,?,?,?,?,?)
+                """, [
+                    (lfid, frameids.get(x[0])) + x[1:]
+                    for x in lf['channels']
+                ],
+            )
+
+    def query(self, kind, filters):
+        sql = 'SELECT {} {}'.format(', '.join(columns[kind].values()),
+                                    tables[kind])
+        where = []
+        args = []
+        for key, value in filters.items():
+            if key not in columns[kind]:
+                msg = 'unknown field {}, expected one of {}'
+                raise ValueError(msg.format(key, ', '.join(kind._fields)))
+
+            column = columns[kind][key]
+            if value is None:
+                where.append('{} IS NULL'.format(column))
+            elif isinstance(value, str):
+                regex(value)
+                where.append('{} REGEXP ?'.format(column))
+                args.append(value)
+            else:
+                where.append('{} = ?'.format(column))
+                args.append(value)
+
+        if where: sql += ' WHERE ' + ' AND '.join(where)
+        sql += ' ORDER BY 1, 2'
+        return [kind(*row) for row in self.db.execute(sql, args)]
+
+    def origins(self, **filters):
+        """Find origins
+
+        Parameters
+        ----------
+        **filters
+            Filter on the fields of Origin, like well_name
+
+        Returns
+        -------
+        origins : list of Origin
+        """
+        return self.query(Origin, filters)
+
+    def frames(self, **filters):
+        """Find frames
+
+        Parameters
+        ----------
+        **filters
+            Filter on the fields of Frame, like name and index_units
+
+        Returns
+        -------
+        frames : list of Frame
+        """
+        return self.query(Frame, filters)
+
+    def channels(self, **filters):
+        """Find channels
+
+        The channels are those of the CHANNEL set, and a channel that is in
+        no frame has frame and index_units None.
+
+        Parameters
+        ----------
+        **filters
+            Filter on the fields of Channel, like name, units and
+            index_units
+
+        Returns
+        -------
+        channels : list of Channel
+        """
+        return self.query(Channel, filters)
+
+    def files(self, **filters):
+        """Indexed files, and why they failed, if they did
+
+        Parameters
+        ----------
+        **filters
+            Filter on path and error
+
+        Returns
+        -------
+        files : list of (path, error)
+        """
+        sql = 'SELECT path, error FROM files'
+        where = []
+        args = []
+        for key, value in filters.items():
+            if key not in ('path', 'error'):
+                msg = 'unknown field {}, expected one of path, error'
+                raise ValueError(msg.format(key))
+            if value is None:
+                where.append('{} IS NULL'.format(key))
+            else:
+                regex(value)
+                where.append('{} REGEXP ?'.format(key))
+                args.append(value)
+
+        if where: sql += ' WHERE ' + ' AND '.join(where)
+        sql += ' ORDER BY path'
+        return list(self.db.execute(sql, args))
+
+    def open(self, entry):
+        """Open the logical file of an origin, frame or channel
+
+        The logical file is opened from what is in the catalog, without
+        indexing the file. The objects are read and parsed again, but no
+        other part of the file is read until it's needed, such as the curves
+        of a frame.
+
+        Parameters
+        ----------
+        entry : Origin or Frame or Channel
+
+        Returns
+        -------
+        dlis : dlisio.dlis
+
+        Raises
+        ------
+        RuntimeError
+            If the file has changed since it was indexed
+        """
+        row = self.db.execute("""
+            SELECT files.path, files.size, files.mtime, logicalfiles.offset,
+                   logicalfiles.tapemarks, logicalfiles.size,
+                   logicalfiles.sul, logicalfiles.explicits
+            FROM logicalfiles JOIN files ON logicalfiles.file = files.id
+            WHERE logicalfiles.id = ?
+        """, (entry.lf,)).fetchone()
+
+        if row is None:
+            raise ValueError('{} is not in the catalog'.format(entry))
+
+        path, size, mtime, offset, tapemarks, lfsize, sul, explicits = row
+        st = os.stat(path)
+        if (st.st_size, st.st_mtime) != (size, mtime):
+            msg = '{} has changed since it was indexed, update the catalog'
+            raise RuntimeError(msg.format(path))
+
+        fdata = {
+            fingerprint : np.frombuffer(tells, dtype = np.int64).tolist()
+            for fingerprint, tells in self.db.execute(
+                'SELECT fingerprint, fdata FROM frames WHERE logicalfile = ?',
+                (entry.lf,)
+            )
+        }
+        explicits = np.frombuffer(explicits, dtype = np.int64).tolist()
+
+        return reopen(path, offset, bool(tapemarks), lfsize, sul, explicits,
+                      fdata)
@@ -0,0 +1,438 @@
+"""
+Convert dlis files to columnar storage
+
+Every frame of every logical file is written as its own dataset, with one
+column per channel, and the attributes of the frame and its channels as
+metadata. The curves are read and written in chunks of bounded size, so
+frames of any size can be converted with bounded memory, and the files are
+spread over a pool of processes.
+
+The outcome of every file is appended to a manifest, and files already
+converted are skipped when the conversion is run again, so an interrupted
+conversion resumes where it left off. Output files are written under a
+temporary name, and only renamed when complete.
+
+The formats are parquet (requires pyarrow), hdf5 (requires h5py) and zarr
+(requires zarr).
+
+Usage:
+
+    python -m dlisio.convert -o OUTDIR [-f FORMAT] [-j JOBS] PATH [PATH ...]
+
+or, when installed, dlisio-convert. See dlisio-convert --help.
+"""
+import argparse
+import json
+import os
+import shutil
+import sys
+import time
+
+import numpy as np
+
+from . import core
+from . import load
+from . import dlisutils
+
+formats = ('parquet', 'hdf5', 'zarr')
+
+def datasetname(index, frame):
+    """Name of the dataset of frame, in the logical file with index"""
+    name = '{}.{}.{}'.format(frame.name, frame.origin, frame.copynumber)
+    return '{}/{}'.format(index, name.replace('/', '_'))
+
+def chunks(f, frame, chunksize):
+    """Read the curves of frame in columns, about chunksize bytes at a time"""
+    dtype = frame.dtype(strict=False)
+    fmts = ['i'] + [ch.fmtstr() for ch in frame.channels]
+    read = lambda indices: dlisutils.columns(f, frame, dtype, fmts,
+                                             indices = indices)
+    return dlisutils.chunks(f, frame, dtype, chunksize, read)
+
+def native(values, reprc):
+    """Values, as decoded by read_fdata, without python objects
+
+    Validated values become an extra, last dimension of value and bounds,
+    DTIME becomes datetime64[ms], and the other objects become strings.
+    Values of formats without strings of fixed size, like numpy's unicode,
+    are strings too.
+    """
+    if values.dtype.kind == 'U':
+        return values.astype(object)
+
+    if values.dtype != np.dtype('O'):
+        return values
+
+    reprc = core.reprc(reprc)
+    if reprc in dlisutils.validated:
+        return dlisutils.unpackvalidated(values, reprc)
+
+    if reprc == core.reprc.dtime:
+        return values.astype('datetime64[ms]')
+
+    return np.vectorize(str, otypes = [object])(values)
+
+class ParquetSink(object):
+    """One parquet file per frame, in a directory per dlis file"""
+    suffix = ''
+
+    def __init__(self, path):
+        try:
+            import pyarrow.parquet
+        except ImportError as e:
+            raise ImportError('parquet output requires pyarrow') from e
+        self.pq = pyarrow.parquet
+        self.path = path
+        os.makedirs(path)
+
+    def frame(self, name, frame):
+        path = os.path.join(self.path, name + '.parquet')
+        os.makedirs(os.path.dirname(path), exist_ok = True)
+        return ParquetFrame(self.pq, path, frame)
+
+    def close(self):
+        pass
+
+class ParquetFrame(object):
+    def __init__(self, pq, path, frame):
+        self.pq = pq
+        self.path = path
+        self.frame = frame
+        self.writer = None
+
+    def write(self, columns):
+        table = dlisutils.arrow(self.frame, columns)
+        if self.writer is None:
+            self.writer = self.pq.ParquetWriter(self.path, table.schema)
+        self.writer.write_table(table)
+
+    def close(self):
+        if self.writer is not None: self.writer.close()
+
+class HDF5Sink(object):
+    """One hdf5 file per dlis file, and a group of datasets per frame"""
+    suffix = '.h5'
+
+    def __init__(self, path):
+        try:
+            import h5py
+        except ImportError as e:
+            raise ImportError('hdf5 output requires h5py') from e
+        self.h5py = h5py
+        self.file = h5py.File(path, 'w')
+
+    def frame(self, name, frame):
+        group = self.file.create_group(name)
+        group.attrs.update(dlisutils.framemeta(frame))
+        return GroupFrame(group, frame, self.create)
+
+    def create(self, group, name, values):
+        dtype = values.dtype
+        if dtype == np.dtype('O'):
+            dtype = self.h5py.string_dtype()
+        # hdf5 has no datetime, store milliseconds since the epoch
+        if dtype.kind == 'M':
+            dtype = np.dtype('i8')
+
+        shape = values.shape[1:]
+        dataset = group.create_dataset(name,
+                                       shape = (0,) + shape,
+                                       maxshape = (None,) + shape,
+                                       dtype = dtype,
+                                       chunks = True)
+        if values.dtype.kind == 'M':
+            dataset.attrs['epoch'] = '1970-01-01T00:00:00'
+            dataset.attrs['resolution'] = 'ms'
+        return HDF5Column(dataset)
+
+    def close(self):
+        self.file.close()
+
+class HDF5Column(object):
+    def __init__(self, dataset):
+        self.dataset = dataset
+        self.attrs = dataset.attrs
+
+    def append(self, values):
+        if values.dtype.kind == 'M':
+            values = values.astype('i8')
+        n = len(self.dataset)
+        self.dataset.resize(n + len(values), axis = 0)
+        self.dataset[n:] = values
+
+class ZarrSink(object):
+    """One zarr store per dlis file, and a group of arrays per frame"""
+    suffix = '.zarr'
+
+    def __init__(self, path):
+        try:
+            import zarr
+        except ImportError as e:
+            raise ImportError('zarr output requires zarr') from e
+        self.root = zarr.open_group(path, mode = 'w')
+
+    def frame(self, name, frame):
+        group = self.root.require_group(name)
+        group.attrs.update(dlisutils.framemeta(frame))
+        return GroupFrame(group, frame, self.create)
+
+    def create(self, group, name, values):
+        dtype = str if values.dtype == np.dtype('O') else values.dtype
+        shape = values.shape[1:]
+        rows = max(1, (1 << 20) // max(values[:1].nbytes, 1))
+        return group.create_array(name,
+                                  shape = (0,) + shape,
+                                  chunks = (rows,) + shape,
+                                  dtype = dtype)
+
+    def close(self):
+        pass
+
+class GroupFrame(object):
+    """A frame as a group of one dataset per channel, for hdf5 and zarr"""
+    def __init__(self, group, frame, create):
+        self.group = group
+        self.frame = frame
+        self.create = create
+        self.columns = None
+
+    def write(self, columns):
+        reprcs = [None] + [ch.reprc for ch in self.frame.channels]
+        channels = [None] + list(self.frame.channels)
+        values = [
+            native(x, reprc) for x, reprc in zip(columns.values(), reprcs)
+        ]
+
+        if self.columns is None:
+            self.columns = []
+            for name, x, channel in zip(columns, values, channels):
+                column = self.create(self.group, name.replace('/', '_'), x)
+                if channel is not None:
+                    column.attrs.update(dlisutils.channelmeta(channel))
+                self.columns.append(column)
+
+        for column, x in zip(self.columns, values):
+            column.append(x)
+
+    def close(self):
+        pass
+
+sinks = {
+    'parquet' : ParquetSink,
+    'hdf5'    : HDF5Sink,
+    'zarr'    : ZarrSink,
+}
+
+def convert_file(path, output, format = 'parquet', chunksize = 64 << 20):
+    """Convert a single dlis file
+
+    Write every frame of the file at path to output, as a single file or
+    directory of the format. The output is written under a temporary name,
+    and renamed to output when complete.
+
+    Returns
+    -------
+    stats : dict
+        with the number of frames, rows and seconds spent
+    """
+    start = time.perf_counter()
+    partial = output + '.partial'
+    if os.path.isdir(partial): shutil.rmtree(partial)
+    elif os.path.exists(partial): os.remove(partial)
+
+    frames = 0
+    rows = 0
+    sink = sinks[format](partial)
+    try:
+        with load(path) as files:
+            for index, f in enumerate(files):
+                for frame in f.frames:
+                    out = sink.frame(datasetname(index, frame), frame)
+                    for columns in chunks(f, frame, chunksize):
+                        out.write(columns)
+                        rows += len(columns['FRAMENO'])
+                    out.close()
+                    frames += 1
+    except:
+        sink.close()
+        if os.path.isdir(partial): shutil.rmtree(partial)
+        elif os.path.exists(partial): os.remove(partial)
+        raise
+    sink.close()
+
+    if os.path.isdir(output): shutil.rmtree(output)
+    os.replace(partial, output)
+
+    return {
+        'frames'  : frames,
+        'rows'    : rows,
+        'seconds' : time.perf_counter() - start,
+    }
+
+def _convert_file(args):
+    """convert_file, reporting errors rather than raising them"""
+    path = args[0]
+    try:
+        stats = convert_file(*args)
+        stats['status'] = 'done'
+    except Exception as e:
+        stats = { 'status' : 'failed', 'error' : repr(e) }
+    stats['path'] = path
+    return stats
+
+def readmanifest(path):
+    """The latest entry of every file in the manifest"""
+    entries = {}
+    if not os.path.exists(path): return entries
+
+    with open(path) as f:
+        for line in f:
+            try:
+                entry = json.loads(line)
+            except ValueError:
+                # a line cut short by an interrupted conversion
+                continue
+            entries[entry['path']] = entry
+    return entries
+
+def convert(paths, outdir, format = 'parquet', jobs = None,
+            chunksize = 64 << 20, manifest = None, resume = True,
+            report = None):
+    """Convert dlis files to columnar storage
+
+    Every file is converted to a file or directory in outdir, at the same
+    relative path as the file has to the common directory of all files.
+
+    Parameters
+    ----------
+    paths : list of str
+        dlis files, and directories to search for .dlis files
+    outdir : str
+    format : {'parquet', 'hdf5', 'zarr'}
+    jobs : int, optional
+        Number of processes. Defaults to os.cpu_count(), and with jobs = 1,
+        files are converted in this process.
+    chunksize : int, optional
+        Approximate size, in bytes, of the curves read at a time
+    manifest : str, optional
+        Path of the manifest, defaults to outdir/manifest.jsonl
+    resume : bool, optional
+        Skip files that are converted according to the manifest, and that
+        have not changed since
+    report : callable, optional
+        Called with the stats of every file as it is done
+
+    Returns
+    -------
+    stats : list of dict
+        the stats of every file converted, or that failed
+    """
+    if format not in sinks:
+        msg = 'format must be one of {}, was {}'
+        raise ValueError(msg.format(', '.join(formats), format))
+
+    files = [os.path.abspath(x) for x in dlisutils.findfiles(paths)]
+    if not files: return []
+
+    if manifest is None:
+        manifest = os.path.join(outdir, 'manifest.jsonl')
+
+    entries = readmanifest(manifest) if resume else {}
+    root = os.path.commonpath([os.path.dirname(x) for x in files])
+    suffix = sinks[format].suffix
+
+    work = []
+    for path in files:
+        stat = os.stat(path)
+        entry = entries.get(path)
+        if (entry is not None and entry['status'] == 'done' and
+                entry.get('size') == stat.st_size and
+                entry.get('mtime') == stat.st_mtime):
+            continue
+
+        output = os.path.join(outdir, os.path.relpath(path, root) + suffix)
+        os.makedirs(os.path.dirname(output), exist_ok = True)
+        work.append((path, output, format, chunksize))
+
+    os.makedirs(os.path.dirname(os.path.abspath(manifest)), exist_ok = True)
+
+    done = []
+    def record(stats):
+        stat = os.stat(stats['path'])
+        stats['size'] = stat.st_size
+        stats['mtime'] = stat.st_mtime
+        with open(manifest, 'a') as f:
+            f.write(json.dumps(stats) + '\n')
+        done.append(stats)
+        if report is not None: report(stats)
+
+    for args, stats in dlisutils.parallel(_convert_file, work, jobs):
+        if isinstance(stats, Exception):
+            stats = {
+                'path'   : args[0],
+                'status' : 'failed',
+                'error'  : 'process died: {}'.format(stats),
+            }
+        record(stats)
+
+    return done
+
+def main(argv = None):
+    parser = argparse.ArgumentParser(
+        prog = 'dlisio-convert',
+        description = 'Convert the frames of dlis files to columnar storage',
+    )
+    parser.add_argument('paths', nargs = '+', metavar = 'PATH',
+        help = 'dlis file, or directory to search for .dlis files')
+    parser.add_argument('-o', '--output', required = True,
+        help = 'output directory')
+    parser.add_argument('-f', '--format', choices = formats,
+        default = 'parquet', help = 'output format (default: parquet)')
+    parser.add_argument('-j', '--jobs', type = int, default = None,
+        help = 'number of processes (default: number of cpus)')
+    parser.add_argument('--chunk-size', type = int, default = 64,
+        help = 'megabytes of curves to read at a time (default: 64)')
+    parser.add_argument('--manifest',
+        help = 'manifest of converted files (default: OUTPUT/manifest.jsonl)')
+    parser.add_argument('--no-resume', action = 'store_true',
+        help = 'convert all files, even those already converted')
+    args = parser.parse_args(argv)
+
+    start = time.perf_counter()
+    nbytes = 0
+    failed = 0
+    def report(stats):
+        nonlocal nbytes, failed
+        if stats['status'] != 'done':
+            failed += 1
+            print('{}: {}'.format(stats['path'], stats['error']),
+                  file = sys.stderr)
+            return
+
+        nbytes += stats['size']
+        elapsed = time.perf_counter() - start
+        print('{}: {} frames, {} rows, {:.1f} MB/s ({:.1f} MB/s total)'.format(
+            stats['path'],
+            stats['frames'],
+            stats['rows'],
+            stats['size'] / (1 << 20) / max(stats['seconds'], 1e-9),
+            nbytes / (1 << 20) / max(elapsed, 1e-9),
+        ))
+
+    stats = convert(args.paths,
+                    args.output,
+                    format = args.format,
+                    jobs = args.jobs,
+                    chunksize = args.chunk_size << 20,
+                    manifest = args.manifest,
+                    resume = not args.no_resume,
+                    report = report)
+
+    elapsed = time.perf_counter() - start
+    print('converted {} files, {} failed, {:.1f} MB in {:.1f}s'.format(
+        len(stats) - failed, failed, nbytes / (1 << 20), elapsed,
+    ))
+    return 1 if failed else 0
+
+if __name__ == '__main__':
+    sys.exit(main())
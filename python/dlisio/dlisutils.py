@@ -2,26 +2,360 @@
 Supporing methods for dlis class.
 Are moved into separate file in order not to clutter interface
 """
+import concurrent.futures
+from concurrent.futures.process import BrokenProcessPool
+import os
+
 import numpy as np
 from . import core
+from .instrumentation import timed
 
-def curves(dlis, frame, dtype, pre_fmt, fmt, post_fmt):
+def output(out, dtype, name='out'):
+    """ For internal use.
+    Check that the caller-provided array out can be decoded into as rows of
+    dtype, and return a view of it. The view does not own its data, which
+    tells the core not to resize it.
+    """
+    if not isinstance(out, np.ndarray):
+        msg = '{} must be a numpy array, was {}'
+        raise TypeError(msg.format(name, type(out)))
+
+    expected = np.empty(shape = 0, dtype = dtype)
+    if out.dtype != expected.dtype or out.shape[1:] != expected.shape[1:]:
+        msg = '{} must have dtype {} and shape (n,{}), was {} and {}'
+        raise ValueError(msg.format(
+            name,
+            expected.dtype,
+            ''.join(' {},'.format(x) for x in expected.shape[1:]),
+            out.dtype,
+            out.shape,
+        ))
+
+    if not out.flags.c_contiguous or not out.flags.writeable:
+        msg = '{} must be C-contiguous and writeable'
+        raise ValueError(msg.format(name))
+
+    return out[:]
+
+def curves(dlis, frame, dtype, pre_fmt, fmt, post_fmt, since=0, workers=1,
+           progress=None, indices=None, out=None):
     """ For internal use.
     Reads curves for provided frame and position defined by frame format:
-    pre_fmt (to skip), fmt (to read), post_fmt (to skip)
+    pre_fmt (to skip), fmt (to read), post_fmt (to skip). Only frames with
+    frame number greater than since are read, by up to workers threads, and
+    the progress is reported to progress. If indices is given, only those
+    records of the frame are read. If out is given, the curves are decoded
+    into it, and the rows read are returned as a view of it.
     """
-    try:
-        indices = dlis.fdata_index[frame.fingerprint]
-    except KeyError:
-        indices = []
+    if indices is None:
+        indices = dlis.fdata_index.get(frame.fingerprint, [])
 
     alloc = lambda size: np.empty(shape = size, dtype = dtype)
-    return core.read_fdata(
-        pre_fmt,
-        fmt,
-        post_fmt,
-        dlis.file,
-        indices,
-        dtype.itemsize,
-        alloc,
-    )
+    if out is not None:
+        out = output(out, dtype)
+        alloc = lambda size: out
+
+    with dlis.lock, timed('read_fdata'):
+        return core.read_fdata(
+            pre_fmt,
+            fmt,
+            post_fmt,
+            dlis.file,
+            indices,
+            dtype.itemsize,
+            alloc,
+            since,
+            workers,
+            progress,
+        )
+
+def columns(dlis, frame, dtype, fmts, since=0, workers=1, progress=None,
+            indices=None, out=None):
+    """ For internal use.
+    Like curves, but reads every field of dtype into its own array, from the
+    format of the same position in fmts. Returns a dict of field name ->
+    array. If indices is given, only those records of the frame are read. If
+    out, a dict of field name -> array, is given, the columns are decoded into
+    it.
+    """
+    if indices is None:
+        indices = dlis.fdata_index.get(frame.fingerprint, [])
+
+    fields = [dtype.fields[name][0] for name in dtype.names]
+    alloc = lambda size: [np.empty(shape = size, dtype = x) for x in fields]
+    if out is not None:
+        missing = [name for name in dtype.names if name not in out]
+        if missing:
+            msg = 'out is missing columns {}'
+            raise ValueError(msg.format(missing))
+
+        out = [
+            output(out[name], field, "out['{}']".format(name))
+            for name, field in zip(dtype.names, fields)
+        ]
+        alloc = lambda size: out
+
+    with dlis.lock, timed('read_fdata'):
+        arrays = core.read_fdata_columns(
+            fmts,
+            [x.itemsize for x in fields],
+            dlis.file,
+            indices,
+            alloc,
+            since,
+            workers,
+            progress,
+        )
+
+    return dict(zip(dtype.names, arrays))
+
+def rowcounts(dlis, frame, indices=None, progress=None):
+    """ For internal use.
+    The number of rows in each of the records of frame, or in the records at
+    indices, as an array. The records are read, but not decoded.
+    """
+    if indices is None:
+        indices = dlis.fdata_index.get(frame.fingerprint, [])
+
+    with dlis.lock, timed('count_frames'):
+        return core.count_frames(frame.fmtstr(), dlis.file, indices, progress)
+
+def chunks(dlis, frame, dtype, chunksize, read):
+    """ For internal use.
+    Split the records of frame into runs with about chunksize bytes of
+    curves, and yield read(indices) for every run, where read returns curves
+    with a FRAMENO field. The number of rows in a record is not known until
+    it is read, so the number of records to read at a time is adjusted to the
+    rows of the previous chunk. At least one, possibly empty, chunk is
+    yielded.
+    """
+    indices = dlis.fdata_index.get(frame.fingerprint, [])
+
+    step = 1
+    start = 0
+    while True:
+        stop = min(start + step, len(indices))
+        chunk = read(indices[start:stop])
+        yield chunk
+
+        if stop == len(indices): break
+
+        nbytes = len(chunk['FRAMENO']) * dtype.itemsize
+        step = max(1, int((stop - start) * chunksize / max(nbytes, 1)))
+        start = stop
+
+# The validated floats are decoded by read_fdata as tuples of the value and
+# its bounds. reprc -> (dtype of the value and bounds, number of them)
+validated = {
+    core.reprc.fsing1 : (np.float32, 2),
+    core.reprc.fsing2 : (np.float32, 3),
+    core.reprc.fdoub1 : (np.float64, 2),
+    core.reprc.fdoub2 : (np.float64, 3),
+}
+
+def unpackvalidated(values, reprc):
+    """ For internal use.
+    The validated floats values, as decoded by read_fdata, as an array with an
+    extra, last dimension of the value and its bounds
+    """
+    dtype, size = validated[reprc]
+    flat = np.array(values.reshape(-1).tolist(), dtype = dtype)
+    return flat.reshape(values.shape + (size,))
+
+def arrowtype(pa, reprc):
+    """ For internal use.
+    The arrow type of a single sample value of the representation code reprc,
+    a core.reprc
+    """
+    if reprc in validated:
+        dtype, size = validated[reprc]
+        return pa.list_(pa.from_numpy_dtype(dtype), size)
+
+    obname = pa.struct([
+        ('origin',     pa.uint32()),
+        ('copynumber', pa.uint8()),
+        ('id',         pa.string()),
+    ])
+
+    types = {
+        core.reprc.csingl : pa.list_(pa.float32(), 2),
+        core.reprc.cdoubl : pa.list_(pa.float64(), 2),
+        core.reprc.ident  : pa.string(),
+        core.reprc.ascii  : pa.string(),
+        core.reprc.dtime  : pa.timestamp('ms'),
+        core.reprc.obname : obname,
+        core.reprc.objref : pa.struct([
+            ('type', pa.string()),
+            ('name', obname),
+        ]),
+        core.reprc.attref : pa.struct([
+            ('type',  pa.string()),
+            ('name',  obname),
+            ('label', pa.string()),
+        ]),
+        core.reprc.units  : pa.string(),
+    }
+    return types.get(reprc)
+
+def arrowvalues(pa, values, reprc):
+    """ For internal use.
+    Convert the flat numpy array values, as decoded by read_fdata, to an arrow
+    array. Plain numbers are not copied.
+    """
+    if reprc is not None: reprc = core.reprc(reprc)
+    iscomplex = reprc in (core.reprc.csingl, core.reprc.cdoubl)
+
+    if iscomplex:
+        values = values.view(values.real.dtype)
+
+    if values.dtype != np.dtype('O'):
+        values = pa.array(values)
+        if not iscomplex: return values
+        return pa.FixedSizeListArray.from_arrays(values, 2)
+
+    if reprc in validated:
+        unpacked = unpackvalidated(values, reprc)
+        flat = pa.array(unpacked.reshape(-1))
+        return pa.FixedSizeListArray.from_arrays(flat, unpacked.shape[-1])
+
+    def name(x):
+        return { 'origin': x.origin, 'copynumber': x.copynumber, 'id': x.id }
+
+    if reprc == core.reprc.obname:
+        values = [name(x) for x in values]
+    elif reprc == core.reprc.objref:
+        values = [{ 'type': x.type, 'name': name(x.name) } for x in values]
+    elif reprc == core.reprc.attref:
+        values = [
+            { 'type': x.type, 'name': name(x.name), 'label': x.label }
+            for x in values
+        ]
+
+    return pa.array(values, type = arrowtype(pa, reprc))
+
+def strmeta(values):
+    """ For internal use.
+    The values that are set, as strings, for formats like arrow where
+    metadata is strings
+    """
+    return {
+        key : str(value)
+        for key, value in values.items()
+        if value is not None
+    }
+
+def channelmeta(channel):
+    """ For internal use.
+    The attributes of a channel that are stored with its curves on export
+    """
+    return strmeta({
+        'name':       channel.name,
+        'origin':     channel.origin,
+        'copynumber': channel.copynumber,
+        'long_name':  channel.long_name,
+        'units':      channel.units,
+        'reprc':      channel.reprc,
+        'dimension':  channel.dimension,
+    })
+
+def framemeta(frame):
+    """ For internal use.
+    The attributes of a frame that are stored with its curves on export
+    """
+    return strmeta({
+        'name':        frame.name,
+        'origin':      frame.origin,
+        'copynumber':  frame.copynumber,
+        'description': frame.description,
+        'index':       frame.index,
+        'index_type':  frame.index_type,
+        'direction':   frame.direction,
+        'spacing':     frame.spacing,
+        'index_min':   frame.index_min,
+        'index_max':   frame.index_max,
+    })
+
+def arrow(frame, curves, metadata=True):
+    """ For internal use.
+    Make a pyarrow.Table of the columns curves, as returned by
+    frame.curves(layout='columns'). The columns are wrapped by arrow without
+    copying, except for the columns of python objects, which are converted
+    value by value.
+    """
+    try:
+        import pyarrow as pa
+    except ImportError as e:
+        msg = 'Frame.to_arrow requires pyarrow'
+        raise ImportError(msg) from e
+
+    channels = [None] + list(frame.channels)
+    columns, fields = [], []
+    for (name, values), channel in zip(curves.items(), channels):
+        shape = values.shape[1:]
+        reprc = channel.reprc if channel is not None else None
+
+        column = arrowvalues(pa, values.reshape(-1), reprc)
+        for size in reversed(shape):
+            column = pa.FixedSizeListArray.from_arrays(column, size)
+
+        meta = None
+        if channel is not None and metadata:
+            meta = channelmeta(channel)
+
+        columns.append(column)
+        fields.append(pa.field(name, column.type, metadata = meta))
+
+    meta = framemeta(frame) if metadata else None
+    schema = pa.schema(fields, metadata = meta)
+    return pa.Table.from_arrays(columns, schema = schema)
+
+def findfiles(paths):
+    """ For internal use.
+    The dlis files in paths, by searching directories recursively
+    """
+    files = []
+    for path in paths:
+        if not os.path.isdir(path):
+            files.append(path)
+            continue
+
+        for root, _, names in os.walk(path):
+            files.extend(
+                os.path.join(root, name) for name in sorted(names)
+                if name.lower().endswith('.dlis')
+            )
+    return files
+
+def parallel(fn, work, jobs=None):
+    """ For internal use.
+    Call fn(args) for every args in work in a pool of jobs processes, or in
+    this process if jobs is 1, and yield (args, result) as they complete.
+    fn must handle its own exceptions. If the process running fn dies, e.g.
+    from a segfault on a broken file, result is the BrokenProcessPool
+    exception.
+    """
+    if jobs == 1:
+        for args in work:
+            yield args, fn(args)
+        return
+
+    broken = []
+    with concurrent.futures.ProcessPoolExecutor(jobs) as pool:
+        futures = { pool.submit(fn, args) : args for args in work }
+        for future in concurrent.futures.as_completed(futures):
+            try:
+                result = future.result()
+            except BrokenProcessPool:
+                broken.append(futures[future])
+                continue
+            yield futures[future], result
+
+    # A dead process takes the pool and all its pending work with it. Run
+    # that work one by one in a process of its own, so only the culprit fails
+    for args in broken:
+        with concurrent.futures.ProcessPoolExecutor(1) as pool:
+            try:
+                result = pool.submit(fn, args).result()
+            except BrokenProcessPool as e:
+                result = e
+        yield args, result
@@ -1,5 +1,8 @@
+#include <algorithm>
+#include <atomic>
 #include <bitset>
 #include <cerrno>
+#include <condition_variable>
 #include <cstdint>
 #include <cstdio>
 #include <cstring>
@@ -7,12 +10,15 @@
 #include <fstream>
 #include <iterator>
 #include <memory>
+#include <mutex>
 #include <string>
+#include <thread>
 #include <type_traits>
 #include <vector>
 #include <limits>
 
 #include <pybind11/pybind11.h>
+#include <pybind11/numpy.h>
 #include <pybind11/stl_bind.h>
 #include <pybind11/stl.h>
 #include <datetime.h>
@@ -303,6 +309,76 @@ py::dict storage_label( py::buffer b ) {
     );
 }
 
+/*
+ * Decode count consecutive values of a fixed-size representation code in
+ * one go. Validated floats come out as (count, 2) and (count, 3) arrays of
+ * their components, everything else as a 1-dimensional array with the same
+ * dtype as a channel of that representation code.
+ */
+py::array decode_array( int reprc, py::buffer b, py::ssize_t count ) {
+    const char* dtype;
+    py::ssize_t components = 1;
+
+    switch (reprc) {
+        case DLIS_FSHORT: dtype = "f4";  break;
+        case DLIS_FSINGL: dtype = "f4";  break;
+        case DLIS_FSING1: dtype = "f4";  components = 2; break;
+        case DLIS_FSING2: dtype = "f4";  components = 3; break;
+        case DLIS_ISINGL: dtype = "f4";  break;
+        case DLIS_VSINGL: dtype = "f4";  break;
+        case DLIS_FDOUBL: dtype = "f8";  break;
+        case DLIS_FDOUB1: dtype = "f8";  components = 2; break;
+        case DLIS_FDOUB2: dtype = "f8";  components = 3; break;
+        case DLIS_CSINGL: dtype = "c8";  break;
+        case DLIS_CDOUBL: dtype = "c16"; break;
+        case DLIS_SSHORT: dtype = "i1";  break;
+        case DLIS_SNORM:  dtype = "i2";  break;
+        case DLIS_SLONG:  dtype = "i4";  break;
+        case DLIS_USHORT: dtype = "u1";  break;
+        case DLIS_UNORM:  dtype = "u2";  break;
+        case DLIS_ULONG:  dtype = "u4";  break;
+        case DLIS_STATUS: dtype = "?";   break;
+        default: {
+            const auto msg = "decode_array: reprc (which is "
+                           + std::to_string( reprc )
+                           + ") is not a fixed-size type";
+            throw std::invalid_argument( msg );
+        }
+    }
+
+    if (count < 0) {
+        const auto msg = "count (which is "
+                       + std::to_string( count )
+                       + ") must be >= 0";
+        throw std::invalid_argument( msg );
+    }
+
+    auto info = b.request();
+    const auto size = py::ssize_t( dlis_sizeof_type( reprc ) );
+    if (info.size * info.itemsize < count * size) {
+        const auto msg = "buffer to small: buffer.size (which is "
+                       + std::to_string( info.size * info.itemsize )
+                       + ") < count * sizeof(reprc) (which is "
+                       + std::to_string( count * size )
+                       + ")";
+        throw std::invalid_argument( msg );
+    }
+
+    std::vector< py::ssize_t > shape = { count };
+    if (components > 1) shape.push_back( components );
+
+    auto array = py::array( py::dtype( dtype ), shape );
+    const auto* src = static_cast< const char* >( info.ptr );
+    auto* dst = array.mutable_data();
+
+    {
+        py::gil_scoped_release nogil;
+        dlis_decode_array( reprc, src, int( count ), dst );
+    }
+
+    return array;
+}
+
 dl::ident fingerprint(const std::string& type,
                       const std::string& id,
                       std::int32_t origin,
@@ -325,13 +401,983 @@ dl::ident fingerprint(const std::string& type,
     return ref.fingerprint();
 }
 
-py::object read_fdata(const char* pre_fmt,
-                      const char* fmt,
-                      const char* post_fmt,
-                      dl::stream& file,
-                      const std::vector< long long >& indices,
-                      std::size_t itemsize,
-                      py::object alloc)
+/*
+ * Expose homogeneous, numeric attribute values as a numpy array
+ *
+ * Through the std::vector caster, attribute values become lists of
+ * individually boxed python objects, which is both slow and memory hungry for
+ * attributes with a lot of values (some vendors put 100k+ elements in
+ * PARAMETER.VALUES).
+ *
+ * Types that map directly onto a numpy type are exposed as a view of the
+ * vector, using the python object_attribute as the array base, so the array
+ * keeps the vector alive. Note that basic_object.__getitem__ returns the
+ * attribute by value, so the view is of a copy of the parsed vector, not of
+ * the pool itself. The strong typedefs are decayed element-wise into a
+ * freshly allocated array, which is still a lot cheaper than going through
+ * python objects. Everything else (strings, validated floats,
+ * references, datetimes) has no sensible numeric representation, and maps to
+ * None.
+ */
+struct attribute_array {
+    py::handle base;
+
+    template < typename T >
+    py::object view( const std::vector< T >& xs ) const {
+        if (xs.empty()) return py::array_t< T >( 0 );
+        return py::array_t< T >( xs.size(), xs.data(), this->base );
+    }
+
+    template < typename T >
+    py::object decayed( const std::vector< T >& xs ) const {
+        using value_type = typename T::value_type;
+        auto array = py::array_t< value_type >( xs.size() );
+        auto* dst = array.mutable_data();
+        for (const auto& x : xs) *dst++ = dl::decay( x );
+        return std::move( array );
+    }
+
+    py::object operator () (const std::vector< dl::fsingl >& xs) const {
+        return this->view( xs );
+    }
+    py::object operator () (const std::vector< dl::fdoubl >& xs) const {
+        return this->view( xs );
+    }
+    py::object operator () (const std::vector< dl::csingl >& xs) const {
+        return this->view( xs );
+    }
+    py::object operator () (const std::vector< dl::cdoubl >& xs) const {
+        return this->view( xs );
+    }
+    py::object operator () (const std::vector< dl::sshort >& xs) const {
+        return this->view( xs );
+    }
+    py::object operator () (const std::vector< dl::snorm >& xs) const {
+        return this->view( xs );
+    }
+    py::object operator () (const std::vector< dl::slong >& xs) const {
+        return this->view( xs );
+    }
+    py::object operator () (const std::vector< dl::ushort >& xs) const {
+        return this->view( xs );
+    }
+    py::object operator () (const std::vector< dl::unorm >& xs) const {
+        return this->view( xs );
+    }
+    py::object operator () (const std::vector< dl::ulong >& xs) const {
+        return this->view( xs );
+    }
+
+    py::object operator () (const std::vector< dl::fshort >& xs) const {
+        return this->decayed( xs );
+    }
+    py::object operator () (const std::vector< dl::isingl >& xs) const {
+        return this->decayed( xs );
+    }
+    py::object operator () (const std::vector< dl::vsingl >& xs) const {
+        return this->decayed( xs );
+    }
+    py::object operator () (const std::vector< dl::uvari >& xs) const {
+        return this->decayed( xs );
+    }
+    py::object operator () (const std::vector< dl::origin >& xs) const {
+        return this->decayed( xs );
+    }
+    py::object operator () (const std::vector< dl::status >& xs) const {
+        return this->decayed( xs );
+    }
+
+    template < typename T >
+    py::object operator () (const T&) const {
+        return py::none();
+    }
+};
+
+/*
+ * Write a bounded-length identifier as numpy unicode (UCS4), see read_fdata
+ * for why this works
+ */
+const char* packident(const char* ptr, unsigned char* dst) noexcept (true) {
+    constexpr auto chars = 255;
+    constexpr auto ident_size = chars * sizeof(std::uint32_t);
+
+    std::int32_t len;
+    char tmp[chars];
+    ptr = dlis_ident(ptr, &len, tmp);
+
+    std::memset(dst, 0, ident_size);
+    for (auto i = 0; i < len; ++i) {
+        const auto x = std::uint32_t(tmp[i]);
+        std::memcpy(dst + i * sizeof(x), &x, sizeof(x));
+    }
+    return ptr;
+}
+
+/*
+ * True if any of the values in fmt are python objects, which can only be
+ * created with the GIL held
+ */
+bool hasobjects(const char* fmt) noexcept (true) {
+    static const char objects[] = {
+        DLIS_FMT_FSING1,
+        DLIS_FMT_FSING2,
+        DLIS_FMT_FDOUB1,
+        DLIS_FMT_FDOUB2,
+        DLIS_FMT_ASCII,
+        DLIS_FMT_OBNAME,
+        DLIS_FMT_OBJREF,
+        DLIS_FMT_ATTREF,
+        DLIS_FMT_DTIME,
+        '\0',
+    };
+    return std::strpbrk(fmt, objects) != nullptr;
+}
+
+/*
+ * The representation code and the alignment of the native type of the format
+ * character f, for the types that dlis_decode_array can decode in bulk.
+ * Returns false for all other types.
+ */
+bool bulkreprc(char f, int& reprc, std::size_t& align) noexcept (true) {
+    switch (f) {
+        case DLIS_FMT_FSHORT: reprc = DLIS_FSHORT; align = 4; return true;
+        case DLIS_FMT_FSINGL: reprc = DLIS_FSINGL; align = 4; return true;
+        case DLIS_FMT_ISINGL: reprc = DLIS_ISINGL; align = 4; return true;
+        case DLIS_FMT_VSINGL: reprc = DLIS_VSINGL; align = 4; return true;
+        case DLIS_FMT_FDOUBL: reprc = DLIS_FDOUBL; align = 8; return true;
+        case DLIS_FMT_CSINGL: reprc = DLIS_CSINGL; align = 4; return true;
+        case DLIS_FMT_CDOUBL: reprc = DLIS_CDOUBL; align = 8; return true;
+        case DLIS_FMT_SSHORT: reprc = DLIS_SSHORT; align = 1; return true;
+        case DLIS_FMT_SNORM:  reprc = DLIS_SNORM;  align = 2; return true;
+        case DLIS_FMT_SLONG:  reprc = DLIS_SLONG;  align = 4; return true;
+        case DLIS_FMT_USHORT: reprc = DLIS_USHORT; align = 1; return true;
+        case DLIS_FMT_UNORM:  reprc = DLIS_UNORM;  align = 2; return true;
+        case DLIS_FMT_ULONG:  reprc = DLIS_ULONG;  align = 4; return true;
+        case DLIS_FMT_STATUS: reprc = DLIS_STATUS; align = 1; return true;
+        default: return false;
+    }
+}
+
+/*
+ * Decode the run of identical values that starts at f with a single call to
+ * dlis_decode_array, which is a lot faster than dlis_packf for wide channels
+ * and arrays. Returns the number of format characters consumed, or 0 if the
+ * type cannot be decoded in bulk, or dst is not aligned for it, in which
+ * case the caller should decode the value with dlis_packf.
+ */
+int packrun(const char* f,
+            const char*& ptr,
+            const char* end,
+            unsigned char*& dst)
+noexcept (false) {
+    int reprc;
+    std::size_t align;
+    if (not bulkreprc(*f, reprc, align))
+        return 0;
+
+    if (reinterpret_cast< std::uintptr_t >(dst) % align != 0)
+        return 0;
+
+    int n = 1;
+    while (f[n] == *f) ++n;
+
+    if (ptr + n * dlis_sizeof_type(reprc) > end) {
+        const auto msg = "corrupted record: fmtstr would read past end";
+        throw std::runtime_error(msg);
+    }
+
+    int dst_skip;
+    const char localfmt[] = {*f, '\0'};
+    dlis_packflen(localfmt, ptr, nullptr, &dst_skip);
+    ptr = dlis_decode_array(reprc, ptr, n, dst);
+    dst += n * dst_skip;
+    return n;
+}
+
+/*
+ * Make a dl::progress that reports to the python callable fn, as
+ * fn(stage, done, total), with total = None when it's not known. Returning
+ * False from fn cancels the operation, and exceptions raised by fn propagate
+ * out of it. The callback can be called from threads without the GIL.
+ */
+dl::progress pyprogress(py::object fn, const char* stage, std::int64_t total)
+noexcept (false) {
+    if (fn.is_none()) return dl::progress();
+
+    /*
+     * The progress is copied and destroyed by the native loops, which may
+     * not hold the GIL, so the reference to fn is only released with it
+     */
+    std::shared_ptr< py::object > callback(
+        new py::object( std::move( fn ) ),
+        []( py::object* x ) {
+            py::gil_scoped_acquire gil;
+            delete x;
+        }
+    );
+
+    return dl::progress([callback, stage](std::int64_t done,
+                                          std::int64_t total) {
+        py::gil_scoped_acquire gil;
+        auto ntotal = total < 0 ? py::object(py::none()) : py::int_(total);
+        auto ret = (*callback)(stage, done, ntotal);
+        return ret.ptr() != Py_False;
+    }, total);
+}
+
+/*
+ * Like py::gil_scoped_release, but only when enabled, and with a way to take
+ * the GIL back for the work that needs it, like growing numpy arrays
+ */
+class optional_nogil {
+public:
+    explicit optional_nogil(bool enable) noexcept (true)
+        : state( enable ? PyEval_SaveThread() : nullptr )
+    {}
+
+    ~optional_nogil() noexcept (true) {
+        if (this->state) PyEval_RestoreThread(this->state);
+    }
+
+    template< typename F >
+    void with_gil(F f) noexcept (false) {
+        if (not this->state) return f();
+
+        PyEval_RestoreThread(this->state);
+        this->state = nullptr;
+        try {
+            f();
+        } catch (...) {
+            this->state = PyEval_SaveThread();
+            throw;
+        }
+        this->state = PyEval_SaveThread();
+    }
+
+private:
+    PyThreadState* state;
+};
+
+using index_iterator = std::vector< long long >::const_iterator;
+
+/*
+ * The output of read_fdata is one or more columns, each an array of rows of
+ * itemsize bytes decoded from fmt, and every frame is the formats of all the
+ * columns in order. Frame.curves' rows layout is a single column of the whole
+ * frame, and the columns layout is one column per channel.
+ */
+struct column {
+    std::string fmt;
+    std::size_t itemsize;
+};
+
+void assert_overflow(const char* ptr, int skip, const char* end)
+noexcept (false) {
+    if (ptr + skip > end) {
+        const auto msg = "corrupted record: fmtstr would read past end";
+        throw std::runtime_error(msg);
+    }
+}
+
+/*
+ * If the frame number of the frame of format fmt at ptr is not after since,
+ * skip the frame and return true
+ */
+bool skipold(const char* fmt,
+             const char*& ptr,
+             const char* end,
+             long long since)
+noexcept (false) {
+    int src_skip;
+    std::int32_t frameno;
+    dlis_packflen("i", ptr, &src_skip, nullptr);
+    assert_overflow(ptr, src_skip, end);
+    dlis_uvari(ptr, &frameno);
+
+    if (frameno > since) return false;
+
+    dlis_packflen(fmt, ptr, &src_skip, nullptr);
+    assert_overflow(ptr, src_skip, end);
+    ptr += src_skip;
+    return true;
+}
+
+/*
+ * Decode the values of fmt at ptr into dst, and advance both. This is the
+ * python-free part of decoding, for formats without python objects, and runs
+ * without the GIL.
+ */
+void packvalues(const char* fmt,
+                const char*& ptr,
+                const char* end,
+                unsigned char*& dst)
+noexcept (false) {
+    for (auto* f = fmt; *f; ++f) {
+        if (*f == DLIS_FMT_IDENT || *f == DLIS_FMT_UNITS) {
+            ptr = packident(ptr, dst);
+            dst += 255 * sizeof(std::uint32_t);
+            continue;
+        }
+
+        const auto run = packrun(f, ptr, end, dst);
+        if (run > 0) {
+            f += run - 1;
+            continue;
+        }
+
+        int src_skip, dst_skip;
+        const char localfmt[] = {*f, '\0'};
+        dlis_packflen(localfmt, ptr, &src_skip, &dst_skip);
+        assert_overflow(ptr, src_skip, end);
+        dlis_packf(localfmt, ptr, dst);
+        dst += dst_skip;
+        ptr += src_skip;
+    }
+}
+
+/*
+ * Decode the values of fmt at ptr into dst, and advance both, like
+ * packvalues, but also the values that are python objects. The object slots
+ * of dst must hold valid references, like the None of a fresh numpy array,
+ * which are replaced. Must be called with the GIL.
+ */
+void packobjects(const char* fmt,
+                 const char*& ptr,
+                 const char* end,
+                 unsigned char*& dst)
+noexcept (false) {
+    int src_skip, dst_skip;
+    for (auto* f = fmt; *f; ++f) {
+        /*
+         * Supporting bounded-length identifiers in frame data is
+         * slightly more difficult than it immediately seem like, and
+         * this implementation relies on a few assumptions that may not
+         * hold.
+         *
+         * 1. numpy structured arrays interpret unicode on the fly
+         *
+         * On my amd64 linux:
+         * >>> dt = np.dtype('U5')
+         * >>> dt.itemsize
+         * 20
+         * >>> np.array(['foo'], dtype = dt)[0]
+         * 'foo'
+         * >>> np.array(['foobar'], dtype = dt)[0]
+         * 'fooba'
+         *
+         * Meaning it supports string lengths of [0, n]. It apparently
+         * (and maybe rightly so) uses null termination, or the bounded
+         * length, which ever comes first.
+         *
+         * 2. numpy stores characters as int32 Py_UNICODE
+         * Numpy seems to always use uint32, and not Py_UNICODE, which
+         * can be both 16 and 32 bits [1]. Since it's an integer it's
+         * endian sensitive, and widening from char works. This is not
+         * really documented by numpy.
+         *
+         * 3. numpy stores no metadata with the string
+         * It is assumed, and seems necessary from the interface, that
+         * there is no in-band metadata stored about the strings when
+         * used in structured arrays. This means we can just write the
+         * unicode ourselves, and have numpy interpret it correctly.
+         *
+         * --
+         * Units is just an IDENT in disguise, so it can very well take
+         * the same code path.
+         *
+         * [1] http://docs.h5py.org/en/stable/strings.html#what-about-numpy-s-u-type
+         *     NumPy also has a Unicode type, a UTF-32 fixed-width
+         *     format (4-byte characters). HDF5 has no support for wide
+         *     characters. Rather than trying to hack around this and
+         *     “pretend” to support it, h5py will raise an error when
+         *     attempting to create datasets or attributes of this
+         *     type.
+         *
+         */
+         auto swap_pointer = [&](py::object obj)
+         {
+             PyObject* p;
+             std::memcpy(&p, dst, sizeof(p));
+             Py_DECREF(p);
+             p = obj.inc_ref().ptr();
+             std::memcpy(dst, &p, sizeof(p));
+             dst += sizeof(p);
+         };
+
+         if (*f == DLIS_FMT_FSING1) {
+            float v;
+            float a;
+            ptr = dlis_fsing1(ptr, &v, &a);
+            auto t = py::make_tuple(v, a);
+
+            swap_pointer(t);
+            continue;
+        }
+
+         if (*f == DLIS_FMT_FSING2) {
+            float v;
+            float a;
+            float b;
+            ptr = dlis_fsing2(ptr, &v, &a, &b);
+            auto t = py::make_tuple(v, a, b);
+
+            swap_pointer(t);
+            continue;
+        }
+
+         if (*f == DLIS_FMT_FDOUB1) {
+            double v;
+            double a;
+            ptr = dlis_fdoub1(ptr, &v, &a);
+            auto t = py::make_tuple(v, a);
+
+            swap_pointer(t);
+            continue;
+        }
+
+         if (*f == DLIS_FMT_FDOUB2) {
+            double v;
+            double a;
+            double b;
+            ptr = dlis_fdoub2(ptr, &v, &a, &b);
+            auto t = py::make_tuple(v, a, b);
+
+            swap_pointer(t);
+            continue;
+        }
+
+        if (*f == DLIS_FMT_IDENT || *f == DLIS_FMT_UNITS) {
+            constexpr auto chars = 255;
+            constexpr auto ident_size = chars * sizeof(std::uint32_t);
+
+            /*
+             * From reading the numpy source, it looks like they put
+             * and interpret the unicode buffer in the array directly,
+             * and pad with zero. This means the string is both null
+             * and length terminated, whichever comes first.
+             */
+            ptr = packident(ptr, dst);
+            dst += ident_size;
+            continue;
+        }
+
+        if (*f == DLIS_FMT_ASCII) {
+            std::int32_t len;
+            ptr = dlis_uvari(ptr, &len);
+            auto ascii = py::str(ptr, len);
+            ptr += len;
+
+            /*
+             * Numpy seems to default initalize object types even in
+             * the case of np.empty to None [1]. The refcount is surely
+             * increased, so decref it before replacing the pointer
+             * with a fresh str.
+             *
+             * [1] Array of uninitialized (arbitrary) data of the given
+             *     shape, dtype, and order. Object arrays will be
+             *     initialized to None.
+             *     https://docs.scipy.org/doc/numpy/reference/generated/numpy.empty.html
+             */
+            swap_pointer(ascii);
+            continue;
+        }
+
+        if (*f == DLIS_FMT_OBNAME) {
+            std::int32_t origin;
+            std::uint8_t copy;
+            std::int32_t idlen;
+            char id[255];
+            ptr = dlis_obname(ptr, &origin, &copy, &idlen, id);
+
+            const auto name = dl::obname {
+                dl::origin(origin),
+                dl::ushort(copy),
+                dl::ident(std::string(id, idlen)),
+            };
+
+            swap_pointer(py::cast(name));
+            continue;
+        }
+
+        if (*f == DLIS_FMT_OBJREF) {
+            std::int32_t idlen;
+            char id[255];
+            std::int32_t origin;
+            std::uint8_t copy;
+            std::int32_t objnamelen;
+            char objname[255];
+            ptr = dlis_objref(ptr,
+                              &idlen,
+                              id,
+                              &origin,
+                              &copy,
+                              &objnamelen,
+                              objname);
+
+            const auto name = dl::objref {
+                dl::ident(std::string(id, idlen)),
+                dl::obname {
+                    dl::origin(origin),
+                    dl::ushort(copy),
+                    dl::ident(std::string(objname, objnamelen)),
+                },
+            };
+
+            swap_pointer(py::cast(name));
+            continue;
+        }
+
+        if (*f == DLIS_FMT_ATTREF) {
+            std::int32_t id1len;
+            char id1[255];
+            std::int32_t origin;
+            std::uint8_t copy;
+            std::int32_t objnamelen;
+            char objname[255];
+            std::int32_t id2len;
+            char id2[255];
+            ptr = dlis_attref(ptr,
+                              &id1len,
+                              id1,
+                              &origin,
+                              &copy,
+                              &objnamelen,
+                              objname,
+                              &id2len,
+                              id2);
+
+            const auto ref = dl::attref {
+                dl::ident(std::string(id1, id1len)),
+                dl::obname {
+                    dl::origin(origin),
+                    dl::ushort(copy),
+                    dl::ident(std::string(objname, objnamelen)),
+                },
+                dl::ident(std::string(id2, id2len)),
+            };
+
+            swap_pointer(py::cast(ref));
+            continue;
+        }
+
+        if (*f == DLIS_FMT_DTIME) {
+            int Y, TZ, M, D, H, MN, S, MS;
+            ptr = dlis_dtime(ptr, &Y, &TZ, &M, &D, &H, &MN, &S, &MS);
+            Y = dlis_year(Y);
+            const auto US = MS * 1000;
+
+            PyObject* p;
+            std::memcpy(&p, dst, sizeof(p));
+            Py_DECREF(p);
+            p = PyDateTime_FromDateAndTime(Y, M, D, H, MN, S, US);
+            if (!p) throw py::error_already_set();
+            std::memcpy(dst, &p, sizeof(p));
+            dst += sizeof(p);
+            continue;
+        }
+
+        const auto run = packrun(f, ptr, end, dst);
+        if (run > 0) {
+            f += run - 1;
+            continue;
+        }
+
+        const char localfmt[] = {*f, '\0'};
+        dlis_packflen(localfmt, ptr, &src_skip, &dst_skip);
+        assert_overflow(ptr, src_skip, end);
+        dlis_packf(localfmt, ptr, dst);
+        dst += dst_skip;
+        ptr += src_skip;
+    }
+}
+
+/*
+ * Decode the frames in the records [first, last) into consecutive rows of
+ * each column. This is the python-free part of read_fdata, for formats
+ * without python objects, and runs without the GIL.
+ *
+ * Every record read is added to done, and reading stops early when stop is
+ * set.
+ */
+std::vector< std::vector< unsigned char > >
+read_frames(const std::vector< column >& columns,
+            const char* fmt,
+            dl::stream& file,
+            index_iterator first,
+            index_iterator last,
+            long long since,
+            std::atomic< long long >& done,
+            const std::atomic< bool >& stop)
+noexcept (false) {
+    std::vector< std::vector< unsigned char > > rows(columns.size());
+    dl::record record;
+    const auto all = std::numeric_limits< long long >::max();
+
+    for (auto itr = first; itr != last; ++itr) {
+        if (stop) break;
+
+        dl::extract(file, *itr, all, record);
+        if (record.isencrypted()) {
+            throw dl::not_implemented("encrypted FDATA record");
+        }
+
+        const auto* ptr = record.data.data();
+        const auto* end = ptr + record.data.size();
+
+        std::int32_t origin;
+        std::uint8_t copy;
+        ptr = dlis_obname(ptr, &origin, &copy, nullptr, nullptr);
+
+        while (ptr < end) {
+            if (since > 0 and skipold(fmt, ptr, end, since))
+                continue;
+
+            for (std::size_t i = 0; i < columns.size(); ++i) {
+                const auto itemsize = columns[i].itemsize;
+                auto& xs = rows[i];
+                xs.resize(xs.size() + itemsize);
+                auto* dst = xs.data() + xs.size() - itemsize;
+                packvalues(columns[i].fmt.c_str(), ptr, end, dst);
+            }
+        }
+
+        ++done;
+    }
+
+    return rows;
+}
+
+/*
+ * The number of frames of format fmt in each of the records at indices, which
+ * is the number of rows read_fdata makes of them. The frames are only
+ * measured, not decoded.
+ */
+std::vector< std::int64_t > count_frames(const char* fmt,
+                                         dl::stream& file,
+                                         const std::vector< long long >& indices,
+                                         dl::progress& report)
+noexcept (false) {
+    std::vector< std::int64_t > counts;
+    counts.reserve(indices.size());
+
+    dl::record record;
+    const auto all = std::numeric_limits< long long >::max();
+    for (const auto tell : indices) {
+        report.update(counts.size());
+        dl::extract(file, tell, all, record);
+        if (record.isencrypted()) {
+            throw dl::not_implemented("encrypted FDATA record");
+        }
+
+        const auto* ptr = record.data.data();
+        const auto* end = ptr + record.data.size();
+
+        std::int32_t origin;
+        std::uint8_t copy;
+        ptr = dlis_obname(ptr, &origin, &copy, nullptr, nullptr);
+
+        std::int64_t frames = 0;
+        while (ptr < end) {
+            int src_skip;
+            dlis_packflen(fmt, ptr, &src_skip, nullptr);
+            assert_overflow(ptr, src_skip, end);
+            ptr += src_skip;
+            ++frames;
+        }
+
+        counts.push_back(frames);
+    }
+
+    report.report(counts.size());
+    return counts;
+}
+
+/*
+ * Allocate the columns, with alloc(rows) -> [array], and hold on to their
+ * buffers for writing. The arrays can be resized in-place, which requires
+ * there to be no references to the underlying data. That means the
+ * buffer-infos must be released before resizing takes place, and then
+ * carefully restored to the new memory.
+ *
+ * Arrays that do not own their data are views of memory provided by the
+ * caller, like Frame.curves(out=...), which cannot be resized. They can have
+ * more rows than asked for, and are shrunk by slicing, but not grown.
+ */
+class arrays {
+public:
+    arrays(py::object alloc, std::size_t rows, std::size_t ncolumns)
+    noexcept (false) {
+        for (auto x : alloc(rows))
+            this->xs.push_back(py::reinterpret_borrow< py::object >(x));
+
+        if (this->xs.size() != ncolumns) {
+            const auto msg = "alloc returned "
+                           + std::to_string(this->xs.size())
+                           + " arrays, expected "
+                           + std::to_string(ncolumns);
+            throw std::runtime_error(msg);
+        }
+
+        this->request();
+    }
+
+    unsigned char* data(std::size_t i) noexcept (true) {
+        return static_cast< unsigned char* >(this->infos[i].ptr);
+    }
+
+    /* the number of rows there is room for in all of the arrays */
+    std::size_t rows() const noexcept (true) {
+        auto rows = std::numeric_limits< std::size_t >::max();
+        for (const auto& info : this->infos) {
+            const auto n = info.ndim > 0 ? info.shape[0] : 1;
+            rows = std::min< std::size_t >(rows, n);
+        }
+        return rows;
+    }
+
+    void resize(std::size_t rows) noexcept (false) {
+        for (const auto& x : this->xs) {
+            if (owndata(x) or rows <= std::size_t(py::len(x))) continue;
+
+            const auto msg = "output arrays have room for "
+                           + std::to_string(this->rows())
+                           + " rows, which is too few for the frames";
+            throw std::invalid_argument(msg);
+        }
+
+        this->infos.clear();
+        for (auto& x : this->xs) {
+            if (not owndata(x)) {
+                x = x[py::slice(0, rows, 1)];
+                continue;
+            }
+
+            /* keep the trailing dimensions of multi-dimensional columns */
+            auto shape = py::list(x.attr("shape"));
+            shape[0] = rows;
+            x.attr("resize")(py::tuple(shape));
+        }
+        this->request();
+    }
+
+    py::list list() const noexcept (false) {
+        py::list out;
+        for (const auto& x : this->xs) out.append(x);
+        return out;
+    }
+
+private:
+    void request() noexcept (false) {
+        for (auto& x : this->xs)
+            this->infos.push_back(py::buffer(x).request(true));
+    }
+
+    static bool owndata(const py::object& x) noexcept (false) {
+        return x.attr("flags").attr("owndata").cast< bool >();
+    }
+
+    std::vector< py::object > xs;
+    std::vector< py::buffer_info > infos;
+};
+
+using runs = std::vector< std::vector< std::vector< unsigned char > > >;
+
+/*
+ * Decode the records [first, last) with one native thread per stream, each
+ * reading a contiguous run of the records through its stream, into its own
+ * buffers, without the GIL. Returns the buffers of every run, in order.
+ * Progress is reported from the calling thread while it waits for the
+ * workers, and cancelling stops them.
+ */
+runs decode_runs(const std::vector< column >& columns,
+                 const char* fmt,
+                 std::vector< dl::stream >& streams,
+                 index_iterator first,
+                 index_iterator last,
+                 long long since,
+                 std::atomic< long long >& done,
+                 dl::progress& report)
+noexcept (false) {
+    const auto workers = streams.size();
+    const auto nrecords = std::distance(first, last);
+    runs buffers(workers);
+    std::vector< std::exception_ptr > errors(workers);
+
+    std::atomic< bool > stop{ false };
+    std::mutex mtx;
+    std::condition_variable finished;
+    std::size_t running = workers;
+
+    {
+        py::gil_scoped_release nogil;
+
+        std::vector< std::thread > threads;
+        auto joinall = [&threads] {
+            for (auto& thread : threads) thread.join();
+        };
+
+        try {
+            for (std::size_t i = 0; i < workers; ++i) {
+                const auto begin = first + nrecords * i / workers;
+                const auto end = first + nrecords * (i + 1) / workers;
+
+                threads.emplace_back([&, i, begin, end] {
+                    try {
+                        buffers[i] = read_frames(columns,
+                                                 fmt,
+                                                 streams[i],
+                                                 begin,
+                                                 end,
+                                                 since,
+                                                 done,
+                                                 stop);
+                    } catch (...) {
+                        errors[i] = std::current_exception();
+                    }
+
+                    std::lock_guard< std::mutex > lock(mtx);
+                    --running;
+                    finished.notify_one();
+                });
+            }
+
+            if (report) {
+                std::unique_lock< std::mutex > lock(mtx);
+                auto alldone = [&running] { return running == 0; };
+                while (not finished.wait_for(lock, report.interval(), alldone)) {
+                    lock.unlock();
+                    report.update(done);
+                    lock.lock();
+                }
+            }
+        } catch (...) {
+            stop = true;
+            joinall();
+            throw;
+        }
+
+        joinall();
+    }
+
+    /* report the error that the serial read would have run into */
+    for (const auto& error : errors) {
+        if (error) std::rethrow_exception(error);
+    }
+
+    return buffers;
+}
+
+/*
+ * read_fdata, but with the records split over workers native threads. Every
+ * thread reads through its own clone of the stream, see decode_runs. The row
+ * count of a run is only known once it is decoded, so the records are
+ * decoded a window at a time, and copied to the end of the output arrays
+ * before the next window is decoded. That keeps the memory used by the
+ * threads' buffers at about WINDOW_SIZE bytes, and not the size of the
+ * curves, which matters when the output is a memory-mapped file larger than
+ * memory.
+ *
+ * Returns None if the stream cannot be cloned, in which case the caller
+ * should fall back to reading serially.
+ */
+py::object read_fdata_parallel(const std::vector< column >& columns,
+                               const char* fmt,
+                               dl::stream& file,
+                               index_iterator first,
+                               index_iterator last,
+                               py::object alloc,
+                               long long since,
+                               std::size_t workers,
+                               dl::progress& report)
+noexcept (false) {
+    constexpr std::size_t WINDOW_SIZE = 64 << 20;
+
+    std::vector< dl::stream > streams;
+    struct closeall {
+        std::vector< dl::stream >& xs;
+        ~closeall() { for (auto& x : xs) x.close(); }
+    } guard { streams };
+
+    try {
+        for (std::size_t i = 0; i < workers; ++i)
+            streams.push_back(dl::clone(file));
+    } catch (const dl::not_implemented&) {
+        return py::none();
+    }
+
+    const auto nrecords = std::distance(first, last);
+    arrays dst(alloc, nrecords, columns.size());
+    std::size_t allocated_rows = dst.rows();
+    std::size_t rows = 0;
+
+    std::atomic< long long > done{ 0 };
+
+    /*
+     * The first window is a record per thread. The next windows are sized
+     * from the bytes per record of the previous one.
+     */
+    auto window = static_cast< long long >(workers);
+    for (auto begin = first; begin != last;) {
+        const auto size = std::min< long long >(window,
+                                                std::distance(begin, last));
+        const auto end = begin + size;
+        auto buffers = decode_runs(columns,
+                                   fmt,
+                                   streams,
+                                   begin,
+                                   end,
+                                   since,
+                                   done,
+                                   report);
+
+        std::size_t nrows = 0;
+        std::size_t nbytes = 0;
+        for (const auto& run : buffers) {
+            nrows += run[0].size() / columns[0].itemsize;
+            for (const auto& xs : run) nbytes += xs.size();
+        }
+
+        if (rows + nrows > allocated_rows) {
+            allocated_rows = std::max(allocated_rows * 2, rows + nrows);
+            dst.resize(allocated_rows);
+        }
+
+        for (std::size_t i = 0; i < columns.size(); ++i) {
+            auto* out = dst.data(i) + rows * columns[i].itemsize;
+            for (const auto& run : buffers) {
+                std::copy(run[i].begin(), run[i].end(), out);
+                out += run[i].size();
+            }
+        }
+
+        rows += nrows;
+        report.update(done);
+
+        const auto perrecord = std::max< std::size_t >(nbytes / size, 1);
+        window = std::max< std::size_t >(workers, WINDOW_SIZE / perrecord);
+        begin = end;
+    }
+
+    report.report(nrecords);
+
+    if (allocated_rows != rows)
+        dst.resize(rows);
+
+    dl::counters::add(dl::counters::rows_decoded, rows);
+    return dst.list();
+}
+
+/*
+ * Read the frames in indices into columns, and return the list of arrays
+ * made by alloc(rows) -> [array], one for each column.
+ */
+py::object read_fdata_columns(const std::vector< column >& columns,
+                              dl::stream& file,
+                              const std::vector< long long >& indices,
+                              py::object alloc,
+                              long long since,
+                              int workers,
+                              py::object progress)
 noexcept (false) {
     // TODO: reverse fingerprint to skip bytes ahead-of-time
     /*
@@ -360,332 +1406,180 @@ noexcept (false) {
      * default-constructed (set to None) by numpy, or properly created (and
      * replaced) here.
      */
-    auto allocated_rows = indices.size();
-    auto dstobj = alloc(allocated_rows);
-    auto dstb = py::buffer(dstobj);
-    auto info = dstb.request(true);
-    auto* dst = static_cast< unsigned char* >(info.ptr);
+    if (columns.empty()) {
+        throw std::invalid_argument("expected at least one column");
+    }
 
-    /*
-     * Resizing is clumsy, because in-place resize (through the method)
-     * requires there to be no references to the underlying data. That means
-     * the buffer-info and buffer must be wiped before resizing takes place,
-     * and then carefully restored to the new memory.
-     */
-    auto resize = [&](std::size_t n) {
-        info = py::buffer_info {};
-        dstb = py::buffer {};
-        dstobj.attr("resize")(n);
-        allocated_rows = n;
-        dstb = py::buffer(dstobj);
-        info = dstb.request(true);
-        dst = static_cast< unsigned char* >(info.ptr);
-    };
+    std::string framefmt;
+    for (const auto& col : columns) framefmt += col.fmt;
+    const auto* fmt = framefmt.c_str();
 
     /*
-     * The frameno is a part of the dtype, and only frame.channels is allowed
-     * to call this function. If pre/post format is set, wrong data is read.
+     * Frame numbers start at 1 and increase with every frame [1], so when
+     * only the frames after since are asked for, the first record to read is
+     * found by bisecting the records on their first frame number.
+     * That only needs the head of the records that are probed. A record can
+     * hold more than one frame, so the record before the first one with only
+     * new frames is read too, and its old frames are skipped.
      *
-     * The interface is not changed for now as they're to be reintroduced at
-     * some point.
+     * [1] rp66v1, 5.6.1 Frame Objects, Frame Number
      */
-    assert(std::string(pre_fmt) == "");
-    assert(std::string(post_fmt) == "");
-
-    int frames = 0;
-    for (auto i : indices) {
-        /* get record */
-        auto record = dl::extract(file, i);
-
-        if (record.isencrypted()) {
-            throw dl::not_implemented("encrypted FDATA record");
-        }
-
-        const auto* ptr = record.data.data();
-        const auto* end = ptr + record.data.size();
-
-        /* read fingerprint */
-        std::int32_t origin;
-        std::uint8_t copy;
-        ptr = dlis_obname(ptr, &origin, &copy, nullptr, nullptr);
-
-        /* get frame number and slots */
-        while (ptr < end) {
-            if (frames == allocated_rows) {
-                resize(frames * 2);
-                dst += (frames * itemsize);
+    auto first = indices.begin();
+    if (since > 0) {
+        dl::record head;
+        auto isold = [&](long long tell) {
+            /* obname + frame number */
+            constexpr long long HEAD_SIZE_MAX = 262 + 4;
+            dl::extract(file, tell, HEAD_SIZE_MAX, head);
+            if (head.isencrypted()) {
+                throw dl::not_implemented("encrypted FDATA record");
             }
 
-            auto assert_overflow = [end](const char* ptr, int skip) {
-                if (ptr + skip > end) {
-                    const auto msg = "corrupted record: fmtstr would read past end";
-                    throw std::runtime_error(msg);
-                }
-            };
-
-            int src_skip, dst_skip;
-            dlis_packflen(pre_fmt, ptr, &src_skip, nullptr);
-            assert_overflow(ptr, src_skip);
-            ptr += src_skip;
-
-            for (auto* f = fmt; *f; ++f) {
-                /*
-                 * Supporting bounded-length identifiers in frame data is
-                 * slightly more difficult than it immediately seem like, and
-                 * this implementation relies on a few assumptions that may not
-                 * hold.
-                 *
-                 * 1. numpy structured arrays interpret unicode on the fly
-                 *
-                 * On my amd64 linux:
-                 * >>> dt = np.dtype('U5')
-                 * >>> dt.itemsize
-                 * 20
-                 * >>> np.array(['foo'], dtype = dt)[0]
-                 * 'foo'
-                 * >>> np.array(['foobar'], dtype = dt)[0]
-                 * 'fooba'
-                 *
-                 * Meaning it supports string lengths of [0, n]. It apparently
-                 * (and maybe rightly so) uses null termination, or the bounded
-                 * length, which ever comes first.
-                 *
-                 * 2. numpy stores characters as int32 Py_UNICODE
-                 * Numpy seems to always use uint32, and not Py_UNICODE, which
-                 * can be both 16 and 32 bits [1]. Since it's an integer it's
-                 * endian sensitive, and widening from char works. This is not
-                 * really documented by numpy.
-                 *
-                 * 3. numpy stores no metadata with the string
-                 * It is assumed, and seems necessary from the interface, that
-                 * there is no in-band metadata stored about the strings when
-                 * used in structured arrays. This means we can just write the
-                 * unicode ourselves, and have numpy interpret it correctly.
-                 *
-                 * --
-                 * Units is just an IDENT in disguise, so it can very well take
-                 * the same code path.
-                 *
-                 * [1] http://docs.h5py.org/en/stable/strings.html#what-about-numpy-s-u-type
-                 *     NumPy also has a Unicode type, a UTF-32 fixed-width
-                 *     format (4-byte characters). HDF5 has no support for wide
-                 *     characters. Rather than trying to hack around this and
-                 *     “pretend” to support it, h5py will raise an error when
-                 *     attempting to create datasets or attributes of this
-                 *     type.
-                 *
-                 */
-                 auto swap_pointer = [&](py::object obj)
-                 {
-                     PyObject* p;
-                     std::memcpy(&p, dst, sizeof(p));
-                     Py_DECREF(p);
-                     p = obj.inc_ref().ptr();
-                     std::memcpy(dst, &p, sizeof(p));
-                     dst += sizeof(p);
-                 };
-
-                 if (*f == DLIS_FMT_FSING1) {
-                    float v;
-                    float a;
-                    ptr = dlis_fsing1(ptr, &v, &a);
-                    auto t = py::make_tuple(v, a);
-
-                    swap_pointer(t);
-                    continue;
-                }
+            const auto* ptr = head.data.data();
+            const auto* end = ptr + head.data.size();
+            std::int32_t origin;
+            std::uint8_t copy;
+            ptr = dlis_obname(ptr, &origin, &copy, nullptr, nullptr);
+
+            int skip;
+            dlis_packflen("i", ptr, &skip, nullptr);
+            if (ptr + skip > end) {
+                const auto msg = "corrupted record: fmtstr would read past end";
+                throw std::runtime_error(msg);
+            }
 
-                 if (*f == DLIS_FMT_FSING2) {
-                    float v;
-                    float a;
-                    float b;
-                    ptr = dlis_fsing2(ptr, &v, &a, &b);
-                    auto t = py::make_tuple(v, a, b);
+            std::int32_t frameno;
+            dlis_uvari(ptr, &frameno);
+            return frameno <= since;
+        };
 
-                    swap_pointer(t);
-                    continue;
-                }
+        first = std::partition_point(indices.begin(), indices.end(), isold);
+        if (first != indices.begin()) --first;
+    }
 
-                 if (*f == DLIS_FMT_FDOUB1) {
-                    double v;
-                    double a;
-                    ptr = dlis_fdoub1(ptr, &v, &a);
-                    auto t = py::make_tuple(v, a);
+    if (workers < 1) {
+        const auto msg = "workers (which is "
+                       + std::to_string(workers)
+                       + ") must be >= 1";
+        throw std::invalid_argument(msg);
+    }
 
-                    swap_pointer(t);
-                    continue;
-                }
+    /*
+     * Python objects can only be created with the GIL, so only frames of
+     * plain values are decoded in parallel
+     */
+    const auto nrecords = std::distance(first, indices.end());
+    auto report = pyprogress(progress, "read_fdata", nrecords);
+
+    const auto nworkers = std::min< long long >(workers, nrecords);
+    if (nworkers > 1 and not hasobjects(fmt)) {
+        auto curves = read_fdata_parallel(columns,
+                                          fmt,
+                                          file,
+                                          first,
+                                          indices.end(),
+                                          alloc,
+                                          since,
+                                          nworkers,
+                                          report);
+        if (not curves.is_none()) return curves;
+    }
 
-                 if (*f == DLIS_FMT_FDOUB2) {
-                    double v;
-                    double a;
-                    double b;
-                    ptr = dlis_fdoub2(ptr, &v, &a, &b);
-                    auto t = py::make_tuple(v, a, b);
+    arrays dst(alloc, nrecords, columns.size());
+    std::size_t allocated_rows = dst.rows();
 
-                    swap_pointer(t);
-                    continue;
-                }
+    /*
+     * Frames of plain values are read and decoded without the GIL, so that
+     * other threads, like an asyncio event loop, can run in the meantime.
+     * The GIL is only taken back to grow the arrays.
+     */
+    std::size_t frames = 0;
+    {
+        optional_nogil nogil(not hasobjects(fmt));
 
-                if (*f == DLIS_FMT_IDENT || *f == DLIS_FMT_UNITS) {
-                    constexpr auto chars = 255;
-                    constexpr auto ident_size = chars * sizeof(std::uint32_t);
-
-                    std::int32_t len;
-                    char tmp[chars];
-                    ptr = dlis_ident(ptr, &len, tmp);
-
-                    /*
-                     * From reading the numpy source, it looks like they put
-                     * and interpret the unicode buffer in the array directly,
-                     * and pad with zero. This means the string is both null
-                     * and length terminated, whichever comes first.
-                     */
-                    std::memset(dst, 0, ident_size);
-                    for (auto i = 0; i < len; ++i) {
-                        const auto x = std::uint32_t(tmp[i]);
-                        std::memcpy(dst + i * sizeof(x), &x, sizeof(x));
-                    }
-                    dst += ident_size;
-                    continue;
-                }
+        for (auto itr = first; itr != indices.end(); ++itr) {
+            report.update(std::distance(first, itr));
 
-                if (*f == DLIS_FMT_ASCII) {
-                    std::int32_t len;
-                    ptr = dlis_uvari(ptr, &len);
-                    auto ascii = py::str(ptr, len);
-                    ptr += len;
-
-                    /*
-                     * Numpy seems to default initalize object types even in
-                     * the case of np.empty to None [1]. The refcount is surely
-                     * increased, so decref it before replacing the pointer
-                     * with a fresh str.
-                     *
-                     * [1] Array of uninitialized (arbitrary) data of the given
-                     *     shape, dtype, and order. Object arrays will be
-                     *     initialized to None.
-                     *     https://docs.scipy.org/doc/numpy/reference/generated/numpy.empty.html
-                     */
-                    swap_pointer(ascii);
-                    continue;
-                }
+            /* get record */
+            auto record = dl::extract(file, *itr);
 
-                if (*f == DLIS_FMT_OBNAME) {
-                    std::int32_t origin;
-                    std::uint8_t copy;
-                    std::int32_t idlen;
-                    char id[255];
-                    ptr = dlis_obname(ptr, &origin, &copy, &idlen, id);
+            if (record.isencrypted()) {
+                throw dl::not_implemented("encrypted FDATA record");
+            }
 
-                    const auto name = dl::obname {
-                        dl::origin(origin),
-                        dl::ushort(copy),
-                        dl::ident(std::string(id, idlen)),
-                    };
+            const auto* ptr = record.data.data();
+            const auto* end = ptr + record.data.size();
 
-                    swap_pointer(py::cast(name));
-                    continue;
-                }
+            /* read fingerprint */
+            std::int32_t origin;
+            std::uint8_t copy;
+            ptr = dlis_obname(ptr, &origin, &copy, nullptr, nullptr);
 
-                if (*f == DLIS_FMT_OBJREF) {
-                    std::int32_t idlen;
-                    char id[255];
-                    std::int32_t origin;
-                    std::uint8_t copy;
-                    std::int32_t objnamelen;
-                    char objname[255];
-                    ptr = dlis_objref(ptr,
-                                      &idlen,
-                                      id,
-                                      &origin,
-                                      &copy,
-                                      &objnamelen,
-                                      objname);
-
-                    const auto name = dl::objref {
-                        dl::ident(std::string(id, idlen)),
-                        dl::obname {
-                            dl::origin(origin),
-                            dl::ushort(copy),
-                            dl::ident(std::string(objname, objnamelen)),
-                        },
-                    };
-
-                    swap_pointer(py::cast(name));
+            /* get frame number and slots */
+            while (ptr < end) {
+                if (since > 0 and skipold(fmt, ptr, end, since))
                     continue;
-                }
 
-                if (*f == DLIS_FMT_ATTREF) {
-                    std::int32_t id1len;
-                    char id1[255];
-                    std::int32_t origin;
-                    std::uint8_t copy;
-                    std::int32_t objnamelen;
-                    char objname[255];
-                    std::int32_t id2len;
-                    char id2[255];
-                    ptr = dlis_attref(ptr,
-                                      &id1len,
-                                      id1,
-                                      &origin,
-                                      &copy,
-                                      &objnamelen,
-                                      objname,
-                                      &id2len,
-                                      id2);
-
-                    const auto ref = dl::attref {
-                        dl::ident(std::string(id1, id1len)),
-                        dl::obname {
-                            dl::origin(origin),
-                            dl::ushort(copy),
-                            dl::ident(std::string(objname, objnamelen)),
-                        },
-                        dl::ident(std::string(id2, id2len)),
-                    };
-
-                    swap_pointer(py::cast(ref));
-                    continue;
+                if (frames == allocated_rows) {
+                    allocated_rows = std::max< std::size_t >(allocated_rows * 2,
+                                                             1);
+                    nogil.with_gil([&] { dst.resize(allocated_rows); });
                 }
 
-                if (*f == DLIS_FMT_DTIME) {
-                    int Y, TZ, M, D, H, MN, S, MS;
-                    ptr = dlis_dtime(ptr, &Y, &TZ, &M, &D, &H, &MN, &S, &MS);
-                    Y = dlis_year(Y);
-                    const auto US = MS * 1000;
-
-                    PyObject* p;
-                    std::memcpy(&p, dst, sizeof(p));
-                    Py_DECREF(p);
-                    p = PyDateTime_FromDateAndTime(Y, M, D, H, MN, S, US);
-                    if (!p) throw py::error_already_set();
-                    std::memcpy(dst, &p, sizeof(p));
-                    dst += sizeof(p);
-                    continue;
+                for (std::size_t i = 0; i < columns.size(); ++i) {
+                    const auto itemsize = columns[i].itemsize;
+                    auto* out = dst.data(i) + frames * itemsize;
+                    packobjects(columns[i].fmt.c_str(), ptr, end, out);
                 }
 
-                const char localfmt[] = {*f, '\0'};
-                dlis_packflen(localfmt, ptr, &src_skip, &dst_skip);
-                assert_overflow(ptr, src_skip);
-                dlis_packf(localfmt, ptr, dst);
-                dst += dst_skip;
-                ptr += src_skip;
+                ++frames;
             }
-
-            dlis_packflen(post_fmt, ptr, &src_skip, nullptr);
-            assert_overflow(ptr, src_skip);
-            ptr += src_skip;
-
-            ++frames;
         }
     }
 
     assert(allocated_rows >= frames);
     if (allocated_rows > frames)
-        resize(frames);
+        dst.resize(frames);
+
+    report.report(nrecords);
+    dl::counters::add(dl::counters::rows_decoded, frames);
+    return dst.list();
+}
+
+py::object read_fdata(const char* pre_fmt,
+                      const char* fmt,
+                      const char* post_fmt,
+                      dl::stream& file,
+                      const std::vector< long long >& indices,
+                      std::size_t itemsize,
+                      py::object alloc,
+                      long long since,
+                      int workers,
+                      py::object progress)
+noexcept (false) {
+    /*
+     * The frameno is a part of the dtype, and only frame.channels is allowed
+     * to call this function. If pre/post format is set, wrong data is read.
+     *
+     * The interface is not changed for now as they're to be reintroduced at
+     * some point.
+     */
+    assert(std::string(pre_fmt) == "");
+    assert(std::string(post_fmt) == "");
 
-    return dstobj;
+    const auto columns = std::vector< column >{ column{ fmt, itemsize } };
+    auto alloc1 = py::cpp_function([alloc](std::size_t rows) {
+        return py::make_tuple(alloc(rows));
+    });
+
+    auto curves = read_fdata_columns(columns,
+                                     file,
+                                     indices,
+                                     alloc1,
+                                     since,
+                                     workers,
+                                     progress);
+    return py::list(curves)[0];
 }
 
 /** trampoline helper class for dl::matcher bindings
@@ -717,6 +1611,108 @@ public:
     }
 };
 
+/*
+ * Handle for python file-like objects, i.e. anything with seek and readinto
+ *
+ * Every read is a call into python, so this handle should be wrapped in a
+ * cached_handle to make sure the many small reads dlisio does are served
+ * from memory.
+ */
+class pyfile_handle : public dl::handle {
+public:
+    explicit pyfile_handle( py::object f ) noexcept (false)
+        : file( std::move( f ) ) {
+
+        if (not py::hasattr( this->file, "readinto" )
+        or  not py::hasattr( this->file, "seek" )) {
+            const auto msg = "expected file-like object with readinto() and "
+                             "seek(), was {}";
+            throw py::type_error(
+                py::str( msg ).format( Py_TYPE( this->file.ptr() )->tp_name )
+            );
+        }
+    }
+
+    ~pyfile_handle() noexcept (true) override {
+        /* the last reference may go away in a thread that does not hold the
+         * GIL
+         */
+        py::gil_scoped_acquire gil;
+        this->file.release().dec_ref();
+    }
+
+protected:
+    std::int64_t readat( char* dst, std::int64_t n, std::int64_t offset )
+    noexcept (false) override {
+        /*
+         * seek + readinto must not be interleaved with other reads. Wait for
+         * the lock without the GIL, or a thread that holds the lock and waits
+         * for the GIL would deadlock.
+         */
+        std::unique_lock< std::mutex > lock( this->mtx, std::defer_lock );
+        if (PyGILState_Check()) {
+            py::gil_scoped_release nogil;
+            lock.lock();
+        } else {
+            lock.lock();
+        }
+
+        py::gil_scoped_acquire gil;
+        try {
+            this->file.attr( "seek" )( offset );
+
+            std::int64_t nread = 0;
+            while (nread < n) {
+                auto view = py::reinterpret_steal< py::object >(
+                    PyMemoryView_FromMemory( dst + nread, n - nread, PyBUF_WRITE )
+                );
+                if (not view) throw py::error_already_set();
+
+                auto x = this->file.attr( "readinto" )( view );
+                view.attr( "release" )();
+
+                if (x.is_none())
+                    throw dl::io_error( "readinto: no data available" );
+
+                const auto count = x.cast< std::int64_t >();
+                if (count == 0) break;
+                nread += count;
+            }
+            return nread;
+        } catch (const py::error_already_set& e) {
+            throw dl::io_error( e.what() );
+        }
+    }
+
+private:
+    py::object file;
+    std::mutex mtx;
+};
+
+std::shared_ptr< dl::memory_handle > memoryhandle( py::buffer b ) {
+    /*
+     * The buffer (and the python object exporting it) is kept alive for as
+     * long as the handle is, and released with the GIL held
+     */
+    std::shared_ptr< const py::buffer_info > info(
+        new py::buffer_info( b.request() ),
+        []( const py::buffer_info* x ) {
+            py::gil_scoped_acquire gil;
+            delete x;
+        }
+    );
+
+    if (info->ndim != 1 or info->strides[0] != info->itemsize) {
+        const auto msg = "memoryhandle: expected contiguous, one-dimensional "
+                         "buffer";
+        throw std::invalid_argument( msg );
+    }
+
+    const auto* data = static_cast< const char* >( info->ptr );
+    const auto size = info->size * info->itemsize;
+    return std::make_shared< dl::memory_handle >( data, size, info );
+}
+
 }
 
 PYBIND11_MAKE_OPAQUE( std::vector< dl::object_set > )
@@ -736,15 +1732,112 @@ PYBIND11_MODULE(core, m) {
         }
     });
 
+    py::register_exception< dl::cancelled >( m, "cancelled" );
+
     py::bind_vector<std::vector< dl::object_set >>(m, "list(object_set)");
 
-    m.def("open", &dl::open, py::arg("path"), py::arg("zero") = 0);
+    m.def("open",
+        []( const std::string& path, std::int64_t zero ) {
+            return dl::open( path, zero );
+        },
+        py::arg("path"),
+        py::arg("zero") = 0
+    );
     m.def("open_rp66", &dl::open_rp66);
+    m.def("open_rp66_indexed", &dl::open_rp66_indexed,
+        py::arg("stream"),
+        py::arg("size")
+    );
+    m.def("extend_rp66_indexed", &dl::extend_rp66_indexed);
     m.def("open_tif", &dl::open_tapeimage);
 
+    m.def("set_counting", [](bool enable) {
+        dl::counters::enabled = enable;
+    });
+    m.def("counters", []() {
+        py::dict xs;
+        for (int i = 0; i < dl::counters::ncounters; ++i) {
+            const auto c = static_cast< dl::counters::counter >(i);
+            xs[dl::counters::name(c)] = dl::counters::values[c].load();
+        }
+        return xs;
+    });
+
     m.def( "storage_label", storage_label );
+    m.def( "decode_array", decode_array,
+        py::arg( "reprc" ),
+        py::arg( "buffer" ),
+        py::arg( "count" )
+    );
     m.def("fingerprint", fingerprint);
-    m.def("read_fdata", read_fdata);
+    m.def("read_fdata", read_fdata,
+        py::arg("pre_fmt"),
+        py::arg("fmt"),
+        py::arg("post_fmt"),
+        py::arg("file"),
+        py::arg("indices"),
+        py::arg("itemsize"),
+        py::arg("alloc"),
+        py::arg("since"),
+        py::arg("workers"),
+        py::arg("progress") = py::none()
+    );
+    m.def("count_frames", []( const std::string& fmt,
+                              dl::stream& file,
+                              const std::vector< long long >& indices,
+                              py::object progress ) {
+            const auto total = static_cast< std::int64_t >( indices.size() );
+            auto report = pyprogress( progress, "count_frames", total );
+            auto counts = [&] {
+                py::gil_scoped_release nogil;
+                return count_frames( fmt.c_str(), file, indices, report );
+            }();
+            return py::array_t< std::int64_t >( counts.size(), counts.data() );
+        },
+        py::arg("fmt"),
+        py::arg("file"),
+        py::arg("indices"),
+        py::arg("progress") = py::none()
+    );
+    m.def("read_fdata_columns",
+        []( const std::vector< std::string >& fmts,
+            const std::vector< std::size_t >& itemsizes,
+            dl::stream& file,
+            const std::vector< long long >& indices,
+            py::object alloc,
+            long long since,
+            int workers,
+            py::object progress ) {
+            if (fmts.size() != itemsizes.size()) {
+                const auto msg = "len(fmts) (which is "
+                               + std::to_string(fmts.size())
+                               + ") != len(itemsizes) (which is "
+                               + std::to_string(itemsizes.size())
+                               + ")";
+                throw std::invalid_argument(msg);
+            }
+
+            std::vector< column > columns;
+            for (std::size_t i = 0; i < fmts.size(); ++i)
+                columns.push_back(column{ fmts[i], itemsizes[i] });
+
+            return read_fdata_columns(columns,
+                                      file,
+                                      indices,
+                                      alloc,
+                                      since,
+                                      workers,
+                                      progress);
+        },
+        py::arg("fmts"),
+        py::arg("itemsizes"),
+        py::arg("file"),
+        py::arg("indices"),
+        py::arg("alloc"),
+        py::arg("since"),
+        py::arg("workers"),
+        py::arg("progress") = py::none()
+    );
 
     /*
      * TODO: support constructor with kwargs
@@ -852,6 +1945,10 @@ PYBIND11_MODULE(core, m) {
     py::class_< dl::object_attribute >( m, "object_attribute" )
         .def_readonly("values", &dl::object_attribute::value)
         .def_readonly("units", &dl::object_attribute::units)
+        .def_property_readonly("array", []( py::object self ) {
+            const auto& attr = self.cast< const dl::object_attribute& >();
+            return mpark::visit( attribute_array{ self }, attr.value );
+        })
     ;
 
     py::class_< dl::basic_object >( m, "basic_object" )
@@ -897,6 +1994,8 @@ PYBIND11_MODULE(core, m) {
             const std::string&,
             const dl::matcher&
         )) &dl::pool::get )
+        .def( "count", &dl::pool::count )
+        .def_property_readonly( "counts", &dl::pool::counts )
     ;
 
     py::enum_< dl::representation_code >( m, "reprc" )
@@ -947,8 +2046,91 @@ PYBIND11_MODULE(core, m) {
         })
     ;
 
+    py::class_< dl::handle_pool, std::shared_ptr< dl::handle_pool > >(
+        m, "handlepool" )
+        .def( py::init< std::size_t >(), py::arg("maxopen") )
+        .def_property_readonly( "maxopen", &dl::handle_pool::maxopen )
+        .def( "__len__", &dl::handle_pool::size )
+        .def( "__repr__", []( const dl::handle_pool& x ) {
+            return "dlisio.core.handlepool(open: {}, maxopen: {})"_s
+                .format( x.size(), x.maxopen() );
+        })
+    ;
+
+    py::class_< dl::handle, std::shared_ptr< dl::handle > >( m, "handle" )
+        .def_property_readonly( "reads", &dl::handle::reads )
+        .def_property_readonly( "bytes_read", &dl::handle::bytes_read )
+        .def( "open",
+            []( const std::shared_ptr< dl::handle >& fh, std::int64_t zero ) {
+                return dl::open( fh, zero );
+            },
+            py::arg("zero") = 0
+        )
+    ;
+
+    py::class_< dl::file_handle, dl::handle,
+                std::shared_ptr< dl::file_handle > >( m, "filehandle" )
+        .def( py::init< const std::string&,
+                        std::shared_ptr< dl::handle_pool > >(),
+              py::arg("path"),
+              py::arg("pool") = nullptr
+        )
+        .def_property_readonly( "path", &dl::file_handle::path )
+        .def_property_readonly( "isopen", &dl::file_handle::isopen )
+    ;
+
+    py::class_< dl::memory_handle, dl::handle,
+                std::shared_ptr< dl::memory_handle > >( m, "memoryhandle" )
+        .def( py::init( &memoryhandle ), py::arg("buffer") )
+        .def( "__len__", &dl::memory_handle::size )
+    ;
+
+    py::class_< pyfile_handle, dl::handle,
+                std::shared_ptr< pyfile_handle > >( m, "pyfilehandle" )
+        .def( py::init< py::object >(), py::arg("file") )
+    ;
+
+    py::class_< dl::cached_handle, dl::handle,
+                std::shared_ptr< dl::cached_handle > >( m, "cachedhandle" )
+        .def( py::init< std::shared_ptr< dl::handle >,
+                        std::size_t,
+                        std::size_t >(),
+              py::arg("source"),
+              py::arg("blocksize") = 1 << 16,
+              py::arg("capacity")  = 64
+        )
+        .def_property_readonly( "source", &dl::cached_handle::source )
+    ;
+
+    py::class_< dl::gzip_handle, dl::handle,
+                std::shared_ptr< dl::gzip_handle > >( m, "gziphandle" )
+        .def( py::init< std::shared_ptr< dl::handle >, std::int64_t >(),
+              py::arg("source"),
+              py::arg("spacing") = 1 << 20
+        )
+        .def( py::init( []( std::shared_ptr< dl::handle > source,
+                            py::bytes index ) {
+                return std::make_shared< dl::gzip_handle >(
+                    std::move( source ),
+                    std::string( index )
+                );
+            }),
+            py::arg("source"),
+            py::arg("index")
+        )
+        .def( "__len__", &dl::gzip_handle::size )
+        .def_property_readonly( "checkpoints", &dl::gzip_handle::checkpoints )
+        .def_property_readonly( "source", &dl::gzip_handle::source )
+        .def_property_readonly( "index", []( const dl::gzip_handle& x ) {
+            return py::bytes( x.index() );
+        })
+    ;
+
+    m.def( "decompressed", &dl::decompressed, py::arg("handle") );
+
     py::class_< dl::stream >( m, "stream" )
         .def_property_readonly("absolute_tell", &dl::stream::absolute_tell)
+        .def_property_readonly("tell", &dl::stream::tell)
         .def("seek", &dl::stream::seek)
         .def("eof", &dl::stream::eof)
         .def( "close", &dl::stream::close )
@@ -968,6 +2150,11 @@ PYBIND11_MODULE(core, m) {
         })
     ;
 
+    /*
+     * The indexing and parsing functions are native all the way through, and
+     * run without the GIL, so they can be run in other threads without
+     * blocking the interpreter
+     */
     m.def( "extract", [](dl::stream& s,
                         const std::vector< long long >& tells) {
         std::vector< dl::record > recs;
@@ -979,7 +2166,7 @@ PYBIND11_MODULE(core, m) {
             }
         }
         return recs;
-    });
+    }, py::call_guard< py::gil_scoped_release >());
 
     m.def( "parse_objects", []( const std::vector< dl::record >& recs ) {
         std::vector< dl::object_set > objects;
@@ -988,16 +2175,48 @@ PYBIND11_MODULE(core, m) {
             objects.push_back( dl::object_set( rec ) );
         }
         return objects;
-    });
+    }, py::call_guard< py::gil_scoped_release >());
 
     m.def( "findsul", dl::findsul );
     m.def( "findvrl", dl::findvrl );
     m.def( "hastapemark", dl::hastapemark );
-    m.def("findfdata", dl::findfdata);
+    m.def( "findfdata", []( dl::stream& file,
+                            const std::vector< long long >& tells,
+                            py::object progress ) {
+            const auto total = static_cast< std::int64_t >( tells.size() );
+            auto report = pyprogress( progress, "findfdata", total );
+            py::gil_scoped_release nogil;
+            return dl::findfdata( file, tells, std::move( report ) );
+        },
+        py::arg("stream"),
+        py::arg("tells"),
+        py::arg("progress") = py::none()
+    );
+
+    m.def( "findoffsets", []( dl::stream& file,
+                              py::object progress,
+                              std::int64_t total ) {
+            auto report = pyprogress( progress, "findoffsets", total );
+            auto ofs = [&] {
+                py::gil_scoped_release nogil;
+                return dl::findoffsets( file, std::move( report ) );
+            }();
+            return py::make_tuple( ofs.explicits, ofs.implicits );
+        },
+        py::arg("stream"),
+        py::arg("progress") = py::none(),
+        py::arg("total") = -1
+    );
 
-    m.def( "findoffsets", []( dl::stream& file ) {
-        const auto ofs = dl::findoffsets( file );
-        return py::make_tuple( ofs.explicits, ofs.implicits );
+    m.def( "findappended", []( dl::stream& file, long long tell ) {
+        auto ofs = [&] {
+            py::gil_scoped_release nogil;
+            return dl::findappended( file, tell );
+        }();
+        return py::make_tuple( ofs.explicits,
+                               ofs.implicits,
+                               ofs.tell,
+                               ofs.complete );
     });
 
     m.def("set_encodings", set_encodings);
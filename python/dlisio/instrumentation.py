@@ -0,0 +1,178 @@
+"""
+Timings and counters of the work done by dlisio, see dlisio.stats.
+Collection is off unless a stats context is active, and then the timing
+sites cost a single check of a module-level integer.
+"""
+import threading
+import time
+
+from . import core
+
+_lock = threading.Lock()
+_active = 0
+
+# stage -> [seconds, calls], and the counters kept by the python layer
+_timings = {}
+_counters = {}
+
+class timed(object):
+    """ For internal use.
+    Add the time spent in the with-block to the stage
+    """
+    __slots__ = ('stage', 'start')
+
+    def __init__(self, stage):
+        self.stage = stage
+        self.start = None
+
+    def __enter__(self):
+        if _active: self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *args):
+        if self.start is None: return
+        elapsed = time.perf_counter() - self.start
+        with _lock:
+            timing = _timings.setdefault(self.stage, [0.0, 0])
+            timing[0] += elapsed
+            timing[1] += 1
+
+def count(name, n = 1):
+    """ For internal use.
+    Add n to the python-level counter name
+    """
+    if not _active: return
+    with _lock:
+        _counters[name] = _counters.get(name, 0) + n
+
+def _snapshot():
+    counters = core.counters()
+    counters.update(_counters)
+    timings = { k : tuple(v) for k, v in _timings.items() }
+    return timings, counters
+
+class stats(object):
+    """Collect timings and counters of the work done by dlisio
+
+    Time every stage of reading files, and count the work done in them, both
+    in the C++ core and in the python layer, for the duration of a with-block.
+    The results are available when the block is done, and cover all work done
+    in the process while it was active, including work done by other
+    threads. Collection is off outside stats-blocks, and then costs next to
+    nothing. Blocks can be nested.
+
+    The stages are the calls into the core, and the python layer on top:
+
+    ============== =========================================================
+    Stage          Description
+    ============== =========================================================
+    findvrl        Find the storage unit label and the first visible record
+    findoffsets    Index the logical records of a logical file
+    findappended   Index records appended to a file, see dlis.refresh
+    extract        Read the explicit (metadata) records
+    parse_objects  Parse the explicit records into object sets
+    pool           Build the object pool from the object sets
+    findfdata      Group the frame data records by frame
+    promote        Make plumbing objects, like Channel and Frame
+    read_fdata     Read and decode curves
+    count_frames   Count the rows of frame data records, without decoding
+    ============== =========================================================
+
+    The counters are:
+
+    ================== =====================================================
+    Counter            Description
+    ================== =====================================================
+    reads              Reads from the file
+    bytes_read         Bytes read from the file
+    seeks              Seeks in the logical record streams
+    segments_scanned   Logical record segment headers read when indexing
+    records_scanned    Logical records found when indexing
+    records_extracted  Logical records, or their heads, read
+    segments_stitched  Segments joined with the previous segment of a record
+    rows_decoded       Frames (rows) decoded
+    objects_created    Plumbing objects made
+    ================== =====================================================
+
+    Attributes
+    ----------
+    timings : dict
+        stage -> seconds spent in the stage
+    calls : dict
+        stage -> number of times the stage was run
+    counters : dict
+        counter -> value
+
+    Examples
+    --------
+    Find out where the time of a load goes
+
+    >>> with dlisio.stats() as s:
+    ...     with dlisio.load(path) as files:
+    ...         for f in files:
+    ...             for frame in f.frames:
+    ...                 curves = frame.curves()
+    >>> s.timings
+    {'findvrl': 0.0002, 'findoffsets': 1.32, 'extract': 0.04, ...}
+    >>> s.counters['bytes_read']
+    1073741824
+
+    Export to a metrics system
+
+    >>> metrics.push(s.asdict())
+    """
+    def __init__(self):
+        self.timings = {}
+        self.calls = {}
+        self.counters = {}
+        self.before = None
+
+    def __enter__(self):
+        global _active
+        with _lock:
+            _active += 1
+            core.set_counting(True)
+            self.before = _snapshot()
+        return self
+
+    def __exit__(self, *args):
+        global _active
+        with _lock:
+            after = _snapshot()
+            _active -= 1
+            if not _active: core.set_counting(False)
+
+        timings, counters = after
+        before_timings, before_counters = self.before
+        for stage, (seconds, calls) in timings.items():
+            seconds0, calls0 = before_timings.get(stage, (0.0, 0))
+            if calls == calls0: continue
+            self.timings[stage] = seconds - seconds0
+            self.calls[stage] = calls - calls0
+
+        self.counters = {
+            name : value - before_counters.get(name, 0)
+            for name, value in counters.items()
+        }
+        self.counters.setdefault('objects_created', 0)
+
+    def asdict(self):
+        """Timings, calls and counters as a single, flat dict
+
+        Returns
+        -------
+        stats : dict
+            with keys like 'timings.findoffsets', 'calls.findoffsets' and
+            'counters.bytes_read'
+        """
+        flat = {}
+        for prefix, values in (('timings', self.timings),
+                               ('calls', self.calls),
+                               ('counters', self.counters)):
+            for k, v in values.items():
+                flat['{}.{}'.format(prefix, k)] = v
+        return flat
+
+    def __repr__(self):
+        return 'stats(timings={}, counters={})'.format(self.timings,
+                                                       self.counters)
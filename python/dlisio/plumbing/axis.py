@@ -1,6 +1,6 @@
 from .basicobject import BasicObject
 from .valuetypes import scalar, vector
-from .utils import describe_dict
+from .utils import describe_dict, arrayattribute
 
 from collections import OrderedDict
 
@@ -18,8 +18,9 @@ class Axis(BasicObject):
     axis_id : str
         Axis identifier
 
-    coordinates : list
-        Explicit coordinate value along the axis
+    coordinates : np.ndarray or list
+        Explicit coordinate value along the axis. Numeric coordinates are an
+        np.ndarray, other coordinates, like strings, a list
 
     spacing
         Constant, signed spacing along the axis between successive coordinates
@@ -36,6 +37,8 @@ class Axis(BasicObject):
     AXIS objects are listed in Appendix A.2 - Logical Record Types, and
     described in detail in Chapter 5.3.1 - Static and Frame Data, Axis Objects.
     """
+    __slots__ = ()
+
     attributes = {
         'AXIS-ID'     : scalar,
         'COORDINATES' : vector,
@@ -51,7 +54,7 @@ class Axis(BasicObject):
 
     @property
     def coordinates(self):
-        return self['COORDINATES']
+        return arrayattribute(self, 'COORDINATES')
 
     @property
     def spacing(self):
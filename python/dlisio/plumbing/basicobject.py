@@ -5,7 +5,70 @@ from .utils import *
 
 import logging
 
-class BasicObject():
+def resolve(lf, type, name, origin, copynumber):
+    """ For internal use.
+    Look up a pickled object in its unpickled logical file
+    """
+    return lf.object(type, name, origin, copynumber)
+
+class overridable():
+    """Class-level parsing rules with an optional per-instance override
+
+    Descriptor wrapping the :attr:`BasicObject.attributes` and
+    :attr:`BasicObject.linkage` dicts. Accessed through the class, the
+    class-level dict is returned, and modifying it affects every instance. An
+    instance can override it by assignment, which is stored in the instance's
+    override slot. Deleting the attribute from an instance restores the
+    class-level dict.
+    """
+    __slots__ = ('default', 'slot')
+
+    def __init__(self, default, slot):
+        self.default = default
+        self.slot    = slot
+
+    def __get__(self, obj, objtype=None):
+        if obj is None: return self.default
+        try:
+            return getattr(obj, self.slot)
+        except AttributeError:
+            return self.default
+
+    def __set__(self, obj, value):
+        setattr(obj, self.slot, value)
+
+    def __delete__(self, obj):
+        try:
+            delattr(obj, self.slot)
+        except AttributeError:
+            pass
+
+class parsingrules(type):
+    """Metaclass for BasicObject
+
+    Objects use __slots__, so the attributes and linkage class attributes
+    cannot be shadowed by instance attributes the usual way. Instead,
+    wrap them in an overridable, both on class creation and when they are
+    re-assigned on the class, e.g. Channel.attributes = {...}.
+    """
+    overridables = ('attributes', 'linkage')
+
+    def __new__(mcs, name, bases, namespace):
+        for key in mcs.overridables:
+            if key not in namespace: continue
+            namespace[key] = mcs.wrap(key, namespace[key])
+        return super().__new__(mcs, name, bases, namespace)
+
+    def __setattr__(cls, key, value):
+        if key in cls.overridables: value = cls.wrap(key, value)
+        super().__setattr__(key, value)
+
+    @staticmethod
+    def wrap(key, value):
+        if isinstance(value, overridable): return value
+        return overridable(value, key + '_override')
+
+class BasicObject(metaclass=parsingrules):
     """A Basic object that all other object-types derive from
 
     BasicObject is mainly an implementation detail. Its the least common
@@ -158,24 +221,84 @@ class BasicObject():
     Parameter('2000T')
     """
 
+    __slots__ = (
+        'type',
+        'attic',
+        'logicalfile',
+        'objname',
+        'cache',
+        'cachesource',
+        'attributes_override',
+        'linkage_override',
+    )
+
     def __init__(self, obj, name = None, type = None, lf = None):
-        self.type       = type
-        self.name       = name
-        self.origin     = None
-        self.copynumber = None
+        self.type = type
 
         if obj is None: obj = {}
         self.attic = obj
 
         self.logicalfile = lf
 
+        # The object name, which is resolved into name, origin and copynumber
+        # on first access. See objectname
+        self.objname = name
+
+        # Memoized, parsed attribute values. See __getitem__
+        self.cache       = None
+        self.cachesource = None
+
+    def objectname(self):
+        """Name, origin and copynumber of the object
+
+        Most objects are never inspected by name, so the object name given to
+        the constructor is only resolved into its parts when any of them are
+        first accessed.
+
+        Returns
+        -------
+
+        objectname : list
+            [name, origin, copynumber]
+        """
+        objname = self.objname
+        if isinstance(objname, list): return objname
+
+        name, origin, copynumber = objname, None, None
         try:
-            self.name       = name.id
-            self.origin     = int(name.origin)
-            self.copynumber = int(name.copynumber)
+            name       = objname.id
+            origin     = int(objname.origin)
+            copynumber = int(objname.copynumber)
         except AttributeError:
             pass
 
+        self.objname = [name, origin, copynumber]
+        return self.objname
+
+    @property
+    def name(self):
+        return self.objectname()[0]
+
+    @name.setter
+    def name(self, value):
+        self.objectname()[0] = value
+
+    @property
+    def origin(self):
+        return self.objectname()[1]
+
+    @origin.setter
+    def origin(self, value):
+        self.objectname()[1] = value
+
+    @property
+    def copynumber(self):
+        return self.objectname()[2]
+
+    @copynumber.setter
+    def copynumber(self, value):
+        self.objectname()[2] = value
+
     def __repr__(self):
         """Return a string representation of the object"""
         return '{}({})'.format(self.type.capitalize(), self.name)
@@ -195,16 +318,43 @@ class BasicObject():
 
         Returns a default value for missing attributes. I.e. attributes defined
         in :attr:`attributes` but are not in :attr:`attic`.
-        """
-        if key not in self.attributes and key not in self.attic.keys():
-            raise KeyError("'{}'".format(key))
 
+        Parsed values are memoized per object, keyed on the attribute and the
+        parsing rules used, so changes to :attr:`attributes` and
+        :attr:`linkage` take effect immediately. The memoization only applies
+        to objects loaded from disk, and is dropped if :attr:`attic` or
+        :attr:`logicalfile` is replaced, or dlis.refresh() finds new objects.
+        Use :func:`clear_cache` to drop it explicitly.
+        """
         try:
             parse_as = self.attributes[key]
         except KeyError:
             # No rule for parsing, keep rp66value as is, i.e. vector
             parse_as = vector
 
+        reftype = self.linkage.get(key)
+        cachekey = (key, parse_as, reftype)
+        cache = self.attributecache()
+
+        try:
+            value = cache[cachekey]
+        except KeyError:
+            value = self.parseattribute(key, parse_as)
+            cache[cachekey] = value
+
+        # Lists are mutable, never hand out the memoized instance
+        if isinstance(value, list): return list(value)
+        return value
+
+    def parseattribute(self, key, parse_as):
+        """Parse attribute from attic, bypassing the memoization
+
+        This is the parsing step of __getitem__, and is not intended for direct
+        use.
+        """
+        if key not in self.attributes and key not in self.attic.keys():
+            raise KeyError("'{}'".format(key))
+
         try:
             rp66value = self.attic[key].values
         except KeyError:
@@ -221,6 +371,67 @@ class BasicObject():
 
         return parsevalue(value, parse_as)
 
+    def attributecache(self):
+        """The memoized values for the current attic
+
+        The cache holds the parsed attribute values, and any other values
+        derived from the attic that object-types choose to memoize, such as
+        Frame.dtype.
+
+        Only attics loaded from disk (dlisio.core.basic_object) are immutable,
+        and safe to memoize. For any other attic, e.g. a plain dict, a fresh,
+        throwaway cache is returned, which effectively disables memoization.
+        """
+        if not isinstance(self.attic, core.basic_object): return {}
+
+        # Linkage is looked up in the object pool of the logical file, which
+        # dlis.refresh() rebuilds when new objects are appended to the file
+        generation = getattr(self.logicalfile, 'generation', None)
+
+        source = self.cachesource
+        if (source is None
+            or source[0] is not self.attic
+            or source[1] is not self.logicalfile
+            or source[2] != generation):
+            self.cache = {}
+            self.cachesource = (self.attic, self.logicalfile, generation)
+
+        return self.cache
+
+    def clear_cache(self):
+        """Drop all memoized values
+
+        Memoized values are automatically dropped when :attr:`attic` or
+        :attr:`logicalfile` are replaced, or the logical file is refreshed
+        with new objects, and changes to :attr:`attributes` or
+        :attr:`linkage` are always honoured. This method is only necessary
+        when state that the memoized values depend on is changed in some other
+        way, e.g. when the parsing rules of Frame.channels are changed after
+        Frame.dtype has been computed.
+        """
+        self.cache = None
+        self.cachesource = None
+
+    def __reduce__(self):
+        """Pickle the object as its logical file and fingerprint
+
+        The logical file is pickled as where it is in the file, see
+        :py:func:`dlisio.dlis.__reduce__`, and the object is looked up in it
+        again when unpickled. Objects in the same pickle share the logical
+        file.
+        """
+        if self.logicalfile is None:
+            msg = '{} does not belong to a logical file, and cannot be pickled'
+            raise TypeError(msg.format(self))
+
+        return (resolve, (
+            self.logicalfile,
+            self.type,
+            self.name,
+            self.origin,
+            self.copynumber,
+        ))
+
     def __eq__(self, rhs):
         try:
             return self.attic == rhs.attic
@@ -46,6 +46,8 @@ class Calibration(BasicObject):
     Types and described detail in Chapter 5.8.7.3 - Static and Frame Data,
     CALIBRATION objects.
     """
+    __slots__ = ()
+
     attributes = {
         'METHOD'               : scalar,
         'CALIBRATED-CHANNELS'  : vector,
@@ -67,6 +67,8 @@ class Channel(BasicObject):
     described in detail in Chapter 5.5.1 - Static and Frame Data, CHANNEL
     objects.
     """
+    __slots__ = ()
+
     attributes = {
         'LONG-NAME'          : scalar,
         'REPRESENTATION-CODE': scalar,
@@ -15,17 +15,17 @@ class Coefficient(BasicObject):
     label : str
         Identify the coefficient-role in the calibration process
 
-    coefficients : list
+    coefficients : np.ndarray or list
         Coefficients corresponding to the label
 
-    references : list
+    references : np.ndarray or list
         Nominal values for each coefficient
 
-    plus_tolerance : list
+    plus_tolerance : np.ndarray or list
         Maximum value that a sample can exceed the reference and still be
         "within tolerance"
 
-    minus_tolerance : list
+    minus_tolerance : np.ndarray or list
         Maximum value that a sample can fall below the reference and still
         be "within tolerance"
 
@@ -43,6 +43,8 @@ class Coefficient(BasicObject):
     in Chapter 5.8.7.2 - Static and Frame Data, CALIBRATION-COEFFICIENT
     objects.
     """
+    __slots__ = ()
+
     attributes = {
         "LABEL"           : scalar,
         "COEFFICIENTS"    : vector,
@@ -60,19 +62,19 @@ class Coefficient(BasicObject):
 
     @property
     def coefficients(self):
-        return self['COEFFICIENTS']
+        return arrayattribute(self, 'COEFFICIENTS')
 
     @property
     def references(self):
-        return self['REFERENCES']
+        return arrayattribute(self, 'REFERENCES')
 
     @property
     def plus_tolerance(self):
-        return self['PLUS-TOLERANCES']
+        return arrayattribute(self, 'PLUS-TOLERANCES')
 
     @property
     def minus_tolerance(self):
-        return self['MINUS-TOLERANCES']
+        return arrayattribute(self, 'MINUS-TOLERANCES')
 
     def describe_attr(self, buf, width, indent, exclude):
         d = OrderedDict()
@@ -25,6 +25,8 @@ class Comment(BasicObject):
     rp66. COMMENT objects are defined in Appendix A.2 - Logical Record Types,
     described in detail in Chapter 6.1.2 - Transient Data, Comment objects.
     """
+    __slots__ = ()
+
     attributes = { 'TEXT' : vector }
 
     def __init__(self, obj = None, name = None, lf = None):
@@ -57,6 +57,8 @@ class Computation(BasicObject):
     Data, COMPUTATION objects.
     """
 
+    __slots__ = ()
+
     attributes = {
         'LONG-NAME' : scalar,
         'PROPERTIES': vector,
@@ -147,7 +149,7 @@ class Computation(BasicObject):
         Zone('ZONE-A')
         """
         try:
-            values = self.attic['VALUES'].values
+            values = arrayvalues(self.attic['VALUES'])
         except KeyError:
             return np.empty(0)
 
@@ -78,6 +78,8 @@ class Equipment(BasicObject):
     described in detail in Chapter 5.8.3 - Static and Frame Data, EQUIPMENT
     objects.
     """
+    __slots__ = ()
+
     attributes = {
         'TRADEMARK-NAME'  : scalar,
         'STATUS'          : boolean,
@@ -62,6 +62,8 @@ class Fileheader(BasicObject):
     Types and described in Chapter 5.1 - Static and Frame Data, File Header
     Logical Record (FHLR).
     """
+    __slots__ = ()
+
     attributes = {
         'SEQUENCE-NUMBER': scalar,
         'ID'             : scalar,
@@ -1,5 +1,5 @@
 from .basicobject import BasicObject
-from ..dlisutils import curves
+from ..dlisutils import curves, columns, arrow, rowcounts
 from .valuetypes import scalar, vector, boolean
 from .linkage import obname
 from .utils import *
@@ -78,6 +78,8 @@ class Frame(BasicObject):
     described in detail in Chapter 5.7.1 - Static and Frame Data, FRAME
     objects.
     """
+    __slots__ = ('dtype_fmt',)
+
     attributes = {
         'DESCRIPTION': scalar,
         'CHANNELS'   : vector,
@@ -203,7 +205,21 @@ class Frame(BasicObject):
         >>> frame.dtype_fmt = '{:s}-{:d}-{:d}'
         >>> frame.dtype()
         (FRAMENO','TIME-0-0', 'TDEP','TIME-1-0')
+
+        Notes
+        -----
+
+        The dtype is memoized per Frame instance, keyed on dtype_fmt and
+        strict. Use :func:`BasicObject.clear_cache` to rebuild it, e.g. after
+        changing the parsing rules of the Frame's channels.
         """
+        cache = self.attributecache()
+        key = ('dtype', self.dtype_fmt, strict)
+        try:
+            return cache[key]
+        except KeyError:
+            pass
+
         seen = {}
         types = [('FRAMENO', 'i4')]
 
@@ -257,6 +273,7 @@ class Frame(BasicObject):
             types = mkunique(types)
             dtype = np.dtype(types)
 
+        cache[key] = dtype
         return dtype
 
     def fmtstr(self):
@@ -266,17 +283,61 @@ class Frame(BasicObject):
         Frame-type have the same channels-list resulting in the same
         format-string for all frames of a given Frame-type.
 
-        The format-string is mainly intended for internal use.
+        The format-string is mainly intended for internal use, and is memoized
+        per Frame instance. See :func:`BasicObject.clear_cache`.
 
         Returns
         -------
         fmtstr : str
         """
+        cache = self.attributecache()
+        key = ('fmtstr',)
+        try:
+            return cache[key]
+        except KeyError:
+            pass
+
         # The first part of every frame is always FRAMENO, which is an
         # variable-lenght unsigned integer (i).
-        return 'i' + ''.join([x.fmtstr() for x in self.channels])
+        fmt = 'i' + ''.join([x.fmtstr() for x in self.channels])
+        cache[key] = fmt
+        return fmt
+
+    def nrows(self, progress=None):
+        """Number of rows in the curves of the frame
+
+        The exact number of rows :func:`curves` returns, to make room for the
+        curves up front, e.g. in a memory-mapped file. The frame data records
+        are read to count the frames in them, but not decoded, which is
+        cheaper than reading the curves, but still reads the records from
+        disk.
+
+        Parameters
+        ----------
+        progress : callable, optional
+            Called as progress('count_frames', done, total) with the number of
+            records counted so far, see :func:`curves`
+
+        Returns
+        -------
+        nrows : int
 
-    def curves(self, strict=True):
+        Examples
+        --------
+        Read a frame that is larger than memory into a .npy file
+
+        >>> rows = frame.nrows()
+        >>> out = np.lib.format.open_memmap('curves.npy', mode='w+',
+        ...                                 dtype=frame.dtype(),
+        ...                                 shape=(rows,))
+        >>> _ = frame.curves(out=out, workers=4)
+        >>> out.flush()
+        """
+        counts = rowcounts(self.logicalfile, self, progress=progress)
+        return int(counts.sum())
+
+    def curves(self, strict=True, since=0, workers=1, progress=None,
+               layout='rows', out=None):
         """All curves belonging to this frame
 
         Get all the curves in this frame as a structured numpy array. The frame
@@ -294,10 +355,59 @@ class Frame(BasicObject):
             numerical values (i.e. 0, 1, 2 ..) to the labels used for
             column-names in the returned array.
 
+        since : int, optional
+            Only read the frames with a frame number (FRAMENO) greater than
+            since. Frame numbers increase with every frame, so passing the
+            last frame number already read gives the rows appended since, see
+            :func:`dlisio.dlis.refresh`. Only the records with new frames are
+            read, which relies on the frame numbers increasing throughout the
+            file, as required by the standard.
+
+        workers : int, optional
+            Decode the frame data with up to this many threads. The records
+            are split between the threads, which read from the file
+            independently and decode without holding the GIL. Only frames
+            where no channel is decoded to python objects, i.e. with dtype
+            'O', are decoded in parallel, other frames, and files with tape
+            marks, are read with a single thread.
+
+        progress : callable, optional
+            Called as progress('read_fdata', done, total) with the number of
+            frame data records read so far, and the number of records to read.
+            The callback is called at most every 0.1 seconds, and once when
+            all records are read. Returning False cancels the read, which
+            raises dlisio.core.cancelled, and exceptions raised by the
+            callback propagate out of curves. The partially read curves are
+            released either way.
+
+        layout : {'rows', 'columns'}, optional
+            By default (layout='rows') the curves are a single structured
+            array, with one row per frame, where the samples of a channel are
+            interleaved with the samples of the other channels. With
+            layout='columns', every channel is decoded into its own,
+            contiguous array, returned in a dict keyed by the names of
+            :func:`dtype`. Columns are cheaper to access, and can be handed to
+            pandas or other tools without being copied first.
+
+        out : np.ndarray or dict, optional
+            Decode the curves into this array, instead of a new one, e.g. an
+            np.memmap, or an array in shared memory, see
+            :mod:`dlisio.shared`. It must be a C-contiguous array with dtype =
+            self.dtype, or with layout='columns', a dict with such an array
+            for every field of the dtype, with the shape of the field. It
+            must have room for all the rows that are read, see :func:`nrows`.
+            Only the rows read are written to, and no other copy of the
+            curves is made, also not with workers, whose buffers are flushed
+            to out for every 64 MB decoded. Frames larger than memory can be
+            read into a memory-mapped file this way.
+
         Returns
         -------
-        curves : np.ndarray
-            curves with dtype = self.dtype
+        curves : np.ndarray or dict
+            curves with dtype = self.dtype, or with layout='columns', a dict of
+            name -> np.ndarray, with the dtype of the field of the same name.
+            If out is given, the curves are views of the rows of out that were
+            read
 
         Raises
         ------
@@ -306,6 +416,19 @@ class Frame(BasicObject):
             If there multiple channels with identical name, origin, copynumber
             in Frame.channels. This can be suppressed by passing strict=False
 
+        ValueError
+            If workers is less than 1
+
+        ValueError
+            If layout is not 'rows' or 'columns'
+
+        ValueError
+            If out does not match the dtype, or has too few rows. The rows of
+            out that were read before running out of room are overwritten
+
+        dlisio.core.cancelled
+            If the progress callback returns False
+
         See also
         --------
         Channel.curves : Access the curve-data directly through the Channel
@@ -445,13 +568,184 @@ class Frame(BasicObject):
         >>> curves = frame.curves(strict=False)
         >>> curves.dtype.names
         ('FRAMENO', 'TDEP.0.0(0)', 'TDEP.0.0(1)', 'GR')
+
+        Read only the frames after the ones already read, e.g. after the file
+        has grown
+
+        >>> curves = frame.curves()
+        >>> _ = f.refresh()
+        >>> new = frame.curves(since=curves['FRAMENO'][-1])
+
+        Large frames with many records are read faster with more threads
+
+        >>> curves = frame.curves(workers=os.cpu_count())
+
+        Show the progress of a long read
+
+        >>> def progress(stage, done, total):
+        ...     print('{}/{} records'.format(done, total))
+        >>> curves = frame.curves(progress=progress)
+
+        Read every channel into its own array
+
+        >>> curves = frame.curves(layout='columns')
+        >>> curves['GR']
+        array([12.1, 13.4, 11.9, 12.7], dtype=float32)
+        >>> curves['GR'].flags['C_CONTIGUOUS']
+        True
+        >>> df = pd.DataFrame(curves)
+
+        Read into an existing array, and reuse it for the next read
+
+        >>> buf = np.empty(1000, dtype=frame.dtype())
+        >>> curves = frame.curves(out=buf)
+        >>> curves.base is buf
+        True
         """
+        if layout == 'columns':
+            fmts = ['i'] + [ch.fmtstr() for ch in self.channels]
+            return columns(self.logicalfile,
+                           self,
+                           self.dtype(strict=strict),
+                           fmts,
+                           since,
+                           workers,
+                           progress,
+                           out=out)
+
+        if layout != 'rows':
+            msg = "layout must be 'rows' or 'columns', was {}"
+            raise ValueError(msg.format(layout))
+
         return curves(self.logicalfile,
                       self,
                       self.dtype(strict=strict),
                       "",
                       self.fmtstr(),
-                      "")
+                      "",
+                      since,
+                      workers,
+                      progress,
+                      out=out)
+
+    async def acurves(self, strict=True, since=0, workers=1, progress=None,
+                      layout='rows', out=None):
+        """All curves belonging to this frame, without blocking the event loop
+
+        Awaitable :func:`curves`, for use with asyncio. The curves are read on
+        the thread pool of :mod:`dlisio.aio`, and cancelling the coroutine
+        cancels the read. The parameters are those of :func:`curves`, and
+        progress is called from the thread the read runs in.
+
+        Returns
+        -------
+        curves : np.ndarray or dict
+            See :func:`curves`
+
+        See also
+        --------
+        dlisio.aio.chunks : Read the curves of large frames in chunks
+
+        Examples
+        --------
+        >>> async def gamma_ray(frame):
+        ...     curves = await frame.acurves(layout='columns')
+        ...     return curves['GR']
+        """
+        from .. import aio
+        return await aio.acurves(self, strict, since, workers, progress,
+                                 layout, out)
+
+    def to_arrow(self, strict=True, metadata=True, since=0, workers=1,
+                 progress=None):
+        """All curves belonging to this frame, as an Arrow table
+
+        Get all the curves in this frame as a pyarrow.Table, with one column
+        per channel, preceded by the frame number (FRAMENO). The columns are
+        named like the fields of :func:`dtype`. This requires pyarrow.
+
+        Channels are converted to arrow types by their representation code:
+
+        ============================== =====================================
+        Representation code            Arrow type
+        ============================== =====================================
+        integers and floating points   primitive arrays of the same type,
+                                       like in :func:`curves`
+        FSING1, FSING2, FDOUB1, FDOUB2 FixedSizeList of the value and its
+                                       bounds
+        CSINGL, CDOUBL                 FixedSizeList of the real and
+                                       imaginary part
+        IDENT, ASCII, UNITS            string
+        DTIME                          timestamp (ms)
+        OBNAME, OBJREF, ATTREF         struct
+        STATUS                         bool
+        ============================== =====================================
+
+        Multi-dimensional channels are (nested) FixedSizeList of their
+        samples, one level per dimension.
+
+        The channels are decoded into their own arrays, like
+        curves(layout='columns'), and numeric columns are wrapped by arrow
+        without being copied. Channels that :func:`curves` decodes to python
+        objects are converted value by value.
+
+        Parameters
+        ----------
+
+        strict : boolean, optional
+            See :func:`curves`
+
+        metadata : boolean, optional
+            Add the attributes of the frame as schema metadata, and the
+            attributes of each channel (name, origin, copynumber, long_name,
+            units, reprc and dimension) as field metadata. Values are
+            strings, and attributes that are not set are left out.
+
+        since : int, optional
+            See :func:`curves`
+
+        workers : int, optional
+            See :func:`curves`
+
+        progress : callable, optional
+            See :func:`curves`
+
+        Returns
+        -------
+        table : pyarrow.Table
+
+        Raises
+        ------
+        ImportError
+            If pyarrow is not installed
+
+        See also
+        --------
+        Frame.curves : The curves as a structured numpy array
+
+        Examples
+        --------
+        Query the curves with duckdb
+
+        >>> table = frame.to_arrow()
+        >>> duckdb.sql('SELECT max(GR) FROM table')
+
+        Write the curves to parquet
+
+        >>> import pyarrow.parquet as pq
+        >>> pq.write_table(frame.to_arrow(), 'frame.parquet')
+
+        Read the units of a channel
+
+        >>> frame.to_arrow().schema.field('GR').metadata[b'units']
+        b'gAPI'
+        """
+        values = self.curves(strict = strict,
+                             since = since,
+                             workers = workers,
+                             progress = progress,
+                             layout = 'columns')
+        return arrow(self, values, metadata)
 
     def fmtstrchannel(self, channel):
         """Generate format-strings for one Frame channel
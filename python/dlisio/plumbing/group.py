@@ -35,6 +35,8 @@ class Group(BasicObject):
     described in detail in Chapter 5.8.8 - Static and Frame Data, Group
     objects.
     """
+    __slots__ = ()
+
     attributes = {
         'DESCRIPTION' : scalar,
         'OBJECT-TYPE' : scalar,
@@ -76,6 +76,8 @@ class Longname(BasicObject):
     Objects.
     """
 
+    __slots__ = ()
+
     attributes = {
         'GENERAL-MODIFIER'  : vector,
         'QUANTITY'          : scalar,
@@ -57,6 +57,8 @@ class Measurement(BasicObject):
     Appendix A.2 - Logical Record Types and described in detail in Chapter
     5.8.7.1 - Static and Frame Data, CALIBRATION-MEASUREMENT objects.
     """
+    __slots__ = ()
+
     attributes = {
         'PHASE'             : scalar,
         'MEASUREMENT-SOURCE': scalar,
@@ -127,7 +129,7 @@ class Measurement(BasicObject):
         may be either a scalar or ndarray
         """
         try:
-            samples = self.attic['MEASUREMENT'].values
+            samples = arrayvalues(self.attic['MEASUREMENT'])
         except KeyError:
             return np.empty(0)
 
@@ -147,7 +149,7 @@ class Measurement(BasicObject):
         structure as the samples in the sample attribute.
         """
         try:
-            dev = self.attic['MAXIMUM-DEVIATION'].values
+            dev = arrayvalues(self.attic['MAXIMUM-DEVIATION'])
         except KeyError:
             return np.empty(0)
 
@@ -166,7 +168,7 @@ class Measurement(BasicObject):
         structure as the samples in the sample attribute.
         """
         try:
-            dev = self.attic['STANDARD-DEVIATION'].values
+            dev = arrayvalues(self.attic['STANDARD-DEVIATION'])
         except KeyError:
             return np.empty(0)
 
@@ -181,7 +183,7 @@ class Measurement(BasicObject):
         structure as the samples in the sample attribute.
         """
         try:
-            ref = self.attic['REFERENCE'].values
+            ref = arrayvalues(self.attic['REFERENCE'])
         except KeyError:
             return np.empty(0)
 
@@ -199,7 +201,7 @@ class Measurement(BasicObject):
         structure as the samples in the sample attribute.
         """
         try:
-            tolerance = self.attic['PLUS-TOLERANCE'].values
+            tolerance = arrayvalues(self.attic['PLUS-TOLERANCE'])
         except KeyError:
             return np.empty(0)
 
@@ -217,7 +219,7 @@ class Measurement(BasicObject):
         structure as the samples in the sample attribute.
         """
         try:
-            tolerance   = self.attic['MINUS-TOLERANCE'].values
+            tolerance   = arrayvalues(self.attic['MINUS-TOLERANCE'])
         except KeyError:
             return np.empty(0)
 
@@ -45,6 +45,8 @@ class Message(BasicObject):
     rp66. MESSAGE objects are defined in Appendix A.2 - Logical Record Types,
     described in detail in Chapter 6.1.1 - Transient Data, message objects.
     """
+    __slots__ = ()
+
     attributes = {
         'TYPE'           : scalar,
         'TIME'           : scalar,
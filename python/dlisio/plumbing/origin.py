@@ -97,6 +97,8 @@ class Origin(BasicObject):
     described in detail in Chapter 5.1 - Static and Frame Data, Origin objects.
 
     """
+    __slots__ = ()
+
     attributes = {
         'FILE-ID'           : scalar,
         'FILE-SET-NAME'     : scalar,
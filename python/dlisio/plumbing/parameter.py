@@ -48,6 +48,8 @@ class Parameter(BasicObject):
     Types, described in detail in Chapter 5.8.2 - Static and Frame Data,
     PARAMETER objects.
     """
+    __slots__ = ()
+
     attributes = {
         'LONG-NAME' : scalar,
         'DIMENSION' : reverse,
@@ -131,7 +133,7 @@ class Parameter(BasicObject):
         Zone('ZONE-A')
         """
         try:
-            values = self.attic['VALUES'].values
+            values = arrayvalues(self.attic['VALUES'])
         except KeyError:
             return np.empty(0)
 
@@ -73,6 +73,8 @@ class Path(BasicObject):
     objects.
 
     """
+    __slots__ = ()
+
     attributes = {
         'FRAME-TYPE'           : scalar,
         'WELL-REFERENCE-POINT' : scalar,
@@ -64,6 +64,8 @@ class Process(BasicObject):
     described in detail in Chapter 5.8.5 - Static and Frame Data, Process
     objects.
     """
+    __slots__ = ()
+
     attributes = {
         'DESCRIPTION'         : scalar,
         'TRADEMARK-NAME'      : scalar,
@@ -52,6 +52,8 @@ class Splice(BasicObject):
     objects.
 
     """
+    __slots__ = ()
+
     attributes = {
         'OUTPUT-CHANNEL'  : scalar,
         'INPUT-CHANNELS'  : vector,
@@ -48,6 +48,8 @@ class Tool(BasicObject):
     objects are listed in Appendix A.2 - Logical Record Types, described in
     detail in Chapter 5.8.4 - Static and Frame Data, TOOL objects.
     """
+    __slots__ = ()
+
     attributes = {
         'DESCRIPTION'    : scalar,
         'TRADEMARK-NAME' : scalar,
@@ -12,6 +12,8 @@ class Unknown(BasicObject):
     BasicObject : The basic object that Unknown is derived from
 
     """
+    __slots__ = ()
+
     def __init__(self, obj = None, name = None, type = None, lf = None):
         if type is None:
             type = 'UNKNOWN'
@@ -5,6 +5,59 @@ from collections import OrderedDict, Sequence
 from textwrap import fill
 
 
+def arrayvalues(attr):
+    """Values of the attribute, as an np.ndarray when possible
+
+    Homogeneous, numeric attributes are exposed from the native parser as an
+    np.ndarray, which avoids materializing every value as a separate python
+    object. The values of an attribute always have the same representation
+    code, and the array has the matching dtype, e.g. uint8 for USHORT and
+    float32 for FSINGL, rather than the int64 and float64 np.array gives for
+    a list of values. Arithmetic on small dtypes can overflow, so widen the
+    values with astype first when that matters. Other attributes, and
+    attributes that does not come from the native parser, fall back to the
+    plain list of values.
+
+    Parameters
+    ----------
+
+    attr : dlisio.core.object_attribute
+
+    Returns
+    -------
+
+    values : np.ndarray or list
+    """
+    array = getattr(attr, 'array', None)
+    if array is not None: return array
+    return attr.values
+
+def arrayattribute(obj, key):
+    """Attribute key of obj, as an np.ndarray when the values are numeric
+
+    Numeric values are read with :func:`arrayvalues`. Everything else, like
+    strings and attributes that are not set, is parsed as obj[key].
+
+    Parameters
+    ----------
+
+    obj : dlisio.plumbing.BasicObject
+
+    key : str
+
+    Returns
+    -------
+
+    values : np.ndarray or list
+    """
+    try:
+        values = arrayvalues(obj.attic[key])
+    except KeyError:
+        return obj[key]
+
+    if isinstance(values, np.ndarray) and len(values) > 0: return values
+    return obj[key]
+
 def validshape(data, shape, samplecount=None):
     """Return a valid shape that can be used to sample the data.
     For a shape to be valid, the following relationship must hold::
@@ -121,7 +174,9 @@ def sampling(data, shape, single=False):
     else:
         elem_shape = ()
 
-    data = np.array(data)
+    # Do not copy if data already is an ndarray, e.g. attribute values
+    # straight from the native parser
+    data = np.asarray(data)
     elem_dtype = np.dtype((data.dtype, elem_shape))
 
     if shape == [1]: dtype = np.dtype(elem_dtype)
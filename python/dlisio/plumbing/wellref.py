@@ -48,6 +48,8 @@ class Wellref(BasicObject):
     Logical Record Types are described in detail in Chapter 5.2.2 - Static and
     Frame Data, Well reference objects.
     """
+    __slots__ = ()
+
     attributes = {
         'PERMANENT-DATUM'           : scalar,
         'VERTICAL-ZERO'             : scalar,
@@ -34,6 +34,8 @@ class Zone(BasicObject):
     ZONE objects are listed in Appendix A.2 - Logical Record Types, and
     described in detail in Chapter 5.8.1 - Static and Frame Data, Zone Objects.
     """
+    __slots__ = ()
+
     attributes = {
         'DESCRIPTION': scalar,
         'DOMAIN'     : scalar,
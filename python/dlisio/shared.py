@@ -0,0 +1,287 @@
+"""
+Curves in shared memory, for process pools
+
+Curves read in a process pool are pickled to send them back to the parent
+process, which copies them through a pipe. For large frames it is cheaper to
+have the processes decode straight into memory that all of them can reach,
+like a :class:`multiprocessing.shared_memory.SharedMemory` block, or a file
+mapped with :class:`numpy.memmap`.
+
+The records of a frame are split into partitions, and the number of rows
+every partition decodes to is counted up front, so every process writes to
+its own slice of the shared array. The partitions, and the frames and
+logical files they refer to, are pickled as where they are in the file, and
+opened again by the processes.
+
+Only frames of plain values can be shared. Frames where a channel is decoded
+to python objects, like strings and DTIME, cannot. Shared memory blocks need
+python 3.8 or newer, memmaps work on all supported versions.
+"""
+from collections import namedtuple
+import concurrent.futures
+import mmap
+
+try:
+    from multiprocessing import shared_memory
+except ImportError:
+    # multiprocessing.shared_memory was added in python 3.8, older versions
+    # can still decode into a memmap
+    shared_memory = None
+
+import numpy as np
+
+from . import dlisutils
+
+class Partition(namedtuple('Partition', 'frame records rows')):
+    """A run of the records of a frame, and the rows they decode to
+
+    Attributes
+    ----------
+    frame : dlisio.plumbing.Frame
+    records : slice
+        The records of the partition, in the records of the frame in
+        :attr:`dlisio.dlis.fdata_index`
+    rows : slice
+        The rows of the curves of the whole frame that the records decode to
+    """
+    __slots__ = ()
+
+def partition(frame, parts):
+    """Split the records of a frame into partitions
+
+    The records are split into parts runs of about the same number of
+    records. The rows of the partitions follow each other, and the rows of
+    the last partition stop at the number of rows in the frame. Counting the
+    rows reads the records of the frame, but does not decode them.
+
+    Parameters
+    ----------
+    frame : dlisio.plumbing.Frame
+    parts : int
+        Number of partitions. Frames with fewer records are split into one
+        partition per record, and frames without records into a single,
+        empty, partition.
+
+    Returns
+    -------
+    parts : list of Partition
+
+    Examples
+    --------
+    Make room for the curves of the frame in shared memory
+
+    >>> parts = dlisio.shared.partition(frame, 8)
+    >>> rows = parts[-1].rows.stop
+    >>> size = rows * frame.dtype().itemsize
+    >>> shm = shared_memory.SharedMemory(create=True, size=max(size, 1))
+    """
+    if parts < 1:
+        msg = 'parts (which is {}) must be >= 1'
+        raise ValueError(msg.format(parts))
+
+    counts = dlisutils.rowcounts(frame.logicalfile, frame)
+    ends = np.concatenate(([0], np.cumsum(counts)))
+
+    nrecords = len(counts)
+    parts = max(1, min(parts, nrecords))
+
+    partitions = []
+    for i in range(parts):
+        first = nrecords * i // parts
+        last = nrecords * (i + 1) // parts
+        rows = slice(int(ends[first]), int(ends[last]))
+        partitions.append(Partition(frame, slice(first, last), rows))
+    return partitions
+
+def read(part, out, strict=True, workers=1):
+    """Read the rows of a partition into their slice of out
+
+    The building block of :func:`curves`, for use with other process pools.
+    Decodes the records of the partition into out[part.rows].
+
+    Parameters
+    ----------
+    part : Partition
+    out : np.ndarray
+        Array for the curves of the whole frame, with dtype =
+        part.frame.dtype(strict)
+    strict : boolean, optional
+        See :func:`dlisio.plumbing.Frame.curves`
+    workers : int, optional
+        See :func:`dlisio.plumbing.Frame.curves`
+
+    Returns
+    -------
+    curves : np.ndarray
+        out[part.rows]
+
+    Raises
+    ------
+    RuntimeError
+        If the records do not decode to the rows of the partition
+    """
+    frame = part.frame
+    lf = frame.logicalfile
+    indices = lf.fdata_index.get(frame.fingerprint, [])[part.records]
+
+    dst = out[part.rows]
+    curves = dlisutils.curves(
+        lf,
+        frame,
+        frame.dtype(strict = strict),
+        '',
+        frame.fmtstr(),
+        '',
+        workers = workers,
+        indices = indices,
+        out = dst,
+    )
+
+    if len(curves) != len(dst):
+        msg = '{} decoded to {} rows, expected {}'
+        raise RuntimeError(msg.format(part, len(curves), len(dst)))
+    return curves
+
+def attach(name):
+    """ For internal use.
+    Attach to the shared memory block name, made by another process, which
+    is responsible for unlinking it
+    """
+    try:
+        return shared_memory.SharedMemory(name, track = False)
+    except TypeError:
+        # track was added in python 3.13
+        return shared_memory.SharedMemory(name)
+
+def readpart(args):
+    """ For internal use.
+    Read a partition into the shared memory block or file described by
+    target, in a worker process
+    """
+    part, target, rows, strict = args
+    dtype = part.frame.dtype(strict = strict)
+
+    with part.frame.logicalfile:
+        if target[0] == 'shm':
+            shm = attach(target[1])
+            try:
+                out = np.ndarray(rows, dtype = dtype, buffer = shm.buf)
+                read(part, out, strict)
+                # The block cannot be closed while arrays refer to it
+                del out
+            finally:
+                shm.close()
+            return
+
+        _, filename, offset = target
+        out = np.memmap(filename, dtype = dtype, mode = 'r+', offset = offset,
+                        shape = rows)
+        read(part, out, strict)
+        out.flush()
+
+def curves(parts, out, processes=None, strict=True):
+    """Read the curves of a frame into shared memory with a process pool
+
+    Every partition is read by a process of its own, which decodes its rows
+    straight into out, so no curves are sent between the processes.
+
+    Parameters
+    ----------
+    parts : list of Partition
+        The partitions of a frame, see :func:`partition`
+    out : multiprocessing.shared_memory.SharedMemory or np.memmap
+        Memory to decode into, with room for all the rows of the frame. A
+        memmap must have dtype = frame.dtype(strict), and be opened with
+        mode 'r+' or 'w+'. It cannot be a view of another memmap.
+    processes : int, optional
+        Number of processes, defaults to one per partition
+    strict : boolean, optional
+        See :func:`dlisio.plumbing.Frame.curves`
+
+    Returns
+    -------
+    curves : np.ndarray
+        The curves of the frame, in out. The shared memory block cannot be
+        closed until the array, and any views of it, are released.
+
+    Raises
+    ------
+    ValueError
+        If the frame has channels decoded to python objects, or out has too
+        few rows
+    TypeError
+        If out is neither a SharedMemory block nor a memmap
+
+    Examples
+    --------
+    Read a frame with 8 processes
+
+    >>> parts = dlisio.shared.partition(frame, 8)
+    >>> size = parts[-1].rows.stop * frame.dtype().itemsize
+    >>> shm = shared_memory.SharedMemory(create=True, size=max(size, 1))
+    >>> try:
+    ...     curves = dlisio.shared.curves(parts, shm)
+    ...     gr = curves['GR'].mean()
+    ...     del curves
+    ... finally:
+    ...     shm.close()
+    ...     shm.unlink()
+
+    Read a frame into a file
+
+    >>> parts = dlisio.shared.partition(frame, 8)
+    >>> rows = parts[-1].rows.stop
+    >>> out = np.memmap('curves.bin', dtype=frame.dtype(), mode='w+',
+    ...                 shape=rows)
+    >>> curves = dlisio.shared.curves(parts, out)
+    """
+    frame = parts[0].frame
+    dtype = frame.dtype(strict = strict)
+    rows = parts[-1].rows.stop
+
+    if dtype.hasobject:
+        msg = ('{} has channels decoded to python objects, which cannot be '
+               'shared between processes')
+        raise ValueError(msg.format(frame))
+
+    if shared_memory and isinstance(out, shared_memory.SharedMemory):
+        if out.size < rows * dtype.itemsize:
+            msg = 'out has room for {} rows, expected {}'
+            raise ValueError(msg.format(out.size // dtype.itemsize, rows))
+
+        target = ('shm', out.name)
+        result = lambda: np.ndarray(rows, dtype = dtype, buffer = out.buf)
+
+    elif isinstance(out, np.memmap):
+        if not isinstance(out.base, mmap.mmap):
+            msg = 'out must be a memmap of its own, not a view of one'
+            raise ValueError(msg)
+
+        # The processes write to the file, which copy-on-write maps do not
+        # see
+        if out.mode not in ('r+', 'w+'):
+            msg = "out must be opened with mode 'r+' or 'w+', was '{}'"
+            raise ValueError(msg.format(out.mode))
+
+        dst = dlisutils.output(out, dtype)
+        if len(dst) < rows:
+            msg = 'out has room for {} rows, expected {}'
+            raise ValueError(msg.format(len(dst), rows))
+
+        target = ('memmap', out.filename, out.offset)
+        result = lambda: out[:rows]
+
+    else:
+        msg = 'out must be a SharedMemory block or a memmap, was {}'
+        raise TypeError(msg.format(type(out)))
+
+    if rows == 0: return result()
+
+    work = [(part, target, rows, strict) for part in parts]
+    if processes is None: processes = len(parts)
+
+    with concurrent.futures.ProcessPoolExecutor(processes) as pool:
+        for _ in pool.map(readpart, work):
+            pass
+
+    return result()
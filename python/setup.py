@@ -62,6 +62,9 @@ skbuild.setup(
                       'pytest-runner',
     ],
     tests_require = ['pytest'],
+    entry_points = {
+        'console_scripts': ['dlisio-convert = dlisio.convert:main'],
+    },
     # we're building with the pybind11 fetched from pip. Since we don't rely on
     # a cmake-installed pybind there's also no find_package(pybind11) -
     # instead, the get include dirs from the package and give directly from
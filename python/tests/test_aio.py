@@ -0,0 +1,122 @@
+"""
+Testing dlisio.aio, the asyncio interface to loading files and reading curves
+"""
+import asyncio
+import threading
+
+import pytest
+import numpy as np
+
+import dlisio
+from dlisio import aio
+
+multifdata = 'data/chap4-7/iflr/multidimensions-multifdata.dlis'
+
+def run(coroutine):
+    # asyncio.run was added in python 3.7
+    loop = asyncio.new_event_loop()
+    asyncio.set_event_loop(loop)
+    try:
+        return loop.run_until_complete(coroutine)
+    finally:
+        asyncio.set_event_loop(None)
+        loop.close()
+
+def test_aload(fpath):
+    files = run(aio.aload(fpath))
+    with files, dlisio.load(fpath) as expected:
+        assert len(files) == len(expected)
+        for f, g in zip(files, expected):
+            assert f.fileheader.id == g.fileheader.id
+            assert f.fdata_index == g.fdata_index
+
+def test_aload_progress(fpath):
+    stages = set()
+    def progress(stage, done, total):
+        stages.add(stage)
+
+    with run(aio.aload(fpath, progress = progress)):
+        pass
+    assert 'findoffsets' in stages
+
+def test_acurves(f):
+    frame = f.object('FRAME', 'FRAME1')
+    curves = run(frame.acurves())
+    np.testing.assert_array_equal(curves, frame.curves())
+
+    columns = run(frame.acurves(layout = 'columns'))
+    assert list(columns) == list(curves.dtype.names)
+    for name, column in columns.items():
+        np.testing.assert_array_equal(column, curves[name])
+
+def test_acurves_concurrent():
+    async def read(frames):
+        return await asyncio.gather(*[x.acurves() for x in frames])
+
+    with dlisio.load(multifdata) as (f, *_):
+        frames = list(f.frames) * 4
+        results = run(read(frames))
+        for frame, curves in zip(frames, results):
+            np.testing.assert_array_equal(curves, frame.curves())
+
+def test_acurves_cancel(f):
+    frame = f.object('FRAME', 'FRAME1')
+    started = threading.Event()
+    release = threading.Event()
+    calls = []
+
+    def progress(stage, done, total):
+        calls.append(done)
+        started.set()
+        release.wait(5)
+
+    async def main():
+        loop = asyncio.get_event_loop()
+        task = asyncio.ensure_future(frame.acurves(progress = progress))
+        await loop.run_in_executor(None, started.wait, 5)
+        task.cancel()
+        release.set()
+        with pytest.raises(asyncio.CancelledError):
+            await task
+
+        # The read is stopped, and the file can be read again
+        return await frame.acurves()
+
+    curves = run(main())
+    assert len(calls) == 1
+    np.testing.assert_array_equal(curves, frame.curves())
+
+def test_chunks():
+    async def collect(frame, **kwargs):
+        chunks = []
+        async for chunk in aio.chunks(frame, **kwargs):
+            chunks.append(chunk)
+        return chunks
+
+    with dlisio.load(multifdata) as (f, *_):
+        for frame in f.frames:
+            expected = frame.curves()
+
+            chunks = run(collect(frame, chunksize = 1))
+            assert len(chunks) == len(f.fdata_index[frame.fingerprint])
+            np.testing.assert_array_equal(np.concatenate(chunks), expected)
+
+            chunks = run(collect(frame, layout = 'columns'))
+            assert len(chunks) == 1
+            for name in expected.dtype.names:
+                np.testing.assert_array_equal(chunks[0][name], expected[name])
+
+def test_chunks_invalid_layout(f):
+    frame = f.object('FRAME', 'FRAME1')
+
+    with pytest.raises(ValueError):
+        _ = aio.chunks(frame, layout = 'diagonal')
+
+def test_configure(f):
+    frame = f.object('FRAME', 'FRAME1')
+    try:
+        aio.configure(max_workers = 1)
+        curves = run(frame.acurves())
+        np.testing.assert_array_equal(curves, frame.curves())
+    finally:
+        aio.configure()
@@ -37,6 +37,64 @@ def test_getitem_noattribute(f):
     with pytest.raises(KeyError):
         _ = obj['DUMMY']
 
+def test_getitem_memoized(f):
+    frame = f.object('FRAME', 'FRAME1')
+
+    channels = frame.channels
+    assert frame['CHANNELS'] == channels
+    assert len(frame.cache) == 1
+
+    # The memoized list is not handed out, so modifying the returned list does
+    # not affect the object
+    channels.pop()
+    assert frame.channels != channels
+
+def test_getitem_memoized_rules_changed(f):
+    frame = f.object('FRAME', 'FRAME1')
+    assert frame.index_type == 'BOREHOLE-DEPTH'
+
+    frame.attributes = dict(frame.attributes)
+    frame.attributes['INDEX-TYPE'] = vector
+    assert frame.index_type == ['BOREHOLE-DEPTH']
+
+def test_getitem_memoized_clear_cache(f):
+    frame = f.object('FRAME', 'FRAME1')
+    _ = frame.index_type
+    assert len(frame.cache) == 1
+
+    frame.clear_cache()
+    assert not frame.cache
+    assert frame.index_type == 'BOREHOLE-DEPTH'
+
+def test_getitem_no_memoization_for_dict_attic():
+    Attr = namedtuple('attr', ['values', 'units'])
+    ch = Channel()
+    ch.attic = {'UNITS' : Attr(['m'], None)}
+    assert ch.units == 'm'
+
+    ch.attic['UNITS'] = Attr(['s'], None)
+    assert ch.units == 's'
+    assert not ch.cache
+
+def test_slots(f):
+    ch = f.object('CHANNEL', 'CHANN1', 10, 0)
+
+    # Objects should be lean, and not carry a __dict__
+    assert not hasattr(ch, '__dict__')
+    with pytest.raises(AttributeError):
+        ch.undefined = None
+
+def test_objectname_assignment():
+    ch = Channel(name = dlisio.core.obname(10, 2, 'CHANN1'))
+    assert ch.name       == 'CHANN1'
+    assert ch.origin     == 10
+    assert ch.copynumber == 2
+
+    ch.origin = 1
+    assert ch.name       == 'CHANN1'
+    assert ch.origin     == 1
+    assert ch.copynumber == 2
+
 def test_lookup(f):
     value = dlisio.core.obname(10, 0, 'CHANN2')
     res = lookup(f, linkage.obname('CHANNEL'), value)
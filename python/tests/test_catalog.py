@@ -0,0 +1,176 @@
+"""
+Testing dlisio.catalog, the SQLite index of the metadata of many files
+"""
+import os
+import shutil
+
+import pytest
+import numpy as np
+
+import dlisio
+from dlisio.catalog import Catalog
+
+reprcodes = 'data/chap4-7/iflr/all-reprcodes.dlis'
+multifdata = 'data/chap4-7/iflr/multidimensions-multifdata.dlis'
+
+@pytest.fixture
+def archive(tmpdir):
+    src = tmpdir.mkdir('archive')
+    shutil.copy(reprcodes, str(src))
+    shutil.copy(multifdata, str(src.mkdir('well-2')))
+    return str(src)
+
+@pytest.fixture
+def cat(tmpdir, archive):
+    with Catalog(str(tmpdir.join('catalog.db'))) as cat:
+        stats = cat.update([archive], jobs = 1)
+        assert stats['added'] == 2
+        yield cat
+
+def test_catalog_channels(cat, archive):
+    channels = cat.channels(name = 'CH01')
+    assert len(channels) == 1
+
+    ch = channels[0]
+    assert ch.path == os.path.join(archive, 'all-reprcodes.dlis')
+    assert ch.logicalfile == 0
+    assert ch.frame == 'FRAME-REPRCODE'
+    assert ch.origin == 10
+    assert ch.copynumber == 0
+    assert ch.reprc == 1
+    assert ch.dimension == '[1]'
+
+    # Patterns are regular expressions, matched from the start, and not
+    # case-sensitive
+    assert len(cat.channels(name = 'ch0[1-3]')) == 3
+    assert cat.channels(name = 'H01') == []
+
+    assert all(x.reprc == 2 for x in cat.channels(reprc = 2))
+
+def test_catalog_channels_match_file(cat, archive):
+    path = os.path.join(archive, 'well-2', 'multidimensions-multifdata.dlis')
+    with dlisio.load(path) as (f, *_):
+        expected = sorted((x.name, x.units) for x in f.channels)
+
+    channels = cat.channels(path = '.*well-2')
+    assert sorted((x.name, x.units) for x in channels) == expected
+
+def test_catalog_frames(cat):
+    frames = cat.frames(name = 'FRAME-REPRCODE')
+    assert len(frames) == 1
+    assert frames[0].records == 1
+
+    frames = cat.frames(path = '.*multifdata')
+    with dlisio.load(multifdata) as (f, *_):
+        expected = {
+            x.name : len(f.fdata_index.get(x.fingerprint, []))
+            for x in f.frames
+        }
+    assert { x.name : x.records for x in frames } == expected
+
+def test_catalog_origins(tmpdir, fpath):
+    with Catalog(str(tmpdir.join('catalog.db'))) as cat:
+        cat.update([fpath], jobs = 1)
+        origins = cat.origins(name = 'DEFINING_ORIGIN$')
+
+    assert len(origins) == 1
+    assert origins[0].path == fpath
+    assert origins[0].well_name == 'SECRET-WELL'
+    assert origins[0].field_name == 'WILDCAT'
+    assert origins[0].file_set_name == 'SET-NAME'
+
+def test_catalog_open(cat):
+    entry = cat.frames(path = '.*multifdata')[0]
+    with cat.open(entry) as f:
+        frame = f.object('FRAME', entry.name, entry.origin, entry.copynumber)
+        curves = frame.curves()
+
+    with dlisio.load(multifdata) as (f, *_):
+        frame = f.object('FRAME', entry.name, entry.origin, entry.copynumber)
+        expected = frame.curves()
+
+    np.testing.assert_array_equal(curves, expected)
+
+def test_catalog_open_channel(cat):
+    entry = cat.channels(name = 'CH02')[0]
+    with cat.open(entry) as f:
+        channel = f.object('CHANNEL', entry.name, entry.origin,
+                           entry.copynumber)
+        curves = channel.curves()
+
+    with dlisio.load(entry.path) as (f, *_):
+        channel = f.object('CHANNEL', entry.name, entry.origin,
+                           entry.copynumber)
+        np.testing.assert_array_equal(curves, channel.curves())
+
+def test_catalog_update_incremental(cat, archive):
+    stats = cat.update([archive], jobs = 1)
+    assert stats['unchanged'] == 2
+    assert stats['added'] == stats['updated'] == stats['removed'] == 0
+
+    path = os.path.join(archive, 'all-reprcodes.dlis')
+    os.utime(path, (0, 0))
+    stats = cat.update([archive], jobs = 1)
+    assert stats['updated'] == 1
+    assert stats['unchanged'] == 1
+    assert len(cat.channels(name = 'CH01')) == 1
+
+    shutil.rmtree(os.path.join(archive, 'well-2'))
+    stats = cat.update([archive], jobs = 1)
+    assert stats['removed'] == 1
+    assert cat.frames(path = '.*multifdata') == []
+    assert cat.channels(path = '.*multifdata') == []
+
+def test_catalog_update_removed_file(cat, archive):
+    path = os.path.join(archive, 'all-reprcodes.dlis')
+    os.remove(path)
+
+    stats = cat.update([path], jobs = 1)
+    assert stats['removed'] == 1
+    assert cat.channels(name = 'CH01') == []
+
+def test_catalog_missing_channels(tmpdir, assert_log):
+    # Frames that reference channels that are not in the file are indexed
+    # with the channels that are
+    path = 'data/chap4-7/many-logical-files.dlis'
+    with Catalog(str(tmpdir.join('catalog.db'))) as cat:
+        stats = cat.update([path], jobs = 1)
+        assert stats['added'] == 1
+        assert stats['failed'] == 0
+        assert len(cat.frames()) > 0
+
+    assert_log('not in the file')
+
+def test_catalog_open_changed(cat, archive):
+    entry = cat.frames(name = 'FRAME-REPRCODE')[0]
+    os.utime(entry.path, (0, 0))
+
+    with pytest.raises(RuntimeError) as exc:
+        _ = cat.open(entry)
+    assert 'update the catalog' in str(exc.value)
+
+def test_catalog_failed(cat, archive):
+    broken = os.path.join(archive, 'broken.dlis')
+    with open(broken, 'wb') as f:
+        f.write(b'not a dlis file')
+
+    stats = cat.update([archive], jobs = 1)
+    assert stats['failed'] == 1
+    assert stats['unchanged'] == 2
+
+    files = cat.files(error = '.')
+    assert [path for path, _ in files] == [broken]
+
+    # Failed files are not tried again until they change
+    stats = cat.update([archive], jobs = 1)
+    assert stats['failed'] == 0
+    assert stats['unchanged'] == 3
+
+def test_catalog_invalid_filters(cat):
+    with pytest.raises(ValueError) as exc:
+        _ = cat.channels(name = '*')
+    assert 'Invalid regex' in str(exc.value)
+
+    with pytest.raises(ValueError) as exc:
+        _ = cat.channels(nosuchfield = 'GR')
+    assert 'unknown field' in str(exc.value)
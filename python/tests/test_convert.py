@@ -0,0 +1,148 @@
+"""
+Testing dlisio.convert, the conversion of files to parquet, hdf5 and zarr
+"""
+import json
+import os
+import shutil
+
+import pytest
+import numpy as np
+
+import dlisio
+from dlisio import convert
+
+reprcodes = 'data/chap4-7/iflr/all-reprcodes.dlis'
+multifdata = 'data/chap4-7/iflr/multidimensions-multifdata.dlis'
+
+def expected(fpath):
+    with dlisio.load(fpath) as (f, *_):
+        return {
+            convert.datasetname(0, frame) : frame.curves()
+            for frame in f.frames
+        }
+
+def test_convert_parquet(tmpdir):
+    pq = pytest.importorskip('pyarrow.parquet')
+    outdir = str(tmpdir)
+
+    stats = convert.convert([reprcodes, multifdata], outdir, jobs = 1)
+    assert [x['status'] for x in stats] == ['done', 'done']
+    assert stats[1]['frames'] == 1
+    assert stats[1]['rows'] > 0
+
+    output = os.path.join(outdir, 'multidimensions-multifdata.dlis')
+    for name, curves in expected(multifdata).items():
+        table = pq.read_table(os.path.join(output, name + '.parquet'))
+        assert table.column_names == list(curves.dtype.names)
+        for column in curves.dtype.names:
+            values = np.array(table.column(column).to_pylist())
+            np.testing.assert_array_equal(values, curves[column])
+
+def test_convert_small_chunks(tmpdir):
+    pq = pytest.importorskip('pyarrow.parquet')
+    outdir = str(tmpdir)
+
+    convert.convert([multifdata], outdir, jobs = 1, chunksize = 1)
+
+    output = os.path.join(outdir, 'multidimensions-multifdata.dlis')
+    for name, curves in expected(multifdata).items():
+        table = pq.read_table(os.path.join(output, name + '.parquet'))
+        values = np.array(table.column('FRAMENO').to_pylist())
+        np.testing.assert_array_equal(values, curves['FRAMENO'])
+
+def test_convert_hdf5(tmpdir):
+    h5py = pytest.importorskip('h5py')
+    outdir = str(tmpdir)
+
+    stats = convert.convert([reprcodes], outdir, format = 'hdf5', jobs = 1)
+    assert stats[0]['status'] == 'done'
+
+    output = os.path.join(outdir, 'all-reprcodes.dlis.h5')
+    with h5py.File(output, 'r') as h5:
+        for name, curves in expected(reprcodes).items():
+            group = h5[name]
+            assert group.attrs['name'] == 'FRAME-REPRCODE'
+            assert group['CH01'].attrs['reprc'] == '1'
+            np.testing.assert_array_equal(group['CH01'][:], curves['CH01'])
+            np.testing.assert_array_equal(group['CH05'][:], curves['CH05'])
+
+            # validated values get an extra dimension of value and bounds
+            np.testing.assert_array_equal(group['CH04'][0], curves['CH04'][0])
+            assert group['CH19'].asstr()[0] == curves['CH19'][0]
+
+            dtime = curves['CH21'][0]
+            ms = group['CH21'][0]
+            assert group['CH21'].attrs['resolution'] == 'ms'
+            assert np.datetime64(int(ms), 'ms') == np.datetime64(dtime, 'ms')
+
+def test_convert_zarr(tmpdir):
+    zarr = pytest.importorskip('zarr')
+    outdir = str(tmpdir)
+
+    stats = convert.convert([multifdata], outdir, format = 'zarr', jobs = 1)
+    assert stats[0]['status'] == 'done'
+
+    output = os.path.join(outdir, 'multidimensions-multifdata.dlis.zarr')
+    root = zarr.open_group(output, mode = 'r')
+    for name, curves in expected(multifdata).items():
+        group = root[name]
+        attrs = group.attrs
+        assert name == '0/{}.{}.{}'.format(attrs['name'], attrs['origin'],
+                                           attrs['copynumber'])
+        for column in curves.dtype.names:
+            np.testing.assert_array_equal(group[column][:], curves[column])
+
+def test_convert_resume(tmpdir):
+    pytest.importorskip('pyarrow')
+    outdir = str(tmpdir)
+    src = str(tmpdir.mkdir('src'))
+    shutil.copy(multifdata, src)
+    shutil.copy(reprcodes, src)
+
+    stats = convert.convert([src], os.path.join(outdir, 'out'), jobs = 1)
+    assert len(stats) == 2
+
+    # Nothing has changed, so there is nothing to do
+    stats = convert.convert([src], os.path.join(outdir, 'out'), jobs = 1)
+    assert stats == []
+
+    os.utime(os.path.join(src, 'all-reprcodes.dlis'), (0, 0))
+    stats = convert.convert([src], os.path.join(outdir, 'out'), jobs = 1)
+    assert [os.path.basename(x['path']) for x in stats] == [
+        'all-reprcodes.dlis'
+    ]
+
+    stats = convert.convert([src], os.path.join(outdir, 'out'), jobs = 1,
+                            resume = False)
+    assert len(stats) == 2
+
+    manifest = os.path.join(outdir, 'out', 'manifest.jsonl')
+    with open(manifest) as f:
+        entries = [json.loads(line) for line in f]
+    assert len(entries) == 5
+    assert all(x['status'] == 'done' for x in entries)
+
+def test_convert_failed(tmpdir):
+    outdir = str(tmpdir)
+    src = str(tmpdir.mkdir('src'))
+    broken = os.path.join(src, 'broken.dlis')
+    with open(broken, 'wb') as f:
+        f.write(b'not a dlis file')
+
+    stats = convert.convert([src], outdir, format = 'zarr', jobs = 1)
+    assert stats[0]['status'] == 'failed'
+    assert 'error' in stats[0]
+    assert not os.path.exists(os.path.join(outdir, 'broken.dlis.zarr'))
+
+def test_convert_invalid_format(tmpdir):
+    with pytest.raises(ValueError):
+        convert.convert([reprcodes], str(tmpdir), format = 'csv')
+
+def test_convert_main(tmpdir, capsys):
+    pytest.importorskip('pyarrow')
+    outdir = str(tmpdir)
+
+    assert convert.main(['-o', outdir, '-j', '1', multifdata]) == 0
+    out = capsys.readouterr().out
+    assert 'multidimensions-multifdata.dlis' in out
+    assert 'converted 1 files, 0 failed' in out
@@ -3,6 +3,7 @@ Testing frame.curves() and channel.curves() functions and all the
 helper functionality
 """
 import pytest
+import sys
 import numpy as np
 from datetime import datetime
 
@@ -61,6 +62,289 @@ def test_curves_values(f):
     np.testing.assert_array_equal(curves['CHANN2'][2], val)
     np.testing.assert_array_equal(curves[2]['CHANN2'], val)
 
+def test_curves_since(f):
+    frame = f.object('FRAME', 'FRAME1', 10, 0)
+    curves = frame.curves()
+
+    new = frame.curves(since=1)
+    np.testing.assert_array_equal(new['FRAMENO'], [2, 3])
+    np.testing.assert_array_equal(new, curves[1:])
+
+    new = frame.curves(since=curves['FRAMENO'][-1])
+    assert len(new) == 0
+    assert new.dtype == curves.dtype
+
+    np.testing.assert_array_equal(frame.curves(since=0), curves)
+
+def test_curves_since_frames_in_same_iflr():
+    fpath = 'data/chap4-7/iflr/two-various-fdata-in-one-iflr.dlis'
+    with dlisio.load(fpath) as (f, *_):
+        frame = f.object('FRAME', 'FRAME-REPRCODE', 10, 0)
+        curves = frame.curves()
+
+        new = frame.curves(since=curves['FRAMENO'][0])
+        assert len(new) == 1
+        assert new[0][0] == curves[1][0]
+        assert new[0][2] == "SECOND-VALUE"
+
+def test_curves_workers(f):
+    frame = f.object('FRAME', 'FRAME1', 10, 0)
+    curves = frame.curves()
+
+    for workers in [2, 3, 8]:
+        np.testing.assert_array_equal(frame.curves(workers=workers), curves)
+
+    new = frame.curves(since=1, workers=2)
+    np.testing.assert_array_equal(new, curves[1:])
+
+    with pytest.raises(ValueError):
+        _ = frame.curves(workers=0)
+
+def test_curves_workers_objects():
+    # Frames with python objects are read serially
+    fpath = 'data/chap4-7/iflr/two-various-fdata-in-one-iflr.dlis'
+    with dlisio.load(fpath) as (f, *_):
+        frame = f.object('FRAME', 'FRAME-REPRCODE', 10, 0)
+        curves = frame.curves(workers=4)
+        assert curves[1][2] == "SECOND-VALUE"
+
+@pytest.mark.parametrize('workers', [1, 2])
+def test_curves_progress(f, workers):
+    frame = f.object('FRAME', 'FRAME1', 10, 0)
+    calls = []
+    def progress(stage, done, total):
+        calls.append((stage, done, total))
+
+    curves = frame.curves(workers=workers, progress=progress)
+    np.testing.assert_array_equal(curves, frame.curves())
+
+    nrecords = len(f.fdata_index[frame.fingerprint])
+    assert calls[-1] == ('read_fdata', nrecords, nrecords)
+    assert all(done <= total for _, done, total in calls)
+
+@pytest.mark.parametrize('workers', [1, 2])
+def test_curves_progress_cancel(f, workers):
+    frame = f.object('FRAME', 'FRAME1', 10, 0)
+    with pytest.raises(core.cancelled):
+        _ = frame.curves(workers=workers, progress=lambda *_: False)
+
+    class Abandoned(Exception): pass
+    def progress(stage, done, total):
+        raise Abandoned()
+
+    with pytest.raises(Abandoned):
+        _ = frame.curves(workers=workers, progress=progress)
+
+    # The frame can still be read after a cancelled read
+    assert len(frame.curves(workers=workers)) == 3
+
+@pytest.mark.parametrize('workers', [1, 2])
+def test_curves_columns(f, workers):
+    frame = f.object('FRAME', 'FRAME1', 10, 0)
+    curves = frame.curves()
+    columns = frame.curves(layout='columns', workers=workers)
+
+    assert list(columns.keys()) == list(curves.dtype.names)
+    for name, column in columns.items():
+        assert column.flags['C_CONTIGUOUS']
+        assert column.flags['OWNDATA']
+        assert column.shape == curves[name].shape
+        np.testing.assert_array_equal(column, curves[name])
+
+    new = frame.curves(since=1, layout='columns', workers=workers)
+    np.testing.assert_array_equal(new['FRAMENO'], [2, 3])
+    np.testing.assert_array_equal(new['CHANN2'], curves['CHANN2'][1:])
+
+def test_curves_columns_objects():
+    fpath = 'data/chap4-7/iflr/two-various-fdata-in-one-iflr.dlis'
+    with dlisio.load(fpath) as (f, *_):
+        frame = f.object('FRAME', 'FRAME-REPRCODE', 10, 0)
+        curves = frame.curves()
+        columns = frame.curves(layout='columns')
+
+    for name in curves.dtype.names:
+        assert list(columns[name]) == list(curves[name])
+    assert columns[curves.dtype.names[2]][1] == "SECOND-VALUE"
+
+def test_curves_invalid_layout(f):
+    frame = f.object('FRAME', 'FRAME1', 10, 0)
+    with pytest.raises(ValueError):
+        _ = frame.curves(layout='diagonal')
+
+@pytest.mark.parametrize('workers', [1, 2])
+def test_curves_out(f, workers):
+    frame = f.object('FRAME', 'FRAME1', 10, 0)
+    expected = frame.curves()
+
+    out = np.zeros(10, dtype=frame.dtype())
+    curves = frame.curves(workers=workers, out=out)
+    assert curves.base is out
+    np.testing.assert_array_equal(curves, expected)
+    np.testing.assert_array_equal(out[:3], expected)
+    assert (out[3:] == np.zeros(1, dtype=out.dtype)).all()
+
+    new = frame.curves(since=1, workers=workers, out=out[5:])
+    np.testing.assert_array_equal(new, expected[1:])
+    np.testing.assert_array_equal(out[5:7], expected[1:])
+
+def test_curves_out_columns(f):
+    frame = f.object('FRAME', 'FRAME1', 10, 0)
+    expected = frame.curves(layout='columns')
+
+    out = {
+        name : np.empty((4,) + column.shape[1:], dtype=column.dtype)
+        for name, column in expected.items()
+    }
+    columns = frame.curves(layout='columns', out=out)
+    for name, column in columns.items():
+        assert column.base is out[name]
+        np.testing.assert_array_equal(column, expected[name])
+
+    del out['CHANN2']
+    with pytest.raises(ValueError) as exc:
+        _ = frame.curves(layout='columns', out=out)
+    assert 'CHANN2' in str(exc.value)
+
+def test_curves_out_memmap(f, tmpdir):
+    frame = f.object('FRAME', 'FRAME1', 10, 0)
+    path = str(tmpdir.join('curves.bin'))
+    out = np.memmap(path, dtype=frame.dtype(), mode='w+', shape=3)
+    curves = frame.curves(out=out)
+    out.flush()
+
+    readback = np.memmap(path, dtype=frame.dtype(), mode='r')
+    np.testing.assert_array_equal(readback, frame.curves())
+    np.testing.assert_array_equal(curves, readback)
+
+@pytest.mark.parametrize('workers', [1, 2])
+def test_curves_out_too_small(f, workers):
+    frame = f.object('FRAME', 'FRAME1', 10, 0)
+    out = np.empty(2, dtype=frame.dtype())
+    with pytest.raises(ValueError) as exc:
+        _ = frame.curves(workers=workers, out=out)
+    assert 'room for 2 rows' in str(exc.value)
+
+def test_curves_out_invalid(f):
+    frame = f.object('FRAME', 'FRAME1', 10, 0)
+    dtype = frame.dtype()
+
+    with pytest.raises(TypeError):
+        _ = frame.curves(out=bytearray(1000))
+
+    with pytest.raises(ValueError):
+        _ = frame.curves(out=np.empty(3, dtype=np.float64))
+
+    with pytest.raises(ValueError):
+        _ = frame.curves(out=np.empty(6, dtype=dtype)[::2])
+
+    out = np.empty(3, dtype=dtype)
+    out.flags.writeable = False
+    with pytest.raises(ValueError):
+        _ = frame.curves(out=out)
+
+def test_curves_out_objects():
+    fpath = 'data/chap4-7/iflr/two-various-fdata-in-one-iflr.dlis'
+    with dlisio.load(fpath) as (f, *_):
+        frame = f.object('FRAME', 'FRAME-REPRCODE', 10, 0)
+        out = np.empty(2, dtype=frame.dtype())
+        curves = frame.curves(out=out)
+        assert curves[1][2] == "SECOND-VALUE"
+        assert out[1][2] == "SECOND-VALUE"
+
+def test_nrows(f):
+    for frame in f.frames:
+        assert frame.nrows() == len(frame.curves())
+
+    # Records with more than one frame
+    fpath = 'data/chap4-7/iflr/multidimensions-multifdata.dlis'
+    with dlisio.load(fpath) as (f, *_):
+        for frame in f.frames:
+            nrecords = len(f.fdata_index.get(frame.fingerprint, []))
+            assert frame.nrows() == len(frame.curves())
+            assert frame.nrows() > nrecords
+
+def test_nrows_progress(f):
+    frame = f.object('FRAME', 'FRAME1', 10, 0)
+    calls = []
+    def progress(stage, done, total):
+        calls.append((stage, done, total))
+
+    assert frame.nrows(progress=progress) == 3
+    nrecords = len(f.fdata_index[frame.fingerprint])
+    assert calls[-1] == ('count_frames', nrecords, nrecords)
+
+    with pytest.raises(core.cancelled):
+        _ = frame.nrows(progress=lambda *_: False)
+
+@pytest.mark.parametrize('workers', [1, 2])
+def test_curves_out_exact(f, tmpdir, workers):
+    frame = f.object('FRAME', 'FRAME1', 10, 0)
+    path = str(tmpdir.join('curves.npy'))
+    out = np.lib.format.open_memmap(path, mode='w+', dtype=frame.dtype(),
+                                    shape=(frame.nrows(),))
+    curves = frame.curves(out=out, workers=workers)
+    assert len(curves) == len(out)
+    out.flush()
+    del curves, out
+
+    np.testing.assert_array_equal(np.load(path), frame.curves())
+
+def test_to_arrow(f):
+    pa = pytest.importorskip('pyarrow')
+    frame = f.object('FRAME', 'FRAME1', 10, 0)
+    curves = frame.curves()
+    table = frame.to_arrow()
+
+    assert table.column_names == list(curves.dtype.names)
+    assert table.num_rows == len(curves)
+    assert table.schema.field('FRAMENO').type == pa.int32()
+
+    for name in curves.dtype.names:
+        values = table.column(name).to_pylist()
+        np.testing.assert_array_equal(np.array(values), curves[name])
+
+    field = table.schema.field('CHANN1')
+    assert field.type == pa.list_(pa.list_(pa.list_(pa.uint16(), 2), 3), 4)
+    assert field.metadata[b'name'] == b'CHANN1'
+    assert table.schema.metadata[b'name'] == b'FRAME1'
+
+    table = frame.to_arrow(metadata=False)
+    assert table.schema.metadata is None
+    assert table.schema.field('CHANN1').metadata is None
+
+def test_to_arrow_reprcodes():
+    pa = pytest.importorskip('pyarrow')
+    fpath = 'data/chap4-7/iflr/all-reprcodes.dlis'
+    with dlisio.load(fpath) as (f, *_):
+        frame = f.object('FRAME', 'FRAME-REPRCODE', 10, 0)
+        row = frame.to_arrow().to_pylist()[0]
+
+    assert row['CH01'] == -1
+    assert row['CH04'] == [117, -13.25, 32444]
+    assert row['CH08'] == [-13.5, -27670]
+    assert row['CH10'] == [93, -14]
+    assert row['CH19'] == 'VALUE'
+    assert row['CH20'] == 'ASCII VALUE'
+    assert row['CH21'] == datetime(1971, 3, 21, 18, 4, 14, 386000)
+    assert row['CH23'] == { 'origin': 18, 'copynumber': 5, 'id': 'OBNAME_I' }
+    assert row['CH24'] == {
+        'type': 'OBJREF_I',
+        'name': { 'origin': 25, 'copynumber': 3, 'id': 'OBJREF_OBNAME' },
+    }
+    assert row['CH25'] == {
+        'type': 'FIRST_INDENT',
+        'name': { 'origin': 3, 'copynumber': 2, 'id': 'ATTREF_OBNAME' },
+        'label': 'SECOND_INDENT',
+    }
+    assert row['CH26'] == True
+    assert row['CH27'] == 'unit'
+
+def test_to_arrow_without_pyarrow(f, monkeypatch):
+    monkeypatch.setitem(sys.modules, 'pyarrow', None)
+    frame = f.object('FRAME', 'FRAME1', 10, 0)
+    with pytest.raises(ImportError):
+        _ = frame.to_arrow()
+
 def test_two_various_fdata_in_one_iflr():
     fpath = 'data/chap4-7/iflr/two-various-fdata-in-one-iflr.dlis'
 
@@ -269,6 +553,27 @@ def test_dtype_fmt_instance():
         expected_names = ('FRAMENO', 'x-TIME 0~0', 'TDEP', 'x-TIME 1~0')
         assert expected_names == frame.dtype().names
 
+def test_dtype_memoized():
+    fpath = "data/chap4-7/eflr/frames-and-channels/mainframe.dlis"
+    with dlisio.load(fpath) as (f, *_):
+        frame = f.object("FRAME", "MAINFRAME")
+
+        dtype = frame.dtype()
+        assert frame.dtype() is dtype
+        assert frame.fmtstr() is frame.fmtstr()
+
+        # dtype is memoized per dtype_fmt
+        frame.dtype_fmt = 'x-{:s} {:d}~{:d}'
+        expected_names = ('FRAMENO', 'x-TIME 0~0', 'TDEP', 'x-TIME 1~0')
+        assert expected_names == frame.dtype().names
+
+        frame.dtype_fmt = frame.dtype_format
+        assert frame.dtype() is dtype
+
+        frame.clear_cache()
+        assert frame.dtype() is not dtype
+        assert frame.dtype() == dtype
+
 def test_dtype_fmt_class():
     original = dlisio.plumbing.Frame.dtype_format
 
@@ -49,6 +49,15 @@ def test_sampling_array_dims():
     assert np.array_equal(samples[0][1], np.array(raw[2:4]))
     assert np.array_equal(samples[0][2], np.array(raw[4:6]))
 
+def test_sampling_ndarray_no_copy():
+    raw = np.arange(12, dtype=np.float32)
+    dimensions = [2, 3]
+
+    samples = sampling(raw, dimensions)
+    assert samples.dtype.base == np.float32
+    assert np.array_equal(samples[1][0], np.array([6, 7, 8]))
+    assert np.shares_memory(samples, raw)
+
 def test_sampling_single(assert_log):
     raw = [1, 2]
     dimensions = [2]
@@ -85,3 +85,46 @@ def test_record_attributes():
 
     stream.close()
 
+
+def test_decode_array():
+    core = dlisio.core
+    buffer = bytes([0x40, 0x49, 0x0F, 0xDB, 0xC2, 0x99, 0x00, 0x00])
+
+    values = core.decode_array(core.reprc.fsingl, buffer, 2)
+    assert values.dtype == np.float32
+    assert values[0] == pytest.approx(3.1415927)
+    assert values[1] == -76.5
+
+    values = core.decode_array(core.reprc.isingl, buffer[4:], 1)
+    assert values.dtype == np.float32
+    assert values[0] == -153.0
+
+    values = core.decode_array(core.reprc.unorm, buffer, 4)
+    assert values.dtype == np.uint16
+    assert list(values) == [0x4049, 0x0FDB, 0xC299, 0]
+
+    values = core.decode_array(core.reprc.fsing1, buffer, 1)
+    assert values.shape == (1, 2)
+    assert values[0, 1] == -76.5
+
+    values = core.decode_array(core.reprc.csingl, buffer, 1)
+    assert values.dtype == np.complex64
+    assert values[0].imag == -76.5
+
+    # the representation code can also be given as an int
+    values = core.decode_array(13, buffer, 1)
+    assert values.dtype == np.int16
+    assert values[0] == 0x4049
+
+    assert len(core.decode_array(core.reprc.fsingl, buffer, 0)) == 0
+
+def test_decode_array_invalid_argument():
+    core = dlisio.core
+    buffer = bytes(8)
+
+    with pytest.raises(ValueError):
+        _ = core.decode_array(core.reprc.fsingl, buffer, 3)
+    with pytest.raises(ValueError):
+        _ = core.decode_array(core.reprc.ident, buffer, 1)
+    with pytest.raises(ValueError):
+        _ = core.decode_array(core.reprc.fsingl, buffer, -1)
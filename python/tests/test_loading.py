@@ -3,7 +3,11 @@ Testing general loading functionality
 """
 
 import pytest
+import numpy as np
 
+import concurrent.futures
+import gzip
+import pickle # nosec
 import shutil
 import os
 
@@ -136,6 +140,325 @@ def test_context_manager_with():
         for g in files:
             _ = g.fileheader
 
+def test_iterload():
+    path = 'data/chap4-7/many-logical-files.dlis'
+    # The first logical file has no file header
+    with dlisio.load(path) as batch:
+        expected = [repr(f.fileheader) for f in batch]
+
+    headers = []
+    for f in dlisio.iterload(path):
+        with f:
+            headers.append(repr(f.fileheader))
+
+    assert headers == expected
+
+def test_iterload_early_termination(tmpdir):
+    # The generator must not hold on to any file handles once it's closed, see
+    # test_filehandles_closed
+    many_logical = str(tmpdir.join('many_logical'))
+    shutil.copyfile('data/chap4-7/many-logical-files.dlis', many_logical)
+
+    procfd = os.path.isdir('/proc/self/fd')
+    if procfd: before = len(os.listdir('/proc/self/fd'))
+
+    lfs = dlisio.iterload(many_logical)
+    with next(lfs) as f:
+        _ = f.fileheader
+    lfs.close()
+
+    if procfd: assert len(os.listdir('/proc/self/fd')) == before
+    os.remove(many_logical)
+
+def test_iterload_error_in_last_lf():
+    path = 'data/chap4-7/many-logical-files-error-in-last.dlis'
+    lfs = dlisio.iterload(path)
+
+    # The logical files before the broken one are still usable
+    with next(lfs) as f:
+        _ = f.fileheader
+
+    with pytest.raises(RuntimeError):
+        for f in lfs:
+            f.close()
+
+@pytest.mark.skipif(not os.path.isdir('/proc/self/fd'),
+                    reason = "requires /proc/self/fd")
+def test_logical_files_share_filehandle():
+    path = 'data/chap4-7/many-logical-files.dlis'
+    before = len(os.listdir('/proc/self/fd'))
+    with dlisio.load(path) as batch:
+        assert len(batch) == 3
+        assert len(os.listdir('/proc/self/fd')) == before + 1
+
+    assert len(os.listdir('/proc/self/fd')) == before
+
+def test_handlepool(fpath):
+    pool = dlisio.core.handlepool(maxopen = 1)
+    assert pool.maxopen == 1
+
+    with dlisio.load(fpath, handlepool = pool) as (f, *_):
+        frame = f.object('FRAME', 'FRAME1', 10, 0)
+        expected = frame.curves()
+
+        path = 'data/chap4-7/many-logical-files.dlis'
+        with dlisio.load(path, handlepool = pool) as batch:
+            assert len(batch) == 3
+            assert len(pool) == 1
+
+            # Loading the second file pushed the first one out of the pool,
+            # but it is transparently re-opened when read from
+            assert (frame.curves() == expected).all()
+            assert len(pool) == 1
+
+    assert len(pool) == 0
+
+def test_handlepool_invalid_maxopen():
+    with pytest.raises(ValueError):
+        _ = dlisio.core.handlepool(maxopen = 0)
+
+@pytest.mark.parametrize('wrap', [bytes, bytearray, memoryview])
+def test_load_from_memory(wrap):
+    path = 'data/chap4-7/many-logical-files.dlis'
+    with dlisio.load(path) as batch:
+        expected = [repr(f.fileheader) for f in batch]
+
+    with open(path, 'rb') as fd:
+        blob = wrap(fd.read())
+
+    with dlisio.load(blob) as batch:
+        assert [repr(f.fileheader) for f in batch] == expected
+
+def test_load_from_file_object(fpath):
+    with dlisio.load(fpath) as (f, *_):
+        frame = f.object('FRAME', 'FRAME1', 10, 0)
+        expected = frame.curves()
+
+    with open(fpath, 'rb') as fd:
+        with dlisio.load(fd) as (f, *_):
+            frame = f.object('FRAME', 'FRAME1', 10, 0)
+            assert (frame.curves() == expected).all()
+
+def test_file_object_reads_are_cached():
+    path = 'data/206_05a-_3_DWL_DWL_WIRE_258276498.DLIS'
+    with open(path, 'rb') as fd:
+        pyfile = dlisio.core.pyfilehandle(fd)
+        handle = dlisio.core.cachedhandle(pyfile)
+        stream = handle.open()
+        try:
+            for offset in range(0, 4096, 4):
+                _ = stream.get(bytearray(4), offset, 4)
+        finally:
+            stream.close()
+
+        assert handle.reads == 1024
+        assert pyfile.reads == 1
+
+def compress(src, dst):
+    with open(src, 'rb') as f, gzip.open(dst, 'wb') as g:
+        shutil.copyfileobj(f, g)
+    return dst
+
+def test_load_gzip(tmpdir):
+    path = 'data/chap4-7/many-logical-files.dlis'
+    gzpath = compress(path, str(tmpdir.join('many-logical-files.dlis.gz')))
+
+    with dlisio.load(path) as batch:
+        expected = [repr(f.fileheader) for f in batch]
+
+    with dlisio.load(gzpath) as batch:
+        assert [repr(f.fileheader) for f in batch] == expected
+
+    with open(gzpath, 'rb') as fd:
+        with dlisio.load(fd.read()) as batch:
+            assert [repr(f.fileheader) for f in batch] == expected
+
+def test_load_gzip_curves(fpath, tmpdir):
+    with dlisio.load(fpath) as (f, *_):
+        frame = f.object('FRAME', 'FRAME1', 10, 0)
+        expected = frame.curves()
+
+    gzpath = compress(fpath, str(tmpdir.join('semantic.dlis.gz')))
+    with dlisio.load(gzpath) as (f, *_):
+        frame = f.object('FRAME', 'FRAME1', 10, 0)
+        assert (frame.curves() == expected).all()
+
+def test_gzip_index(tmpdir):
+    path = 'data/206_05a-_3_DWL_DWL_WIRE_258276498.DLIS'
+    gzpath = compress(path, str(tmpdir.join('206.dlis.gz')))
+
+    gz = dlisio.core.gziphandle(dlisio.core.filehandle(gzpath), spacing = 4096)
+    assert len(gz) == os.path.getsize(path)
+    assert gz.checkpoints > 1
+    index = gz.index
+
+    # With a stored index, the file is not read until it's used
+    src = dlisio.core.filehandle(gzpath)
+    reloaded = dlisio.core.gziphandle(src, index)
+    assert src.reads == 0
+    assert len(reloaded) == len(gz)
+    assert reloaded.index == index
+
+    with dlisio.load(path) as (f,):
+        expected = len(f.channels)
+
+    with dlisio.load(reloaded) as (f,):
+        assert len(f.channels) == expected
+
+def test_gzip_invalid_index():
+    src = dlisio.core.memoryhandle(b'')
+    with pytest.raises(ValueError):
+        _ = dlisio.core.gziphandle(src, b'not an index')
+
+def test_pickle_logical_file(fpath):
+    with dlisio.load(fpath) as (f, *_):
+        expected = f.object('FRAME', 'FRAME1', 10, 0).curves()
+
+        with pickle.loads(pickle.dumps(f)) as g: # nosec
+            assert g.fdata_index == f.fdata_index
+            assert g.fileheader.id == f.fileheader.id
+            assert len(g.channels) == len(f.channels)
+
+            frame = g.object('FRAME', 'FRAME1', 10, 0)
+            assert (frame.curves() == expected).all()
+
+def test_pickle_objects(f):
+    frame = f.object('FRAME', 'FRAME1', 10, 0)
+    channel = f.object('CHANNEL', 'CHANN1', 10, 0)
+
+    frame2, channel2 = pickle.loads(pickle.dumps([frame, channel])) # nosec
+    with frame2.logicalfile:
+        # Objects in the same pickle share the logical file
+        assert channel2.logicalfile is frame2.logicalfile
+        assert frame2.fingerprint == frame.fingerprint
+        assert channel2.fingerprint == channel.fingerprint
+        assert (frame2.curves() == frame.curves()).all()
+        assert (channel2.curves() == channel.curves()).all()
+
+def test_pickle_gzip(fpath, tmpdir):
+    gzpath = compress(fpath, str(tmpdir.join('semantic.dlis.gz')))
+    with dlisio.load(gzpath) as (f, *_):
+        frame = f.object('FRAME', 'FRAME1', 10, 0)
+        with pickle.loads(pickle.dumps(frame)).logicalfile as g: # nosec
+            unpickled = g.object('FRAME', 'FRAME1', 10, 0)
+            assert (unpickled.curves() == frame.curves()).all()
+
+def readcurves(obj):
+    with obj.logicalfile:
+        return obj.curves()
+
+def test_pickle_process_pool(f):
+    channels = f.object('FRAME', 'FRAME1', 10, 0).channels
+    expected = [x.curves() for x in channels]
+
+    with concurrent.futures.ProcessPoolExecutor(2) as pool:
+        curves = list(pool.map(readcurves, channels))
+
+    assert len(curves) == len(expected)
+    for x, y in zip(curves, expected):
+        np.testing.assert_array_equal(x, y)
+
+def test_pickle_closed_fails(fpath):
+    with dlisio.load(fpath) as (f, *_):
+        pass
+
+    with pytest.raises(ValueError):
+        _ = pickle.dumps(f)
+
+def test_pickle_from_memory_fails(fpath):
+    with open(fpath, 'rb') as fd:
+        blob = fd.read()
+
+    with dlisio.load(blob) as (f, *_):
+        with pytest.raises(TypeError) as exc:
+            _ = pickle.dumps(f)
+        assert 'loaded from a path' in str(exc.value)
+
+        with pytest.raises(TypeError):
+            _ = pickle.dumps(f.object('FRAME', 'FRAME1', 10, 0))
+
+def test_stats(fpath):
+    with dlisio.stats() as s:
+        with dlisio.load(fpath) as (f, *_):
+            frame = f.object('FRAME', 'FRAME1', 10, 0)
+            curves = frame.curves()
+
+    stages = ['findvrl', 'findoffsets', 'extract', 'parse_objects', 'pool',
+              'findfdata', 'promote', 'read_fdata']
+    for stage in stages:
+        assert s.calls[stage] >= 1
+        assert s.timings[stage] >= 0
+
+    assert s.counters['rows_decoded'] == len(curves)
+    assert s.counters['bytes_read'] > 0
+    assert s.counters['reads'] > 0
+    assert s.counters['seeks'] > 0
+    assert s.counters['records_scanned'] > 0
+    assert s.counters['records_extracted'] > 0
+    assert s.counters['objects_created'] > 0
+
+    flat = s.asdict()
+    assert flat['counters.rows_decoded'] == len(curves)
+    assert flat['calls.read_fdata'] == 1
+
+def test_stats_off_by_default(fpath):
+    before = dlisio.core.counters()
+    with dlisio.load(fpath) as (f, *_):
+        _ = f.object('FRAME', 'FRAME1', 10, 0).curves()
+
+    assert dlisio.core.counters() == before
+
+def test_stats_nested(fpath):
+    with dlisio.stats() as outer:
+        with dlisio.load(fpath):
+            pass
+
+        with dlisio.stats() as inner:
+            with dlisio.load(fpath) as (f, *_):
+                _ = f.object('FRAME', 'FRAME1', 10, 0).curves()
+
+    assert inner.counters['rows_decoded'] == outer.counters['rows_decoded']
+    assert outer.calls['findoffsets'] == 2 * inner.calls['findoffsets']
+    assert 'read_fdata' in inner.timings
+    assert outer.counters['bytes_read'] > inner.counters['bytes_read']
+
+def test_load_progress(fpath):
+    calls = []
+    def progress(stage, done, total):
+        calls.append((stage, done, total))
+
+    with dlisio.load(fpath, progress=progress) as (f, *_):
+        nrecords = sum(len(x) for x in f.fdata_index.values())
+
+    stage, done, total = calls[0]
+    assert stage == 'findoffsets'
+    assert total == os.path.getsize(fpath)
+    assert 0 < done <= total
+    assert calls[-1] == ('findfdata', nrecords, nrecords)
+
+def test_load_progress_unknown_size(fpath):
+    calls = []
+    def progress(stage, done, total):
+        calls.append((stage, done, total))
+
+    with open(fpath, 'rb') as fd:
+        with dlisio.load(fd, progress=progress):
+            pass
+
+    stage, done, total = calls[0]
+    assert stage == 'findoffsets'
+    assert total is None
+
+def test_load_progress_cancel(fpath):
+    with pytest.raises(dlisio.core.cancelled):
+        _ = dlisio.load(fpath, progress=lambda *_: False)
+
+    def progress(stage, done, total):
+        if stage == 'findfdata': raise KeyboardInterrupt
+
+    with pytest.raises(KeyboardInterrupt):
+        _ = dlisio.load(fpath, progress=progress)
+
 def test_load_nonexisting_file():
     with pytest.raises(OSError) as exc:
         _ = dlisio.load("this_file_does_not_exist.dlis")
@@ -4,6 +4,7 @@ Testing Logical file class (also known as dlis)
 
 import dlisio
 import pytest
+import numpy as np
 
 from dlisio.plumbing.channel import Channel
 from dlisio.plumbing.frame import Frame
@@ -218,6 +219,15 @@ def test_dlis_types(f):
     assert len(f.comments)     == 1
     assert len(f.messages)     == 1
 
+def test_count(f):
+    assert f.count('CHANNEL')  == len(f.channels)
+    assert f.count('FRAME')    == len(f.frames)
+    assert f.count('NOTYPE')   == 0
+
+    counts = f.object_pool.counts
+    for objtype in f.object_pool.types:
+        assert counts[objtype] == len(f[objtype])
+
 def test_load_unknowns():
     with dlisio.load('data/206_05a-_3_DWL_DWL_WIRE_258276498.DLIS') as (f,):
         assert len(f.unknowns) == 5
@@ -236,3 +246,98 @@ def test_unknowns_multiple_sets(tmpdir_factory, merge_files_manyLR):
 
     with dlisio.load(fpath) as (f, *_):
         assert len(f.unknowns['UNKNOWN_SET']) == 2
+        assert f.count('UNKNOWN_SET') == 2
+
+def visible_record(*parts):
+    body = b''.join(open(part, 'rb').read() for part in parts)
+    vrl = len(body) + 4
+    return bytes([vrl // 256, vrl % 256, 0xFF, 0x01]) + body
+
+@pytest.fixture
+def growing(tmpdir, merge_files_manyLR):
+    fpath = str(tmpdir.join('growing.dlis'))
+    content = [
+        'data/chap4-7/eflr/envelope.dlis.part',
+        'data/chap4-7/eflr/file-header.dlis.part',
+        'data/chap4-7/eflr/origin.dlis.part',
+        'data/chap4-7/eflr/channel.dlis.part',
+        'data/chap4-7/eflr/frame.dlis.part',
+        'data/chap4-7/eflr/fdata-frame1-1.dlis.part',
+    ]
+    merge_files_manyLR(fpath, content)
+    return fpath
+
+def test_refresh(growing):
+    vr = visible_record(
+        'data/chap4-7/eflr/fdata-frame1-2.dlis.part',
+        'data/chap4-7/eflr/fdata-frame1-3.dlis.part',
+    )
+
+    with dlisio.load(growing) as (f,):
+        frame = f.object('FRAME', 'FRAME1', 10, 0)
+        curves = frame.curves()
+        np.testing.assert_array_equal(curves['FRAMENO'], [1])
+        assert f.refresh() == 0
+
+        # The visible record is still being written
+        with open(growing, 'ab') as fd:
+            fd.write(vr[:50])
+        assert f.refresh() == 0
+        assert len(frame.curves()) == 1
+
+        with open(growing, 'ab') as fd:
+            fd.write(vr[50:])
+        assert f.refresh() == 2
+
+        new = frame.curves(since=curves['FRAMENO'][-1])
+        np.testing.assert_array_equal(new['FRAMENO'], [2, 3])
+        np.testing.assert_array_equal(frame.curves()[:1], curves)
+
+def test_refresh_new_objects(growing):
+    with dlisio.load(growing) as (f,):
+        assert len(f.tools) == 0
+
+        with open(growing, 'ab') as fd:
+            fd.write(visible_record('data/chap4-7/eflr/tool.dlis.part'))
+        assert f.refresh() == 1
+        assert len(f.tools) == 1
+        assert len(f.channels) == 4
+
+def test_refresh_linkage(tmpdir, merge_files_manyLR):
+    # Linkage memoized before the refresh is looked up again after it
+    fpath = str(tmpdir.join('growing.dlis'))
+    content = [
+        'data/chap4-7/eflr/envelope.dlis.part',
+        'data/chap4-7/eflr/file-header.dlis.part',
+        'data/chap4-7/eflr/origin.dlis.part',
+        'data/chap4-7/eflr/frame.dlis.part',
+    ]
+    merge_files_manyLR(fpath, content)
+
+    with dlisio.load(fpath) as (f,):
+        frame = f.object('FRAME', 'FRAME1', 10, 0)
+        assert frame.channels == [None, None]
+
+        with open(fpath, 'ab') as fd:
+            fd.write(visible_record('data/chap4-7/eflr/channel.dlis.part'))
+        assert f.refresh() == 1
+
+        channels = [ch.name for ch in frame.channels]
+        assert channels == ['CHANN1', 'CHANN2']
+
+def test_refresh_next_logical_file(growing):
+    with dlisio.load(growing) as (f,):
+        with open(growing, 'ab') as fd:
+            fd.write(visible_record(
+                'data/chap4-7/eflr/fdata-frame1-2.dlis.part'
+            ))
+            fd.write(visible_record(
+                'data/chap4-7/eflr/file-header.dlis.part',
+                'data/chap4-7/eflr/fdata-frame1-3.dlis.part',
+            ))
+
+        # Records after the next FILE-HEADER belong to the next logical file
+        assert f.refresh() == 1
+        assert f.refresh() == 0
+        frame = f.object('FRAME', 'FRAME1', 10, 0)
+        np.testing.assert_array_equal(frame.curves()['FRAMENO'], [1, 2])
@@ -121,6 +121,19 @@ def test_attribute_change_in_instance():
     # check that other object of the same type is not affected
     assert ch2.properties == [10]
 
+def test_attribute_change_in_instance_reset():
+    ch = Channel()
+    ch.attic['PROPERTIES'] = Attr([10])
+
+    ch.attributes = dict(ch.attributes)
+    ch.attributes['PROPERTIES'] = valuetypes.scalar
+    assert ch.properties == 10
+
+    # Removing the instance override falls back to the class' rules
+    del ch.attributes
+    assert ch.attributes is Channel.attributes
+    assert ch.properties == [10]
+
 def test_attribute_change_in_class():
     ch1 = Channel()
     ch1.attic['PROPERTIES'] = Attr([10])
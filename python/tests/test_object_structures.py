@@ -161,6 +161,30 @@ def test_parameter(f):
     value = p.values[0]
     assert np.array_equal(value, np.array([101, 120]))
 
+def test_attribute_array(f):
+    p = f.object('PARAMETER', 'PARAM3', 10, 0)
+
+    values = p.attic['VALUES']
+    assert isinstance(values.array, np.ndarray)
+    assert np.array_equal(values.array, np.array(values.values))
+
+    dimension = p.attic['DIMENSION']
+    assert dimension.array.dtype == np.int32
+    assert np.array_equal(dimension.array, np.array([3, 2]))
+
+    # Non-numeric values have no array representation
+    assert p.attic['LONG-NAME'].array is None
+    assert p.attic['ZONES'].array is None
+
+def test_values_dtype(f):
+    # The values keep the dtype of the representation code, USHORT here, and
+    # are widened explicitly for arithmetic that does not fit
+    p = f.object('PARAMETER', 'PARAM1', 10, 0)
+    assert p.values.dtype == np.uint8
+    assert p.values.dtype == p.attic['VALUES'].array.dtype
+    widened = p.values.astype(np.int64)
+    assert np.array_equal(widened[0] * 3, np.array([303, 360]))
+
 def test_equipment(f):
     e = f.object('EQUIPMENT', 'EQUIP1', 10, 0)
     assert e.trademark_name == "some equipment"
@@ -244,10 +268,11 @@ def test_coefficient(f):
     c = f.object('CALIBRATION-COEFFICIENT', 'COEFF1', 10, 0)
 
     assert c.label           == "GAIN"
-    assert c.coefficients    == [18, 25]
-    assert c.references      == [18, 32]
-    assert c.plus_tolerance  == [1, 1]
-    assert c.minus_tolerance == [2, 1]
+    assert isinstance(c.coefficients, np.ndarray)
+    assert np.array_equal(c.coefficients,    [18, 25])
+    assert np.array_equal(c.references,      [18, 32])
+    assert np.array_equal(c.plus_tolerance,  [1, 1])
+    assert np.array_equal(c.minus_tolerance, [2, 1])
 
 def test_calibration(f):
     param1   = f.object('PARAMETER', 'PARAM1', 10, 0)
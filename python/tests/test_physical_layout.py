@@ -212,3 +212,48 @@ def test_load_missing_sul():
     with dlisio.load('data/chap2/missing-sul.dlis') as files:
         for f in files:
             assert f.storage_label() is None
+
+def test_rp66_indexed():
+    # Random access through the index of visible records gives the same
+    # records as going through lfp's rp66
+    path = 'data/206_05a-_3_DWL_DWL_WIRE_258276498.DLIS'
+    stream = core.open(path)
+    offset = core.findvrl(stream, 80)
+    stream.seek(offset)
+    stream = core.open_rp66(stream)
+
+    try:
+        explicits, implicits = core.findoffsets(stream)
+        size = stream.tell
+        tells = sorted(explicits + implicits, reverse = True)
+        expected = [bytes(rec) for rec in core.extract(stream, tells)]
+    finally:
+        stream.close()
+
+    stream = core.open_rp66_indexed(core.open(path, offset), size)
+    try:
+        records = [bytes(rec) for rec in core.extract(stream, tells)]
+        assert records == expected
+    finally:
+        stream.close()
+
+def test_findoffsets_readahead():
+    # The logical record segment headers are served from a read-ahead buffer,
+    # rather than read from the file one by one
+    path = 'data/206_05a-_3_DWL_DWL_WIRE_258276498.DLIS'
+    handle = core.filehandle(path)
+    stream = handle.open()
+    offset = core.findvrl(stream, 80)
+    stream.seek(offset)
+    stream = core.open_rp66(stream)
+
+    try:
+        before = handle.reads
+        explicits, implicits = core.findoffsets(stream)
+        reads = handle.reads - before
+    finally:
+        stream.close()
+
+    assert len(explicits) == 30
+    assert len(implicits) == 3222
+    assert reads < 10
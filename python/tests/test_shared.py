@@ -0,0 +1,113 @@
+"""
+Testing dlisio.shared, reading curves into shared memory with process pools
+"""
+import pytest
+import numpy as np
+
+# multiprocessing.shared_memory was added in python 3.8
+shared_memory = pytest.importorskip('multiprocessing.shared_memory')
+
+import dlisio
+from dlisio import shared
+
+multifdata = 'data/chap4-7/iflr/multidimensions-multifdata.dlis'
+
+def test_partition(f):
+    frame = f.object('FRAME', 'FRAME1', 10, 0)
+    curves = frame.curves()
+    nrecords = len(f.fdata_index[frame.fingerprint])
+
+    parts = shared.partition(frame, 2)
+    assert len(parts) == 2
+    assert parts[0].records.start == 0
+    assert parts[-1].records.stop == nrecords
+    assert parts[0].rows.start == 0
+    assert parts[-1].rows.stop == len(curves)
+    for x, y in zip(parts, parts[1:]):
+        assert x.records.stop == y.records.start
+        assert x.rows.stop == y.rows.start
+
+    # Never more partitions than records
+    assert len(shared.partition(frame, 100)) == nrecords
+
+    with pytest.raises(ValueError):
+        _ = shared.partition(frame, 0)
+
+def test_partition_frames_in_same_iflr():
+    # The rows are counted, not assumed to be one per record
+    with dlisio.load(multifdata) as (f, *_):
+        for frame in f.frames:
+            parts = shared.partition(frame, 4)
+            assert parts[-1].rows.stop == len(frame.curves())
+
+def test_read(f):
+    frame = f.object('FRAME', 'FRAME1', 10, 0)
+    expected = frame.curves()
+
+    out = np.empty(len(expected), dtype=frame.dtype())
+    for part in reversed(shared.partition(frame, 3)):
+        curves = shared.read(part, out)
+        np.testing.assert_array_equal(curves, expected[part.rows])
+
+    np.testing.assert_array_equal(out, expected)
+
+def test_curves_shared_memory(f):
+    frame = f.object('FRAME', 'FRAME1', 10, 0)
+    expected = frame.curves()
+
+    parts = shared.partition(frame, 2)
+    size = parts[-1].rows.stop * frame.dtype().itemsize
+    shm = shared_memory.SharedMemory(create=True, size=size)
+    try:
+        curves = shared.curves(parts, shm)
+        np.testing.assert_array_equal(curves, expected)
+        del curves
+    finally:
+        shm.close()
+        shm.unlink()
+
+def test_curves_memmap(f, tmpdir):
+    frame = f.object('FRAME', 'FRAME1', 10, 0)
+    expected = frame.curves()
+
+    parts = shared.partition(frame, 2)
+    path = str(tmpdir.join('curves.bin'))
+    out = np.memmap(path, dtype=frame.dtype(), mode='w+', shape=len(expected))
+    curves = shared.curves(parts, out)
+    np.testing.assert_array_equal(curves, expected)
+
+    with pytest.raises(ValueError):
+        _ = shared.curves(parts, out[1:])
+
+    readonly = np.memmap(path, dtype=frame.dtype(), mode='r')
+    with pytest.raises(ValueError):
+        _ = shared.curves(parts, readonly)
+
+def test_curves_too_small(f):
+    frame = f.object('FRAME', 'FRAME1', 10, 0)
+    parts = shared.partition(frame, 2)
+
+    shm = shared_memory.SharedMemory(create=True, size=frame.dtype().itemsize)
+    try:
+        with pytest.raises(ValueError):
+            _ = shared.curves(parts, shm)
+    finally:
+        shm.close()
+        shm.unlink()
+
+    with pytest.raises(TypeError):
+        _ = shared.curves(parts, np.empty(3, dtype=frame.dtype()))
+
+def test_curves_objects():
+    fpath = 'data/chap4-7/iflr/two-various-fdata-in-one-iflr.dlis'
+    with dlisio.load(fpath) as (f, *_):
+        frame = f.object('FRAME', 'FRAME-REPRCODE', 10, 0)
+        parts = shared.partition(frame, 2)
+        shm = shared_memory.SharedMemory(create=True, size=1024)
+        try:
+            with pytest.raises(ValueError) as exc:
+                _ = shared.curves(parts, shm)
+            assert 'python objects' in str(exc.value)
+        finally:
+            shm.close()
+            shm.unlink()